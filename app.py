@@ -3,84 +3,86 @@
 ✅ 已修复：二级标题合并居中 + 颜色#C9DDE3 + 一级标题大字体+小间距
 
 🎨 样式修改说明：
-- 所有样式配置集中在第33-61行
+- 所有样式配置集中在 blood_engine/style.py
 - 颜色、字体、间距都可以在那里修改
 - 详细说明请查看《样式修改指南.md》
 
+📦 结构说明：
+- 数据加载/合并/清洗/状态评价/图表生成都在 blood_engine 包中（无界面副作用，可单独导入）
+- 本文件只是 Streamlit 界面外壳
+
 🔥 版本标记：2.0 - 如果启动时看不到这个版本号，说明用的是旧文件！
 """
 
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-import numpy as np
-from datetime import datetime
-from scipy.interpolate import make_interp_spline
-
-# ========== 中文字体配置 ==========
-import matplotlib.font_manager as fm
+import contextlib
+import functools
+import hashlib
+import hmac
 import os
+import time
 
-font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'SimHei.ttf')
+import pandas as pd
+import streamlit as st
+from matplotlib.colors import to_rgba
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config import MALE_REF_RANGES, FEMALE_REF_RANGES
+from blood_engine import (
+    set_reporter, setup_chinese_font,
+    THEME_CONFIG, LOWER_IS_BETTER,
+    TITLE_TABLE_SPACING, FONTSIZE_MAIN_TITLE,
+    load_reference_ranges_from_excel, LazyWorkbook, to_dense,
+    find_indicator_column, SMOOTHING_MODES, DEFAULT_SMOOTHING_MODE,
+    plot_theme_table, plot_trend_chart_multi, build_trend_series, build_trend_vega_spec,
+    plot_radar_chart_with_baseline, BASELINE_WINDOW, get_baseline_cache,
+    FIGURE_CACHE, content_key, render_radar_gallery, prepare_squad, squad_pdf_file,
+    default_trend_indicators, default_radar_indicators,
+    build_indicator_catalog, catalog_indicators, coverage_label,
+    plan_prerender_deferred, theme_figure_key, trend_figure_key, radar_figure_key,
+    span_session, summarize_spans, spans_jsonl, clear_spans, capture_profile,
+    DATASETS, SessionData, set_memory_limits, set_peak_tracing, memory_report
+)
+from blood_engine.athletes import AthleteIndex
+from blood_engine.batch import BASELINE_EXCLUDE_COLS, find_name_column
+from blood_engine.fonts import FONT_PATH
+from blood_engine.loader import AUX_SHEETS
+from blood_engine.style import (
+    COLOR_NORMAL, COLOR_LOW, COLOR_HIGH, COLOR_SEVERE_LOW, COLOR_SEVERE_HIGH,
+    COLOR_GOOD, COLOR_EXCELLENT, COLOR_CATEGORY_HEADER
+)
+
+# ========== 页面配置 ==========
+st.set_page_config(
+    page_title="运动员血液指标分析系统 - 增强版",
+    page_icon="🏃",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
 
-if os.path.exists(font_path):
-    fm.fontManager.addfont(font_path)
-    plt.rcParams['font.sans-serif'] = ['SimHei']
-    plt.rcParams['axes.unicode_minus'] = False
+# ========== 中文字体配置 ==========
+font_path = setup_chinese_font()
+if font_path:
     print(f"✅ 成功加载中文字体：{font_path}")
 else:
-    print(f"❌ 字体文件不存在：{font_path}")
-    plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
+    print(f"❌ 字体文件不存在：{FONT_PATH}")
 
-from config import (
-    MALE_REF_RANGES, FEMALE_REF_RANGES,
-    COLUMN_NAME_MAPPING
-)
 
-# 趋势图默认指标
-TREND_INDICATORS = ['睾酮', '皮质醇', '肌酸激酶', '血尿素', '血红蛋白', '铁蛋白', '白细胞', '网织红细胞百分比']
+# ========== 引擎消息 → Streamlit ==========
+def streamlit_reporter(level, message):
+    """把引擎的进度消息显示到页面上（st.info / st.write / st.warning / st.success / st.error）"""
+    if get_script_run_ctx() is None:
+        print(message)   # 后台线程（预渲染读取辅助sheet）没有页面可显示
+        return
+    getattr(st, level)(message)
 
 
-# ============================================================================
-# 🎨 样式配置区域 - 在这里修改所有样式
-# ============================================================================
+set_reporter(streamlit_reporter)
+
+# 雷达图画廊每行显示几张缩略图
+GALLERY_COLUMNS = 4
 
-# 【样式1】颜色配置
-# 说明：修改这里可以改变所有颜色
-# ⭐ 新配色方案：
-# - 正常 → 浅灰色（白色看不见！）
-# - 偏低/偏高 → 黄色
-# - 严重偏低/严重偏高 → 红色
-# - 良好/优秀 → 绿色
-COLOR_SEVERE_LOW = '#FF6B6B'         # 严重偏低 - 红色
-COLOR_LOW = '#FFD93D'                # 偏低 - 黄色
-COLOR_NORMAL = '#F5F5F5'             # ⭐ 正常 - 浅灰色（原来白色看不见！）
-COLOR_HIGH = '#FFD93D'               # 偏高 - 黄色（和偏低一样）
-COLOR_SEVERE_HIGH = '#FF6B6B'        # 严重偏高 - 红色（和严重偏低一样）
-COLOR_GOOD = '#6BCF7F'               # 良好 - 绿色
-COLOR_EXCELLENT = '#6BCF7F'          # 优秀 - 绿色（和良好一样）
-
-# ⭐【修改1】二级标题底色改为白色
-COLOR_CATEGORY_HEADER = '#FFFFFF'    # 白色（分类标题背景）
-COLOR_TABLE_HEADER = '#E8E8E8'       # 浅灰色（表头背景）- 改为浅灰，让黑色文字可见
-
-COLOR_CHART_BG = '#FFFFFF'           # ⭐ 图表背景 - 全白
-COLOR_MAIN = '#1f77b4'               # 主色调
-
-# 【样式2】字体大小配置
-# 说明：修改这里可以改变所有字体大小
-FONTSIZE_MAIN_TITLE = 28    # 一级标题字体大小（增大）
-FONTSIZE_HEADER = 18                 # 表头字体大小
-FONTSIZE_CATEGORY = 16               # ⭐【修改2】分类标题字体（二级标题）- 原来是11
-FONTSIZE_INDICATOR = 14             # ⭐【修改3】指标名称字体 - 原来是9
-FONTSIZE_VALUE = 14                 # ⭐【修改3】数值字体 - 原来是10
-FONTSIZE_STATUS = 14               # ⭐【修改3】状态字体 - 原来是8.5
-
-# 【样式3】间距配置
-# 说明：修改这里可以改变标题和表格的间距
-TITLE_TABLE_SPACING = -0.5            # ⭐【修改4】一级标题和表格间距 - 原来是0.5，现在更小
-TABLE_ROW_HEIGHT = 4               # ⭐【修改5】表格行高 - 从3增加到4，容纳多行标题
+# 主题表格用到的全部指标（生成表格前确认所在的辅助sheet已读取）
+THEME_INDICATORS = [ind for categories in THEME_CONFIG.values() for inds in categories.values() for ind in inds]
 
 # ============================================================================
 # 🔥 版本验证 - 启动时会在终端显示
@@ -99,18 +101,37 @@ print(f"   严重: {COLOR_SEVERE_LOW}/{COLOR_SEVERE_HIGH} (红色)")
 print(f"   优秀: {COLOR_GOOD}/{COLOR_EXCELLENT} (绿色)")
 print("=" * 60)
 # 测试颜色转换
-from matplotlib.colors import to_rgba
 test_color = to_rgba(COLOR_CATEGORY_HEADER)
 print(f"🎨 二级标题颜色转换测试: {COLOR_CATEGORY_HEADER} → RGBA{test_color}")
 print("=" * 60)
 
 # ============================================================================
+ADMIN_PASSWORD_ENV = "BLOOD_ADMIN_PASSWORD"   # 管理员密码（可使用性能分析、内存上限等诊断功能）
+
+
+def admin_password():
+    """
+    管理员密码：取自 st.secrets["admin_password"] 或环境变量 BLOOD_ADMIN_PASSWORD，
+    都没有设置时返回 None（管理员功能关闭）
+    """
+    try:
+        password = st.secrets.get("admin_password")
+    except Exception:   # 没有 secrets.toml
+        password = None
+    return password or os.environ.get(ADMIN_PASSWORD_ENV) or None
+
+
 def check_password():
     def password_entered():
-        if st.session_state["password"] == "blood2026":  # ← 改成你的密码
+        entered = st.session_state["password"]
+        admin = admin_password()
+        is_admin = admin is not None and hmac.compare_digest(entered.encode(), admin.encode())
+        if entered == "blood2026" or is_admin:  # ← 改成你的密码
             st.session_state["password_correct"] = True
+            st.session_state["is_admin"] = is_admin
         else:
             st.session_state["password_correct"] = False
+            st.session_state["is_admin"] = False
 
     if "password_correct" not in st.session_state:
         st.text_input("密码", type="password", on_change=password_entered, key="password")
@@ -122,1589 +143,721 @@ def check_password():
     return True
 
 
-if not check_password():
-    st.stop()
-
-def parse_range_value(value_str):
+# ========== 性能分析（管理员）==========
+def profiled(func):
     """
-    解析范围值字符串
-
-    支持格式：
-    - "210-430" → (210, 430)
-    - "< 210" → (None, 210)
-    - "> 500" → (500, None)
-    - "36.63" → (36.63, 36.63)
-    - "6.0-20.0" → (6.0, 20.0)
-    - "-" → (None, None)
+    页面运行（main）或选项卡片段的入口：运行中的计时记录归入当前会话（span_session）；
+    管理员点了"分析下一次操作"后，下一次整页运行或片段运行整体用 cProfile 分析，
+    结果保存在 session_state['profile_report']
     """
-    if pd.isna(value_str) or str(value_str).strip() == '-' or str(value_str).strip() == '':
-        return None, None
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span_session(session_owner()):
+            if not st.session_state.pop('profile_next', False):
+                return func(*args, **kwargs)
+            with capture_profile(func.__name__) as report:
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    st.session_state['profile_report'] = report
+                    st.toast(f"🔬 性能分析完成（{func.__name__}），点击侧边栏「刷新结果」查看", icon="⏱️")
+    return wrapper
+
+
+def profile_panel():
+    """侧边栏：准备分析下一次操作，显示上一次分析结果并提供下载"""
+    st.sidebar.markdown("**🔬 函数级性能分析**")
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        if st.button("分析下一次操作", use_container_width=True,
+                     help="下一次点击按钮、切换选项等操作触发的运行会被完整记录（cProfile），无需重启服务"):
+            st.session_state['profile_next'] = True
+    with col2:
+        st.button("🔄 刷新结果", use_container_width=True)
+    if st.session_state.get('profile_next'):
+        st.sidebar.caption("⏳ 等待下一次操作…")
+
+    report = st.session_state.get('profile_report')
+    if report is None or report.stats is None:
+        return
+    st.sidebar.caption(f"{report.label} · {report.ts} · 共 {report.ms:.0f} ms")
+    st.sidebar.dataframe(report.top(30), hide_index=True, use_container_width=True)
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        st.download_button(
+            "📥 .pstats",
+            data=report.pstats_bytes(),
+            file_name="profile.pstats",
+            mime="application/octet-stream",
+            on_click="ignore",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            "📥 火焰图",
+            data=report.collapsed(),
+            file_name="profile.collapsed.txt",
+            mime="text/plain",
+            on_click="ignore",
+            use_container_width=True,
+            help="折叠栈格式，可用 flamegraph.pl 或 speedscope 打开"
+        )
 
-    value_str = str(value_str).strip()
 
-    # 处理 "< X" 格式
-    if value_str.startswith('<'):
-        val = value_str.replace('<', '').strip()
-        try:
-            return None, float(val)
-        except:
-            return None, None
+def _mb(n):
+    return f"{n / 1024 / 1024:.1f} MB" if n is not None else "未知"
 
-    # 处理 "> X" 格式
-    if value_str.startswith('>'):
-        val = value_str.replace('>', '').strip()
-        try:
-            return float(val), None
-        except:
-            return None, None
-
-    # 处理 "X-Y" 格式
-    if '-' in value_str:
-        parts = value_str.split('-')
-        if len(parts) == 2:
-            try:
-                return float(parts[0].strip()), float(parts[1].strip())
-            except:
-                return None, None
-
-    # 处理单个数值
-    try:
-        val = float(value_str)
-        return val, val
-    except:
-        return None, None
+
+def memory_panel():
+    """侧边栏：进程内存统计（各会话数据集、图表缓存、基准缓存、未关闭的图表、读取峰值）和上限设置"""
+    st.sidebar.markdown("**🧠 内存统计**")
+    info = memory_report()
+    st.sidebar.caption(
+        f"进程常驻 {_mb(info['rss_bytes'])} · 未关闭图表 {info['open_figures']} 个\n\n"
+        f"数据集 {_mb(info['datasets_bytes'])} / {_mb(info['datasets_max_bytes'])}"
+        f"（{len(info['datasets'])} 个会话，已淘汰 {info['dataset_evictions']} 次）\n\n"
+        f"图表缓存 {_mb(info['figure_cache_bytes'])} / {_mb(info['figure_cache_max_bytes'])}"
+        f"（{info['figure_cache_entries']} 张）· 基准缓存 {_mb(info['baseline_bytes'])}"
+    )
+    if info['datasets_unreleased_bytes']:
+        st.sidebar.caption(f"已淘汰、等待会话运行结束后释放 {_mb(info['datasets_unreleased_bytes'])}")
+    owner = session_owner()
+    if info['datasets']:
+        st.sidebar.dataframe(pd.DataFrame([{
+            '会话': ('当前' if d['owner'] == owner else d['owner'][:8]),
+            'MB': round(d['bytes'] / 1024 / 1024, 2),
+            '最近使用': time.strftime('%H:%M:%S', time.localtime(d['ts'])),
+        } for d in reversed(info['datasets'])]), hide_index=True, use_container_width=True)
+    tracing = st.sidebar.checkbox(
+        "📈 用 tracemalloc 记录读取峰值", value=info['peak_tracing'],
+        help="默认只记录常驻内存增量。打开后数据读取会慢数倍，且对所有会话生效，排查完请关闭"
+    )
+    if tracing != info['peak_tracing']:
+        set_peak_tracing(tracing)
+    if info['ingest_peaks']:
+        st.sidebar.caption("数据读取内存（常驻内存增量；打开 tracemalloc 时另有峰值）")
+        st.sidebar.dataframe(pd.DataFrame([{
+            '阶段': p['stage'],
+            '常驻增量MB': (round(p['rss_delta_bytes'] / 1024 / 1024, 2)
+                         if p.get('rss_delta_bytes') is not None else None),
+            '峰值MB': round(p['peak_bytes'] / 1024 / 1024, 2) if p.get('peak_bytes') is not None else None,
+            '耗时ms': p['ms'],
+        } for p in reversed(info['ingest_peaks'])]), hide_index=True, use_container_width=True)
+
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        datasets_mb = st.number_input("数据集上限MB", min_value=16, step=64,
+                                      value=int(info['datasets_max_bytes'] / 1024 / 1024))
+    with col2:
+        figures_mb = st.number_input("图表缓存上限MB", min_value=8, step=32,
+                                     value=int(info['figure_cache_max_bytes'] / 1024 / 1024))
+    if (datasets_mb * 1024 * 1024 != info['datasets_max_bytes']
+            or figures_mb * 1024 * 1024 != info['figure_cache_max_bytes']):
+        set_memory_limits(datasets=datasets_mb * 1024 * 1024, figures=figures_mb * 1024 * 1024, keep=owner)
+        st.rerun()
 
 
-def load_reference_ranges_from_excel(file):
+# ========== 两级渲染 ==========
+
+def show_figure(fig_key, build_fig, file_name, prebuild_full=False):
     """
-    从上传的Excel文件加载参考范围
+    两级渲染显示图表
 
-    返回：
-    - male_ranges: 男性参考范围字典
-    - female_ranges: 女性参考范围字典
+    - 立即显示低分辨率预览（按内容键缓存）
+    - 高清版在点击"下载高清PNG"时才生成；勾选后台预生成时交给后台线程提前生成
+    - build_fig 返回 Figure 或 None；返回是否成功显示
     """
-    try:
-        # 读取参考范围sheet
-        df = pd.read_excel(file, sheet_name='参考范围')
-
-        male_ranges = {}
-        female_ranges = {}
-        common_ranges = {}
-
-        # 遍历每一行
-        for idx, row in df.iterrows():
-            indicator = str(row['指标名称']).strip()
-            gender = str(row['性别']).strip()
-
-            # 解析五档范围
-            severe_low_val = row['严重偏低 (<)']
-            low_range = row['偏低 (范围)']
-            normal_range = row['参考范围 (正常)']
-            high_range = row['偏高 (范围)']
-            severe_high_val = row['严重偏高 (>)']
-
-            # 解析正常范围（这是最重要的）
-            normal_low, normal_high = parse_range_value(normal_range)
-
-            # 解析其他范围
-            severe_low_lower, severe_low_upper = parse_range_value(severe_low_val)
-            low_lower, low_upper = parse_range_value(low_range)
-            high_lower, high_upper = parse_range_value(high_range)
-            severe_high_lower, severe_high_upper = parse_range_value(severe_high_val)
-
-            # 构建范围字典
-            range_dict = {
-                'severe_low_1': severe_low_lower if severe_low_lower is not None else severe_low_upper,
-                'low_1': low_lower if low_lower is not None else None,
-                'low_2': normal_low,  # 正常范围下限
-                'high_2': normal_high,  # 正常范围上限
-                'high_1': high_upper if high_upper is not None else None,
-                'severe_high_1': severe_high_upper if severe_high_upper is not None else severe_high_lower,
-            }
-
-            # 根据性别分类
-            if gender == '男':
-                male_ranges[indicator] = range_dict
-            elif gender == '女':
-                female_ranges[indicator] = range_dict
-            elif gender == '通用':
-                common_ranges[indicator] = range_dict
-
-        # 合并通用范围到男女范围
-        for indicator, range_dict in common_ranges.items():
-            if indicator not in male_ranges:
-                male_ranges[indicator] = range_dict
-            if indicator not in female_ranges:
-                female_ranges[indicator] = range_dict
-
-        return male_ranges, female_ranges
-
-    except Exception as e:
-        st.error(f"解析参考范围文件出错：{str(e)}")
-        return {}, {}
-
-
-# 设置中文字体
-matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
-matplotlib.rcParams['axes.unicode_minus'] = False
+    png = FIGURE_CACHE.render_png(fig_key, 'preview', build_fig)
+    if png is None:
+        return False
 
-# ========== 页面配置 ==========
-st.set_page_config(
-    page_title="运动员血液指标分析系统 - 增强版",
-    page_icon="🏃",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+    st.image(png)
+    st.download_button(
+        "📥 下载高清PNG",
+        data=lambda: FIGURE_CACHE.render_png(fig_key, 'full', build_fig),
+        file_name=file_name,
+        mime="image/png",
+        on_click="ignore",
+        key=f"hd_{fig_key}"
+    )
+    if prebuild_full:
+        FIGURE_CACHE.schedule(fig_key, 'full', build_fig)
+    return True
 
-# ========== 增强配置 ==========
-
-# 主题配置 - 用于表格图
-# 新的主题配置 - 7个生理系统分类
-# 格式: '指标key': ('中文名', '英文名')
-
-# 一级分类中英文对照
-CATEGORY_NAMES = {
-    '1_调控与指挥中心': ('调控与指挥中心（神经-内分泌系统）', 'Control and Command Center (Neuroendocrine System)'),
-    '2_执行与代谢系统': ('执行与代谢系统（肌肉与能量状态）', 'Execution and Metabolic System (Muscle and Energy Status)'),
-    '3_循环与运载系统': ('循环与运载系统（血液运载能力）', 'Circulation and Transport System (Blood Transport Capacity)'),
-    '4_后勤保障与维护': ('后勤保障与维护（免疫与内环境）', 'Logistics Support and Maintenance (Immunity and Internal Environment)'),
-}
-
-THEME_CONFIG = {
-    '1_调控与指挥中心': {
-        '合成代谢\nAnabolism': {
-            '睾酮': ('睾酮', 'Testosterone'),
-            '游离睾酮': ('游离睾酮', 'Free Testosterone'),
-        },
-        '分解代谢\nCatabolism': {
-            '皮质醇': ('皮质醇', 'Cortisol'),
-        },
-        '状态平衡\nStatus Balance': {
-            '睾酮/皮质醇比值': ('睾酮/皮质醇比值', 'T/C Ratio'),
-        }
-    },
-
-    '2_执行与代谢系统': {
-        '结构完整性（硬件）\nStructural Integrity (Hardware)': {
-            '肌酸激酶': ('肌酸激酶', 'Creatine Kinase'),
-        },
-        '能量储备与代谢（软件/燃料）\nEnergy Reserves and Metabolism (Software/Fuel)': {
-            '血糖': ('血糖', 'Blood Glucose'),
-            '血尿素': ('血尿素', 'Blood Urea'),
-            '尿酸': ('尿酸', 'Uric Acid'),
-        }
-    },
-
-    '3_循环与运载系统': {
-        '输送载体（红细胞）\nTransport Carrier (Red Blood Cells)': {
-            '血红蛋白': ('血红蛋白', 'Hemoglobin'),
-            '红细胞': ('红细胞', 'RBC Count'),
-            '红细胞压积': ('红细胞压积', 'Hematocrit'),
-            '网织红细胞百分比': ('网织红细胞百分比', 'Reticulocyte %'),
-            '平均红细胞容积': ('平均红细胞容积', 'MCV'),
-        },
-        '生化原料（造血储备）\nBiochemical Raw Materials (Hematopoietic Reserves)': {
-            '铁蛋白': ('铁蛋白', 'Ferritin'),
-            '维生素B12': ('维生素B12', 'Vitamin B12'),
-            '维生素B6（PA）': ('维生素B6（PA）', 'Vitamin B6 (PA)'),  # ⭐ 修改
-            '叶酸': ('叶酸', 'Folic Acid'),
-        }
-    },
-
-    '4_后勤保障与维护': {
-        '免疫防御（炎性监控）\nImmune Defense (Inflammatory Monitoring)': {
-            '白细胞': ('白细胞', 'WBC Count'),
-            '超敏C反应蛋白': ('超敏C反应蛋白', 'hs-CRP'),
-            '触珠蛋白': ('触珠蛋白', 'Haptoglobin'),
-        },
-        '代谢辅酶（微量营养）\nMetabolic Coenzymes (Micronutrients)': {
-            '维生素B1': ('维生素B1', 'Vitamin B1'),
-            '维生素B2': ('维生素B2', 'Vitamin B2'),
-            '维生素D2': ('维生素D2', 'Vitamin D2'),
-            '维生素D3': ('维生素D3', 'Vitamin D3'),
-            '维生素D': ('维生素D', 'Vitamin D'),
-        },
-        '内环境稳态（水盐平衡）\nInternal Environment Homeostasis (Water-Electrolyte Balance)': {
-            '钾': ('钾', 'Potassium'),
-            '钠': ('钠', 'Sodium'),
-            '氯': ('氯', 'Chloride'),
-            '渗透压': ('渗透压', 'Osmotic Pressure'),
-            '血尿素/肌酐': ('血尿素/肌酐', 'BUN/Cr Ratio'),
-        }
-    },
-}
-
-# 雷达图配置
-RADAR_FIELDS = ['游离睾酮', '皮质醇', '肌酸激酶', '血尿素', '血红蛋白', '铁蛋白', '白细胞', '网织红细胞百分比']  # ⭐ 改为游离睾酮
-LOWER_IS_BETTER = ['肌酸激酶', '血尿素', '超敏C反应蛋白', '皮质醇']
-
-# 颜色配置 - 五档评价配色
-CATEGORY_NAMES = {
-    '1_调控与指挥中心': ('调控与指挥中心（神经-内分泌系统）', 'Control and Command Center (Neuroendocrine System)'),
-    '2_执行与代谢系统': ('执行与代谢系统（肌肉与能量状态）', 'Execution and Metabolic System (Muscle and Energy Status)'),
-    '3_循环与运载系统': ('循环与运载系统（血液运载能力）', 'Circulation and Transport System (Blood Transport Capacity)'),
-    '4_后勤保障与维护': ('后勤保障与维护（免疫与内环境）', 'Logistics Support and Maintenance (Immunity and Internal Environment)'),
-}
-
-THEME_CONFIG = {
-    '1_调控与指挥中心': {
-        '合成代谢\nAnabolism': {
-            '睾酮': ('睾酮', 'Testosterone'),
-            '游离睾酮': ('游离睾酮', 'Free Testosterone'),
-        },
-        '分解代谢\nCatabolism': {
-            '皮质醇': ('皮质醇', 'Cortisol'),
-        },
-        '状态平衡\nStatus Balance': {
-            '睾酮/皮质醇比值': ('睾酮/皮质醇比值', 'T/C Ratio'),
-        }
-    },
-
-    '2_执行与代谢系统': {
-        '结构完整性（硬件）\nStructural Integrity (Hardware)': {
-            '肌酸激酶': ('肌酸激酶', 'Creatine Kinase'),
-        },
-        '能量储备与代谢（软件/燃料）\nEnergy Reserves and Metabolism (Software/Fuel)': {
-            '血糖': ('血糖', 'Blood Glucose'),
-            '血尿素': ('血尿素', 'Blood Urea'),
-            '尿酸': ('尿酸', 'Uric Acid'),
-        }
-    },
-
-    '3_循环与运载系统': {
-        '输送载体（红细胞）\nTransport Carrier (Red Blood Cells)': {
-            '血红蛋白': ('血红蛋白', 'Hemoglobin'),
-            '红细胞': ('红细胞', 'RBC Count'),
-            '红细胞压积': ('红细胞压积', 'Hematocrit'),
-            '网织红细胞百分比': ('网织红细胞百分比', 'Reticulocyte %'),
-            '平均红细胞容积': ('平均红细胞容积', 'MCV'),
-        },
-        '生化原料（造血储备）\nBiochemical Raw Materials (Hematopoietic Reserves)': {
-            '铁蛋白': ('铁蛋白', 'Ferritin'),
-            '维生素B12': ('维生素B12', 'Vitamin B12'),
-            '维生素B6（PA）': ('维生素B6（PA）', 'Vitamin B6 (PA)'),  # ⭐ 修改
-            '叶酸': ('叶酸', 'Folic Acid'),
-        }
-    },
-
-    '4_后勤保障与维护': {
-        '免疫防御（炎性监控）\nImmune Defense (Inflammatory Monitoring)': {
-            '白细胞': ('白细胞', 'WBC Count'),
-            '超敏C反应蛋白': ('超敏C反应蛋白', 'hs-CRP'),
-            '触珠蛋白': ('触珠蛋白', 'Haptoglobin'),
-        },
-        '代谢辅酶（微量营养）\nMetabolic Coenzymes (Micronutrients)': {
-            '维生素B1': ('维生素B1', 'Vitamin B1'),
-            '维生素B2': ('维生素B2', 'Vitamin B2'),
-            '维生素D2': ('维生素D2', 'Vitamin D2'),
-            '维生素D3': ('维生素D3', 'Vitamin D3'),
-            '维生素D': ('维生素D', 'Vitamin D'),
-        },
-        '内环境稳态（水盐平衡）\nInternal Environment Homeostasis (Water-Electrolyte Balance)': {
-            '钾': ('钾', 'Potassium'),
-            '钠': ('钠', 'Sodium'),
-            '氯': ('氯', 'Chloride'),
-            '渗透压': ('渗透压', 'Osmotic Pressure'),
-            '血尿素/肌酐': ('血尿素/肌酐', 'BUN/Cr Ratio'),
-        }
-    },
-}
-
-# 雷达图配置
-RADAR_FIELDS = ['游离睾酮', '皮质醇', '肌酸激酶', '血尿素', '血红蛋白', '铁蛋白', '白细胞', '网织红细胞百分比']  # ⭐ 改为游离睾酮
-LOWER_IS_BETTER = ['肌酸激酶', '血尿素', '超敏C反应蛋白', '皮质醇']
-
-# 颜色配置 - 五档评价配色（新配色方案）
-COLOR_SEVERE_LOW = '#FF6B6B'     # 红色（严重偏低）
-COLOR_LOW = '#FFD93D'            # 黄色（偏低）
-COLOR_NORMAL = '#F5F5F5'         # 浅灰色（正常）- 原来白色看不见！
-COLOR_HIGH = '#FFD93D'           # 黄色（偏高）
-COLOR_SEVERE_HIGH = '#FF6B6B'    # 红色（严重偏高）
-COLOR_GOOD = '#6BCF7F'           # 绿色（良好）
-COLOR_EXCELLENT = '#6BCF7F'      # 绿色（优秀）
-COLOR_CATEGORY_HEADER = '#FFFFFF'  # 白色（分类标题）
-COLOR_CHART_BG = '#F8F9FA'       # 极浅灰（图表背景）
-COLOR_MAIN = '#1f77b4'          # 主色调
-
-# 雷达图样式
-RADAR_STYLES = [
-    {'color': '#8BC1E9', 'linewidth': 2, 'linestyle': ':'},   # 第1次 - 浅天蓝
-    {'color': '#E89A9D', 'linewidth': 2, 'linestyle': '-.'},  # 第2次 - 浅柔红
-    {'color': '#5C7CFA', 'linewidth': 2.5, 'linestyle': '--'}, # 第3次 - 靛蓝
-    {'color': '#D05A5E', 'linewidth': 3, 'linestyle': '-'},   # 第4次（最新）- 深砖红
-]
-
-def load_data_multisheet(file_path_or_buffer):
-    """
-    从多个sheet加载数据并合并
-    支持：月周测试指标、季度测试指标、年度测试指标、其他
-    处理双层表头
-    """
-    try:
-        st.info("📊 开始读取多个sheet的数据...")
-        
-        # ===== 1. 读取月周测试指标（主数据，header=0）=====
-        st.write("正在读取：月周测试指标...")
-        df_monthly = pd.read_excel(
-            file_path_or_buffer,
-            sheet_name='月周测试指标',
-            header=0,
-            skiprows=lambda x: x in range(1, 11)
-        )
-        st.write(f"   ✓ 月周测试：{len(df_monthly)} 行，{len(df_monthly.columns)} 列")
-        
-        # 确保列名唯一
-        new_columns = []
-        for i, col in enumerate(df_monthly.columns):
-            col_str = str(col)
-            count = new_columns.count(col_str)
-            if count > 0:
-                unique_col = f"{col_str}#{i}"
-                new_columns.append(unique_col)
-            else:
-                new_columns.append(col_str)
-        df_monthly.columns = new_columns
-        
-        # ===== 2. 读取季度测试指标（双层表头）- 维生素和电解质 =====
-        df_quarterly = None
-        try:
-            st.write("正在读取：季度测试指标...")
-            # 使用header=[0,1]读取双层表头
-            df_q_raw = pd.read_excel(
-                file_path_or_buffer,
-                sheet_name='季度测试指标',
-                header=[0, 1]
-            )
-            # 合并双层列名
-            df_quarterly = flatten_multiindex_columns(df_q_raw, '季度测试')
-            st.write(f"   ✓ 季度测试：{len(df_quarterly)} 行，{len(df_quarterly.columns)} 列")
-        except Exception as e:
-            st.warning(f"   ⚠ 季度测试指标读取失败：{e}")
-        
-        # ===== 3. 读取年度测试指标（双层表头）- 甲状腺、肝功、血脂 =====
-        df_yearly = None
-        try:
-            st.write("正在读取：年度测试指标...")
-            df_y_raw = pd.read_excel(
-                file_path_or_buffer,
-                sheet_name='年度测试指标',
-                header=[0, 1]
-            )
-            df_yearly = flatten_multiindex_columns(df_y_raw, '年度测试')
-            st.write(f"   ✓ 年度测试：{len(df_yearly)} 行，{len(df_yearly.columns)} 列")
-        except Exception as e:
-            st.warning(f"   ⚠ 年度测试指标读取失败：{e}")
-        
-        # ===== 4. 读取其他sheet（双层表头）- 触珠蛋白等 =====
-        df_other = None
-        try:
-            st.write("正在读取：其他指标...")
-            df_o_raw = pd.read_excel(
-                file_path_or_buffer,
-                sheet_name='其他',
-                header=[0, 1]
-            )
-            df_other = flatten_multiindex_columns(df_o_raw, '其他')
-            st.write(f"   ✓ 其他指标：{len(df_other)} 行，{len(df_other.columns)} 列")
-        except Exception as e:
-            st.warning(f"   ⚠ 其他指标读取失败：{e}")
-        
-        # ===== 5. 合并数据 =====
-        st.write("\n正在合并数据...")
-        df_merged = merge_all_sheets(df_monthly, df_quarterly, df_yearly, df_other)
-        
-        st.success(f"✅ 数据合并完成：{len(df_merged)} 行，{len(df_merged.columns)} 列")
-        
-        return df_merged
-        
-    except Exception as e:
-        st.error(f"❌ 数据加载失败：{e}")
-        import traceback
-        st.error(traceback.format_exc())
-        return None
-
-
-def flatten_multiindex_columns(df, sheet_name):
-    """
-    将双层MultiIndex列名展平为单层
-    优先使用具体的指标名称
-    """
-    # 定义分类名称（这些应该跳过，使用level1）
-    category_names = ['维生素', '电解质', '甲功', '肝功', '血脂四项', '糖类指标', '性别']
-    
-    # 定义基础信息列名（这些应该保留level0）
-    basic_info_cols = ['项目', '编号', '姓名', '出生年月日', '身高', '体重', '测试日期', '备注']
-    
-    new_columns = []
-    
-    for col in df.columns:
-        if isinstance(col, tuple):
-            level0, level1 = col[0], col[1]
-            
-            # 判断逻辑：
-            # 1. 如果level0是基础信息列，使用level0
-            # 2. 如果level0是分类名称，使用level1（指标名）
-            # 3. 如果level1是Unnamed，使用level0
-            # 4. 否则优先使用level1
-            
-            if str(level0) in basic_info_cols:
-            # ⭐ 修改：基础信息列，只有当level1无效时才使用level0
-                if pd.isna(level1) or str(level1).startswith('Unnamed'):
-                    col_name = str(level0)
-                else:
-        # 如果level1有效，使用level1（实际指标名）
-                    col_name = str(level1)
-            elif str(level0) in category_names:
-                # 分类名称：使用level1（实际指标名）
-                if not (pd.isna(level1) or str(level1).startswith('Unnamed')):
-                    col_name = str(level1)
-                else:
-                    col_name = f'Unnamed_{len(new_columns)}'
-            elif pd.isna(level1) or str(level1).startswith('Unnamed'):
-                # level1无效：使用level0
-                if not (pd.isna(level0) or str(level0).startswith('Unnamed')):
-                    col_name = str(level0)
-                else:
-                    col_name = f'Unnamed_{len(new_columns)}'
-            else:
-                # 其他情况：优先使用level1
-                col_name = str(level1)
-        else:
-            col_name = str(col)
-        
-        new_columns.append(col_name)
-    
-    df.columns = new_columns
-    
-    # 🔧 确保列名唯一
-    seen = {}
-    unique_columns = []
-    for col in df.columns:
-        if col in seen:
-            seen[col] += 1
-            unique_columns.append(f"{col}_{seen[col]}")
-        else:
-            seen[col] = 0
-            unique_columns.append(col)
-    
-    df.columns = unique_columns
-    
-    return df
 
+# ========== 数据流水线（按文件内容缓存在 session_state）==========
 
-def merge_all_sheets(df_monthly, df_quarterly, df_yearly, df_other):
-    """
-    合并所有sheet的数据
-    使用姓名和测试日期作为合并键
-    """
-    # 以月周测试数据为基础
-    df_result = df_monthly.copy()
-    
-    # 确定合并键 - 尝试多种可能的列名
-    name_col_monthly = None
-    for col_name in ['姓名', 'Name', 'Name_final']:
-        if col_name in df_result.columns:
-            name_col_monthly = col_name
-            break
-    
-    date_col_monthly = None
-    for col_name in ['测试日期', 'Date', 'Date_auto']:
-        if col_name in df_result.columns:
-            date_col_monthly = col_name
-            break
-    
-    if not name_col_monthly or not date_col_monthly:
-        st.warning("⚠ 无法找到姓名或日期列，仅使用月周测试数据")
-        return df_result
-    
-    # 创建合并键
-    df_result['_merge_key'] = (
-        df_result[name_col_monthly].astype(str) + '_' + 
-        df_result[date_col_monthly].astype(str)
-    )
-    
-    # 合并季度测试数据
-    if df_quarterly is not None:
-        df_result = merge_sheet_data(df_result, df_quarterly, name_col_monthly, date_col_monthly, '季度测试')
-    
-    # 合并年度测试数据
-    if df_yearly is not None:
-        df_result = merge_sheet_data(df_result, df_yearly, name_col_monthly, date_col_monthly, '年度测试')
-    
-    # 合并其他数据
-    if df_other is not None:
-        df_result = merge_sheet_data(df_result, df_other, name_col_monthly, date_col_monthly, '其他')
-    
-    # 删除临时合并键
-    if '_merge_key' in df_result.columns:
-        df_result = df_result.drop('_merge_key', axis=1)
-    
-    # 🔧 新增：应用列名映射，标准化列名
-    df_result = df_result.rename(columns=COLUMN_NAME_MAPPING)
-    st.write(f"   ✓ 列名标准化完成")
-    
-    # 🔧 检查并处理映射后的重复列名
-    if df_result.columns.duplicated().any():
-        st.warning("   ⚠ 映射后发现重复列名，正在处理...")
-        
-        # 对于重复列名，保留第一列，删除后续列
-        seen = {}
-        cols_to_keep = []
-        for i, col in enumerate(df_result.columns):
-            if col not in seen:
-                seen[col] = i
-                cols_to_keep.append(i)
-        
-        df_result = df_result.iloc[:, cols_to_keep]
-        st.write(f"   ✓ 重复列名已处理，保留了{len(cols_to_keep)}列")
-    
-    return df_result
-
-
-def merge_sheet_data(df_main, df_add, name_col, date_col, sheet_name):
-    """
-    将额外sheet的数据合并到主数据框
+def session_owner():
+    """当前会话的标识（数据集登记表按会话统计内存）"""
+    run_ctx = get_script_run_ctx()
+    return run_ctx.session_id if run_ctx is not None else 'local'
+
+
+def load_pipeline(uploaded_file, custom_ranges_file):
     """
-    try:
-        # 🔧 新增：检查df_add是否有重复列名
-        if df_add.columns.duplicated().any():
-            st.warning(f"   ⚠ {sheet_name}：发现重复列名，正在修复...")
-            # 修复重复列名
-            seen = {}
-            unique_columns = []
-            for col in df_add.columns:
-                if col in seen:
-                    seen[col] += 1
-                    unique_columns.append(f"{col}_{seen[col]}")
-                else:
-                    seen[col] = 0
-                    unique_columns.append(col)
-            df_add.columns = unique_columns
-            st.write(f"   ✓ 列名已唯一化")
-        
-        # 在额外sheet中找到对应的姓名和日期列
-        name_col_add = None
-        for col_name in ['姓名', 'Name', 'Name_final']:
-            if col_name in df_add.columns:
-                name_col_add = col_name
-                break
-        
-        date_col_add = None
-        for col_name in ['测试日期', 'Date', 'Date_auto']:
-            if col_name in df_add.columns:
-                date_col_add = col_name
-                break
-        
-        if not name_col_add:
-            st.warning(f"   ⚠ {sheet_name}：无法找到姓名列，跳过合并")
-            return df_main
-            
-        if not date_col_add:
-            st.warning(f"   ⚠ {sheet_name}：无法找到日期列，跳过合并")
-            return df_main
-        
-        # 创建合并键（使用.copy()避免SettingWithCopyWarning）
-        df_add = df_add.copy()
-        df_add['_merge_key'] = (
-            df_add[name_col_add].astype(str) + '_' + 
-            df_add[date_col_add].astype(str)
-        )
-        
-        # 选择要合并的指标列（排除基本信息列）
-        exclude_cols = [
-            '项目', '编号', '姓名', '性别', '出生年月日', '身高', '体重', '测试日期', 
-            'Name', 'Name_final', 'Date', 'Date_auto', '_merge_key',
-            '教练', '训练地点', '测试单位', '测试阶段', '重点运动员', '专项'
-        ]
-        
-        indicator_cols = []
-        for col in df_add.columns:
-            if col in exclude_cols:
-                continue
-            if str(col).startswith('Unnamed'):
-                continue
-            if pd.isna(col):
-                continue
-            indicator_cols.append(col)
-        
-        if len(indicator_cols) == 0:
-            st.warning(f"   ⚠ {sheet_name}：没有找到指标列，跳过合并")
-            return df_main
-        
-        # 只保留指标列和合并键
-        df_add_indicators = df_add[['_merge_key'] + indicator_cols].copy()
-        
-        # 🔧 新增：检查df_add_indicators是否有重复列名
-        if df_add_indicators.columns.duplicated().any():
-            st.warning(f"   ⚠ {sheet_name}：指标列有重复，正在去重...")
-            # 再次确保唯一性
-            seen = {}
-            unique_columns = []
-            for col in df_add_indicators.columns:
-                if col in seen:
-                    seen[col] += 1
-                    unique_columns.append(f"{col}_{seen[col]}")
-                else:
-                    seen[col] = 0
-                    unique_columns.append(col)
-            df_add_indicators.columns = unique_columns
-        
-        # 合并数据
-        df_merged = df_main.merge(
-            df_add_indicators,
-            on='_merge_key',
-            how='left',
-            suffixes=('', f'_from_{sheet_name}')
-        )
-        
-        # 🔧 新增：合并后再次检查重复列名
-        if df_merged.columns.duplicated().any():
-            st.warning(f"   ⚠ 合并后发现重复列名，正在修复...")
-            seen = {}
-            unique_columns = []
-            for col in df_merged.columns:
-                if col in seen:
-                    seen[col] += 1
-                    unique_columns.append(f"{col}_{seen[col]}")
-                else:
-                    seen[col] = 0
-                    unique_columns.append(col)
-            df_merged.columns = unique_columns
-        
-        st.write(f"   ✓ {sheet_name}合并：添加了 {len(indicator_cols)} 个指标")
-        
-        return df_merged
-        
-    except Exception as e:
-        st.warning(f"   ⚠ {sheet_name}合并失败：{e}")
-        import traceback
-        st.write(traceback.format_exc())
-        return df_main
-
-
-
-def clean_data_final(df):
-    """数据清洗函数"""
-    if df is None:
-        return None
-
-    st.info("🧹 开始清洗数据...")
-
-    # 删除空行
-    df = df.dropna(how='all')
-    df = df.reset_index(drop=True)
-
-    # 处理姓名列
-    if '姓名' in df.columns:
-        name_cols = [col for col in df.columns if col.startswith('Name')]
-        if not name_cols:
-            df['Name'] = df['姓名']
-        else:
-            df['Name_final'] = df['姓名']
+    参考范围加载 + 数据加载/合并/清洗，只在上传的文件内容变化时执行
 
-    # 处理日期列
-    possible_date_cols = ['测试日期', '日期', '开始日期']
-    date_col_found = False
+    只立即读取月周测试指标；季度/年度/其他 sheet 在第一次用到其中的指标时读取（见 require_indicators），
+    开启后台预渲染时由预渲染线程读取主题表格用到的sheet（见 start_prerender）。
+    结果保存在 st.session_state['pipeline']，切换运动员、勾选选项等rerun直接复用。
+    数据集登记到 DATASETS，内存超限被淘汰（标记 evicted）后在这里丢弃旧数据、从上传的文件重新加载。
+    加载失败时返回None。
+    """
+    file_key = hashlib.md5(uploaded_file.getvalue()).hexdigest()
+    ranges_file_key = None
+    if custom_ranges_file is not None:
+        ranges_file_key = hashlib.md5(custom_ranges_file.getvalue()).hexdigest()
+    pipeline_id = (file_key, ranges_file_key)
+
+    pipeline = st.session_state.get('pipeline')
+    if pipeline is not None and pipeline.get('id') == pipeline_id and not pipeline.evicted:
+        DATASETS.touch(session_owner())
+        return pipeline
+    if pipeline is not None and pipeline.evicted:
+        st.info("ℹ️ 服务器内存紧张，本会话的数据已被释放，正在重新加载")
+    st.session_state.pop('pipeline', None)  # 先释放旧数据
 
-    for col in possible_date_cols:
-        if col in df.columns:
-            try:
-                date_cols = [c for c in df.columns if c.startswith('Date')]
+    # === 加载参考范围 ===
+    ranges_status = None
+    male_ref_ranges, female_ref_ranges = MALE_REF_RANGES, FEMALE_REF_RANGES
+    if custom_ranges_file is not None:
+        with st.spinner("正在加载自定义参考范围..."):
+            custom_male, custom_female = load_reference_ranges_from_excel(custom_ranges_file)
+            if custom_male and custom_female:
+                male_ref_ranges, female_ref_ranges = custom_male, custom_female
+                ranges_status = ('success', f"✅ 已加载自定义范围（男:{len(male_ref_ranges)}项，女:{len(female_ref_ranges)}项）")
+            else:
+                ranges_status = ('warning', "⚠️ 自定义范围加载失败，使用默认范围")
 
-                if not date_cols:
-                    if pd.api.types.is_datetime64_any_dtype(df[col]):
-                        df['Date'] = df[col]
-                    else:
-                        df['Date'] = pd.to_datetime(df[col], errors='coerce')
+    # === 数据加载 ===
+    with st.spinner("正在加载数据..."):
+        try:
+            book = LazyWorkbook(uploaded_file.getvalue())
+        except Exception as e:
+            st.error(f"❌ 数据加载失败：{e}")
+            return None
 
-                    df['DateStr'] = df['Date'].dt.strftime('%Y-%m-%d')
-                    date_col_found = True
-                else:
-                    date_col_found = True
+        df = book.frame()
+        if df is None or len(df) == 0:
+            st.error("❌ 数据清洗后为空")
+            return None
+
+    pipeline = SessionData({
+        'id': pipeline_id,
+        'file_key': file_key,
+        'book': book,                 # 按需读取辅助sheet
+        'sheets': book.loaded,        # df 中已合并的辅助sheet
+        'dataset_key': sheet_dataset_key(file_key, book.loaded),
+        'df': df,
+        'male_ref_ranges': male_ref_ranges,
+        'female_ref_ranges': female_ref_ranges,
+        'ranges_status': ranges_status,
+        'catalog': build_indicator_catalog(df),   # 指标目录：类型、各性别覆盖次数、首末测试日期、所属主题
+        'views': {},
+    })
+    st.session_state['pipeline'] = pipeline
+    DATASETS.register(session_owner(), pipeline['dataset_key'], pipeline)
+    return pipeline
+
+
+def sheet_dataset_key(file_key, sheets):
+    """数据集标识：文件内容哈希 + 已合并的辅助sheet（读入新sheet后数据变化，基准、图表等缓存随之区分）"""
+    return '+'.join([file_key, *sheets])
+
+
+def sync_pipeline(pipeline):
+    """有新的辅助sheet读入时，刷新数据、指标目录并清空各性别视图；返回是否有变化"""
+    book = pipeline['book']
+    if pipeline['sheets'] == book.loaded:
+        return False
+    sheets, df = book.snapshot()
+    pipeline.update({
+        'sheets': sheets,
+        'dataset_key': sheet_dataset_key(pipeline['file_key'], sheets),
+        'df': df,
+        'catalog': build_indicator_catalog(df),
+        'views': {},
+    })
+    DATASETS.register(session_owner(), pipeline['dataset_key'], pipeline)
+    return True
 
-                break
 
-            except Exception as e:
-                continue
+def start_prerender(pipeline, first):
+    """
+    启动后台预渲染：主题表格用到的季度/其他sheet在预渲染线程中读取，之后按完整数据排队，
+    页面第一次显示只等待月周测试指标。读取完成后下一次rerun由 sync_pipeline 同步到界面，
+    界面的 dataset_key 与预渲染时相同，预渲染的图直接命中。
+    """
+    book, file_key = pipeline['book'], pipeline['file_key']
+
+    def load():
+        book.load_for(THEME_INDICATORS)
+        sheets, df = book.snapshot()
+        return sheet_dataset_key(file_key, sheets), df
+
+    job = plan_prerender_deferred(
+        load, {'男': pipeline['male_ref_ranges'], '女': pipeline['female_ref_ranges']}, first=first
+    ).start()
+    pipeline.on_evict(job.cancel)   # 数据集被淘汰时停止预渲染，不再持有旧数据
+    return job
+
+
+def prerender_outdated(job, pipeline):
+    """预渲染排队之后又读入了其他sheet（例如导出PDF），预渲染的图与界面的 dataset_key 不再一致"""
+    if job.dataset_key is None:
+        return False   # 还在读取
+    return job.dataset_key != sheet_dataset_key(pipeline['file_key'], pipeline['book'].loaded)
+
+
+def full_data(pipeline):
+    """读取全部辅助sheet后的完整数据（PDF报告使用）；界面视图在下一次rerun时同步"""
+    book = pipeline['book']
+    book.load_all()
+    return book.frame()
+
+
+def gender_view(pipeline, gender):
+    """某个性别的数据视图（筛选后的数据、姓名列、运动员列表、数值指标等），每个数据集只计算一次"""
+    views = pipeline['views']
+    if gender not in views:
+        df = pipeline['df']
+        gender_df = df[df['性别'] == gender].copy() if '性别' in df.columns else df.copy()
+        name_col = find_name_column(gender_df)
+        date_col = 'Date' if 'Date' in gender_df.columns else 'Date_auto'
+        ref_ranges = pipeline['male_ref_ranges'] if gender == "男" else pipeline['female_ref_ranges']
+        views[gender] = {
+            'gender_df': gender_df,
+            'name_col': name_col,
+            'athletes': sorted(gender_df[name_col].dropna().unique()) if name_col else [],
+            'date_col': date_col,
+            'ref_ranges': ref_ranges,
+            'ranges_key': content_key(ref_ranges),
+            # 所有可用的数值指标（没有数值列时使用默认的TREND_INDICATORS），选项标签附带测试次数；
+            # 尚未读取的辅助sheet中的指标也列出（不带次数），选中后再读取
+            'indicators': list(dict.fromkeys(
+                catalog_indicators(pipeline['catalog'], gender) + pipeline['book'].pending_indicators()
+            )),
+            'indicator_label': coverage_label(pipeline['catalog'], gender),
+            # 运动员索引：每人的数据段、最新一行、最近4次测试（切换运动员只是查表）
+            'index': AthleteIndex(gender_df, name_col, date_col) if name_col else None,
+        }
+        # 视图中的性别数据拷贝和运动员索引也计入本会话的数据集大小
+        DATASETS.register(session_owner(), pipeline['dataset_key'], pipeline)
+    return views[gender]
+
+
+def athlete_data(view, athlete_name):
+    """某名运动员按日期排序的数据（运动员索引中的一段，不做筛选和拷贝）"""
+    return view['index'].athlete_df(athlete_name)
+
+
+def make_ctx(pipeline, gender, athlete_name, prebuild_hd):
+    """各选项卡共用的上下文（当前数据集、性别视图、运动员及其数据）"""
+    view = gender_view(pipeline, gender)
+    return {
+        'pipeline': pipeline,
+        'dataset_key': pipeline['dataset_key'],
+        'gender': gender,
+        'view': view,
+        'athlete_name': athlete_name,
+        'athlete_df': athlete_data(view, athlete_name),
+        'latest_df': view['index'].latest_row(athlete_name),    # 主题表格只用最新一次测试
+        'recent_df': view['index'].last_tests(athlete_name),    # 雷达图只用最近4次测试
+        'ref_ranges': view['ref_ranges'],
+        'ranges_key': view['ranges_key'],
+        'prebuild_hd': prebuild_hd,
+    }
 
-    if not date_col_found:
-        df['Date_auto'] = pd.date_range(start='2024-01-01', periods=len(df), freq='D')
-        df['DateStr'] = df['Date_auto'].dt.strftime('%Y-%m-%d')
 
-    # 最终清理
-    df = df.dropna(how='all')
-    df = df.reset_index(drop=True)
+def require_indicators(ctx, indicators):
+    """
+    indicators 中有指标在尚未读取的辅助sheet里时，读取并合并这些sheet，然后就地刷新 ctx
 
-    st.success(f"✅ 清洗完成：保留 {len(df)} 行有效数据")
+    各选项卡共用同一个 ctx，一个选项卡触发读取后，其他选项卡随后也使用新数据。
+    """
+    pipeline = ctx['pipeline']
+    if pipeline.evicted:
+        st.rerun()   # 数据集因内存超限被淘汰，整页重新运行时从上传的文件重新加载
+    sheets = pipeline['book'].sheets_for(indicators)
+    if sheets:
+        with st.spinner(f"正在读取 {'、'.join(sheets)}..."):
+            pipeline['book'].load(sheets)
+    if sync_pipeline(pipeline):
+        ctx.update(make_ctx(pipeline, ctx['gender'], ctx['athlete_name'], ctx['prebuild_hd']))
 
-    return df
 
-# ========== 辅助函数 ==========
+# ========== 选项卡（每个选项卡是独立的 fragment，操作选项卡内控件只重新运行该选项卡）==========
 
-def get_indicator_status(indicator, value, ref_ranges, gender=None):
-    """判断指标状态（五档）- 完全修复版
-    
-    参数:
-    - indicator: 指标名称
-    - value: 指标值
-    - ref_ranges: 参考范围字典
-    - gender: 性别（'男'或'女'），可选，用于铁蛋白特殊评价
+def holding_pipeline(func):
     """
-    # 先检查是否为NaN
-    if indicator not in ref_ranges or pd.isna(value):
-        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
-    
-    # 🔧 修复1：转换value为数值类型
-    try:
-        if isinstance(value, str):
-            value = value.strip()
-            if value == '' or value == '-' or value.lower() == 'nan':
-                return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
-            value = float(value)
-        elif not isinstance(value, (int, float)):
-            value = float(value)
-    except (ValueError, TypeError):
-        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
-
-    ranges = ref_ranges[indicator]
-    
-    # ⭐ 新增：检查是否为空字典（不评价的指标）
-    if not ranges or len(ranges) == 0:
-        return '-', COLOR_NORMAL, 'N/A'
-    
-    # 🔧 修复2：确保参考范围值也是数值类型
-    try:
-        low_1 = ranges.get('low_1')
-        low_2 = ranges.get('low_2')
-        high_2 = ranges.get('high_2')
-        high_1 = ranges.get('high_1')
-        
-        # 转换参考范围值为浮点数
-        if low_1 is not None and not isinstance(low_1, (int, float)):
-            low_1 = float(low_1) if not pd.isna(low_1) else None
-        if low_2 is not None and not isinstance(low_2, (int, float)):
-            low_2 = float(low_2) if not pd.isna(low_2) else None
-        if high_2 is not None and not isinstance(high_2, (int, float)):
-            high_2 = float(high_2) if not pd.isna(high_2) else None
-        if high_1 is not None and not isinstance(high_1, (int, float)):
-            high_1 = float(high_1) if not pd.isna(high_1) else None
-    except (ValueError, TypeError):
-        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
-
-    # 高优指标列表（高于正常范围是好事）
-    high_is_better_indicators = ['铁蛋白', '血红蛋白', '睾酮', '游离睾酮']
-    
-    # ⭐ 新增：偏高不评价的指标列表（偏高时返回"正常"）
-    no_high_evaluation_indicators = ['维生素B1', '维生素B2','维生素B12']
-    
-    # ⭐ 新增：铁蛋白特殊处理 - 过高需要注意
-    if indicator == '铁蛋白' and gender:
-        if (gender == '男' and value > 300) or (gender == '女' and value > 200):
-            return '需注意', '#FFA500', 'attention_needed'  # 橙色
-
-    # 🔧 修复3：判断状态时添加异常保护
-    try:
-        if pd.notna(low_1) and value < low_1:
-            return '严重偏低', COLOR_SEVERE_LOW, 'severe_low'
-        elif pd.notna(low_2) and value < low_2:
-            return '偏低', COLOR_LOW, 'low'
-        elif pd.notna(high_1) and value > high_1:
-            # ⭐ 修改：如果是不评价偏高的指标，返回"-"
-            if indicator in no_high_evaluation_indicators:
-                return '-', COLOR_NORMAL, 'N/A'
-            elif indicator in high_is_better_indicators:
-                return '优秀', COLOR_EXCELLENT, 'excellent'  # 使用绿色
-            else:
-                return '严重偏高', COLOR_SEVERE_HIGH, 'severe_high'
-        elif pd.notna(high_2) and value > high_2:
-            # ⭐ 修改：如果是不评价偏高的指标，返回"-"
-            if indicator in no_high_evaluation_indicators:
-                return '-', COLOR_NORMAL, 'N/A'
-            elif indicator in high_is_better_indicators:
-                return '良好', COLOR_GOOD, 'good'  # 使用绿色
-            else:
-                return '偏高', COLOR_HIGH, 'high'
-        else:
-            return '正常', COLOR_NORMAL, 'normal'
-    except (TypeError, ValueError):
-        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
+    选项卡片段运行期间持有会话数据集（内存超限被淘汰时，数据在运行结束后才释放）；
+    数据集已被释放时整页重新运行，从上传的文件重新加载
+    """
+    @functools.wraps(func)
+    def wrapper(ctx, *args, **kwargs):
+        pipeline = ctx.get('pipeline')
+        if pipeline is None:
+            st.rerun()
+        with pipeline.in_use():
+            if pipeline.released:
+                st.rerun()
+            return func(ctx, *args, **kwargs)
+    return wrapper
+
+
+@st.fragment
+@holding_pipeline
+@profiled
+def theme_tab(ctx):
+    st.subheader("最新数据主题表格")
+    st.markdown("显示最新一次测试的各项指标，使用五档判断")
+
+    athlete_name, gender = ctx['athlete_name'], ctx['gender']
+    if st.button("🚀 生成主题表格", type="primary", use_container_width=True):
+        require_indicators(ctx, THEME_INDICATORS)
+        with st.spinner("正在生成表格..."):
+
+            for theme_name, categories in THEME_CONFIG.items():
+                st.markdown(f"<h2 style='margin-bottom: {TITLE_TABLE_SPACING}em;font-size: {FONTSIZE_MAIN_TITLE}px;'>{theme_name.split('_')[-1]}</h3>", unsafe_allow_html=True)
+                fig_key = theme_figure_key(ctx['dataset_key'], gender, athlete_name, theme_name, ctx['ranges_key'])
+                shown = show_figure(
+                    fig_key,
+                    lambda theme_name=theme_name, categories=categories: plot_theme_table(
+                        ctx['latest_df'], theme_name, categories, ctx['ref_ranges'], gender
+                    )[0],
+                    f"{athlete_name}_{theme_name}.png",
+                    ctx['prebuild_hd']
+                )
+                if not shown:
+                    st.info(f"ℹ️ {theme_name} 数据不足")
+
+            st.success("✅ 表格生成完成！")
+
+
+@st.fragment
+@holding_pipeline
+@profiled
+def trend_tab(ctx):
+    st.subheader("多运动员趋势对比")
+    st.markdown("可以选择多个运动员和日期范围进行对比")
+
+    view, gender = ctx['view'], ctx['gender']
+    gender_df, date_col, ref_ranges = view['gender_df'], view['date_col'], view['ref_ranges']
+
+    # 选择对比运动员
+    compare_athletes = st.multiselect(
+        "选择对比运动员（可多选）",
+        view['athletes'],
+        default=[ctx['athlete_name']],
+        help="选择要对比的运动员"
+    )
 
+    # 日期范围选择
+    if date_col in gender_df.columns:
+        min_date = gender_df[date_col].min()
+        max_date = gender_df[date_col].max()
+
+        date_range = st.date_input(
+            "选择日期范围",
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date,
+            help="选择要分析的日期范围"
+        )
+    else:
+        date_range = None
+
+    # 选择指标
+    # 默认选择：优先使用TREND_INDICATORS中存在于数据的指标，都没有时使用前3个
+    default_trend = default_trend_indicators(view['indicators'])
+
+    selected_indicators = st.multiselect(
+        "选择要分析的指标",
+        view['indicators'],
+        default=default_trend,
+        format_func=view['indicator_label'],
+        help="选择要绘制趋势图的指标（可选择所有数值指标）"
+    )
 
-def format_number(val):
-    """智能格式化数值，保留完整小数位但去除尾部0"""
-    if pd.isna(val):
-        return "—"
-    try:
-        val = float(val)
-        # 如果是整数，直接显示整数
-        if val == int(val):
-            return f"{int(val)}"
-        # 否则保留原始精度，但去除尾部0
-        # 先格式化为字符串，保留足够精度
-        formatted = f"{val:.10f}".rstrip('0').rstrip('.')
-        return formatted
-    except (ValueError, TypeError):
-        return "—"
-
-
-# 指标别名映射（用于处理常见的名称差异）
-INDICATOR_ALIASES = {
-    # 红细胞指标
-    '平均红细胞血红蛋白浓度': ['平均红细胞血红浓度', 'MCHC', '平均血红蛋白浓度'],
-    '平均红细胞血红蛋白': ['平均红细胞血红蛋白量', 'MCH'],
-    '平均红细胞体积': ['平均红细胞容积', 'MCV'],
-    '平均红细胞容积': ['平均红细胞体积', 'MCV'],
-    '平均血红蛋白浓度': ['平均红细胞血红蛋白浓度', 'MCHC'],
-    '网织红细胞百分比': ['网织红细胞', 'retic', 'Retic'],
-    
-    # 炎症指标
-    '超敏C反应蛋白': ['C反应蛋白', 'CRP', 'hsCRP', 'hs-CRP'],
-    
-    # 维生素指标（季度测试）
-    '维生素B1': ['VB1', 'VitB1'],
-    '维生素B2': ['VB2', 'VitB2'],
-    '维生素B6（PA）': ['VB6', 'VitB6', 'VitB6(PA)', 'B6'],  # ⭐ 修改
-    '维生素B6（PLP）': ['vitB6（PLP）', 'VitB6(PLP)', 'B6(PLP)'],  # ⭐ 新增
-    '维生素B12': ['VB12', 'VitB12'],
-    '叶酸': ['FOL', '维生素B9'],
-    '维生素D3': ['VD3', 'VD3(25-OH)', 'VD-(25-OH)'],
-    
-    # 电解质（季度测试）
-    '钾': ['K'],
-    '钠': ['Na'],
-    '氯': ['Cl'],
-    '钙': ['Ca'],
-    '镁': ['Mg'],
-    
-    # 甲状腺功能（年度测试）
-    '总甲状腺素': ['T4', 'TT4'],
-    '总三碘甲状腺原氨酸': ['T3', 'TT3'],
-    '游离三碘甲状原氨酸': ['FT3', '游离T3'],
-    '游离甲状腺素': ['FT4', '游离T4'],
-    '超敏促甲状腺素': ['TSH', 'hs-TSH', '促甲状腺激素'],
-    
-    # 肝功能（年度测试）
-    '丙氨酸氨基转移酶': ['ALT', '谷丙转氨酶', '丙氨酸基转移酶'],
-    '天冬氨酸氨基转移酶': ['AST', '谷草转氨酶'],
-    '碱性磷酸酶': ['ALP'],
-    'γ-谷氨酰基转移酶': ['GGT', 'γ-GT', 'γ-谷氨酰转移酶'],
-    '总胆红素': ['TBIL', 'TB'],
-    '直接胆红素': ['DBIL', 'DB'],
-    '间接胆红素': ['IBIL', 'IB'],
-    '总蛋白': ['TP'],
-    '白蛋白': ['ALB', 'Alb'],
-    
-    # 血脂（年度测试）
-    '甘油三酯': ['TG', 'TAG'],
-    '高密度脂蛋白': ['HDL', 'HDL-C'],
-    '总胆固醇': ['TC', 'CHOL'],
-    '低密度脂蛋白': ['LDL', 'LDL-C'],
-}
-
-def find_indicator_column(df, indicator):
-    """智能查找指标列（支持带#的列名、模糊匹配、别名匹配）"""
-
-    # ⭐ 特殊处理：重要指标优先精确匹配（避免匹配到.1后缀的重复列）
-    PRIORITY_INDICATORS = ['睾酮', '游离睾酮', '皮质醇', '睾酮/皮质醇比值']
-    if indicator in PRIORITY_INDICATORS:
-        # 优先精确匹配
-        if indicator in df.columns:
-            return indicator
-        # 如果没有精确匹配，再尝试带#后缀的
-        for col in df.columns:
-            col_str = str(col)
-            if col_str.startswith(indicator):
-                suffix = col_str[len(indicator):]
-                if suffix.startswith('#'):  # 只允许#后缀，不允许.数字
-                    return col
-
-    # 方法1：精确匹配
-    if indicator in df.columns:
-        return indicator
-
-    # 方法2：别名匹配
-    # 先查找是否有直接的别名定义
-    if indicator in INDICATOR_ALIASES:
-        for alias in INDICATOR_ALIASES[indicator]:
-            if alias in df.columns:
-                return alias
-            # 也尝试前缀匹配别名
-            possible_cols = [col for col in df.columns if str(col).startswith(alias)]
-            if possible_cols:
-                return possible_cols[0]
-
-    # 反向查找：indicator是否是某个别名
-    for main_name, aliases in INDICATOR_ALIASES.items():
-        if indicator in aliases:
-            # 尝试匹配主名称
-            if main_name in df.columns:
-                return main_name
-            possible_cols = [col for col in df.columns if str(col).startswith(main_name)]
-            if possible_cols:
-                return possible_cols[0]
-            # 尝试匹配其他别名
-            for alias in aliases:
-                if alias in df.columns:
-                    return alias
-                possible_cols = [col for col in df.columns if str(col).startswith(alias)]
-                if possible_cols:
-                    return possible_cols[0]
-
-    # 方法3：前缀匹配（处理带#的列名）
-    possible_cols = [col for col in df.columns if str(col).startswith(indicator)]
-    if possible_cols:
-        return possible_cols[0]
-
-    # 方法4：去除空格后匹配
-    indicator_no_space = indicator.replace(' ', '').replace('\u3000', '')
-    for col in df.columns:
-        col_no_space = str(col).replace(' ', '').replace('\u3000', '')
-        if col_no_space == indicator_no_space:
-            return col
-        if col_no_space.startswith(indicator_no_space):
-            return col
-
-    # 方法5：部分匹配（宽松匹配）
-    for col in df.columns:
-        col_str = str(col)
-        col_base = col_str.split('#')[0]  # 去除#后缀
-
-        # 如果指标名是列名的子串
-        if indicator in col_str or indicator in col_base:
-            return col
-
-        # 如果列名是指标名的子串
-        if col_base in indicator:
-            return col
-
-    # 方法6：关键词匹配（最宽松）
-    import re
-    indicator_clean = re.sub(r'[（(].*?[）)]', '', indicator)  # 去除括号及内容
-    indicator_clean = indicator_clean.strip()
-
-    for col in df.columns:
-        col_str = str(col).split('#')[0]  # 去除#后缀
-        col_clean = re.sub(r'[（(].*?[）)]', '', col_str)
-        col_clean = col_clean.strip()
-
-        # 如果清理后的名称相同
-        if indicator_clean == col_clean:
-            return col
-
-        # 如果指标名包含在列名中，或列名包含在指标名中
-        if indicator_clean in col_clean or col_clean in indicator_clean:
-            return col
-
-    # 方法7：模糊匹配（允许1-2个字符不同）
-    # 例如："平均红细胞血红浓度" vs "平均红细胞血红蛋白浓度"
-    for col in df.columns:
-        col_str = str(col).split('#')[0].strip()
-        # 去除括号内容后比较
-        col_clean = re.sub(r'[（(].*?[）)]', '', col_str).strip()
-        indicator_clean_v2 = re.sub(r'[（(].*?[）)]', '', indicator).strip()
-
-        # 如果长度相近（差距在3个字符以内）
-        if abs(len(col_clean) - len(indicator_clean_v2)) <= 3:
-            # 计算相似度：有多少个字符是相同的
-            common_chars = sum(1 for c in indicator_clean_v2 if c in col_clean)
-            similarity = common_chars / max(len(indicator_clean_v2), len(col_clean))
-
-            # 如果相似度超过80%，认为匹配
-            if similarity >= 0.8:
-                return col
-
-    return None
-
-# ========== 图表生成函数 ==========
-
-def plot_theme_table(athlete_df, theme_name, categories, ref_ranges, gender):
-    """生成主题表格图 - 支持中英文双行显示"""
-    if athlete_df.empty:
-        return None, []
-
-    latest_row = athlete_df.iloc[-1]
-    latest_date = latest_row.get('DateStr', '未知')
-    athlete_name = latest_row.get('Name', latest_row.get('Name_final', '未知'))
-
-    cell_text = []
-    cell_colors = []
-    missing_indicators = []  # 记录缺失的指标
-
-    # 状态中英文对照（包含优秀、良好等）
-    status_translation = {
-        '严重偏低': ('严重偏低', 'Severely Low'),
-        '偏低': ('偏低', 'Low'),
-        '正常': ('正常', 'Normal'),
-        '良好': ('良好', 'Good'),
-        '偏高': ('偏高', 'High'),
-        '优秀': ('优秀', 'Excellent'),
-        '严重偏高': ('严重偏高', 'Severely High'),
-        '需注意': ('需注意', ' Attention'),
-        '-': ('—', '—'),  # 无数据或未找到
-        'N/A': ('—', '—'),  # 保留兼容
-        '未找到': ('—', '—'),  # 保留兼容
-    }
+    trend_mode = st.radio(
+        "图表类型",
+        ["交互图（浏览器渲染）", "静态图（PNG）"],
+        horizontal=True,
+        help="交互图可在浏览器中直接缩放、平移、悬停查看数值，点击图例可切换运动员；静态图适合截图导出"
+    )
 
-    # ⭐ 新增：格式化分类标题为多行显示
-    def format_category_title(title):
-        """
-        将分类标题拆分为多行：
-        输入："免疫防御（炎性监控）\nImmune Defense (Inflammatory Monitoring)"
-        输出："免疫防御\nImmune Defense\n(Inflammatory Monitoring)"  ← 用英文括号！
-        """
-        lines = title.split('\n')
-        if len(lines) != 2:
-            return title  # 格式不对，保持原样
-        
-        cn_line = lines[0]  # 中文行：免疫防御（炎性监控）
-        en_line = lines[1]  # 英文行：Immune Defense (Inflammatory Monitoring)
-        
-        # 提取中文主体（去掉中文括号部分）
-        import re
-        cn_match = re.match(r'(.+?)（.+?）', cn_line)
-        if cn_match:
-            cn_main = cn_match.group(1)  # 免疫防御
-        else:
-            cn_main = cn_line
-        
-        # 提取英文主体和括号内容
-        en_match = re.match(r'(.+?)\s*\((.+?)\)', en_line)
-        if en_match:
-            en_main = en_match.group(1).strip()  # Immune Defense
-            en_paren = en_match.group(2)  # Inflammatory Monitoring ← 用英文！
-            # 有括号：3行，括号内容用英文
-            return f"{cn_main}\n{en_main}\n({en_paren})"
+    smoothing_mode = st.selectbox(
+        "曲线平滑方式",
+        list(SMOOTHING_MODES.keys()),
+        index=list(SMOOTHING_MODES.keys()).index(DEFAULT_SMOOTHING_MODE),
+        format_func=lambda m: SMOOTHING_MODES[m],
+        help="测试次数很多时，二次样条会自动改用单调三次插值；平滑结果会缓存，数据不变时不会重复计算"
+    )
+
+    if st.button("🚀 生成趋势对比图", type="primary", use_container_width=True):
+        if not compare_athletes:
+            st.warning("⚠️ 请至少选择一个运动员")
+        elif not selected_indicators:
+            st.warning("⚠️ 请至少选择一个指标")
         else:
-            # 无括号：2行
-            return f"{cn_main}\n{en_line}"
-
-    for category_title, indicators in categories.items():
-        # ⭐ 格式化分类标题为多行
-        formatted_title = format_category_title(category_title)
-        # 添加分类标题行（4列）- 居中对齐
-        cell_text.append([formatted_title, '', '', ''])
-        cell_colors.append([COLOR_CATEGORY_HEADER, COLOR_CATEGORY_HEADER, COLOR_CATEGORY_HEADER, COLOR_CATEGORY_HEADER])
-
-        for col_key, name_tuple in indicators.items():
-            # name_tuple是(中文名, 英文名)
-            cn_name, en_name = name_tuple
-            
-            # 普通指标处理（包括睾酮/皮质醇比值）
-            # 查找实际的列名
-            actual_col = find_indicator_column(athlete_df, col_key)
-
-            # 获取正常范围
-            range_str = "—"
-            if col_key in ref_ranges:
-                ranges = ref_ranges[col_key]
-                low_2 = ranges.get('low_2')
-                high_2 = ranges.get('high_2')
-
-                if pd.notna(low_2) and pd.notna(high_2):
-                    # 两个值都存在，显示范围
-                    range_str = f"{format_number(low_2)}-{format_number(high_2)}"
-                elif pd.notna(low_2):
-                    # 只有下限
-                    range_str = f"≥{format_number(low_2)}"
-                elif pd.notna(high_2):
-                    # 只有上限
-                    range_str = f"≤{format_number(high_2)}"
-
-            if actual_col and actual_col in latest_row.index:
-                val = latest_row[actual_col]
-                
-                if pd.notna(val):
-                    # 🔧 处理带<或>符号的值
-                    val_str_raw = str(val).strip()
-                    
-                    # ⭐ 特殊处理：保留<或>符号
-                    if val_str_raw.startswith('<') or val_str_raw.startswith('>') or val_str_raw.startswith('＜') or val_str_raw.startswith('＞'):
-                        val_str = val_str_raw  # 直接使用原始字符串
-                        # 尝试提取数值进行评价
-                        try:
-                            num_str = val_str_raw.lstrip('<>＜＞').strip()
-                            val_num = float(num_str)
-                            status, bg_color, _ = get_indicator_status(col_key, val_num, ref_ranges, gender)
-                        except:
-                            status = "-"
-                            bg_color = COLOR_NORMAL
-                    else:
-                        # 正常数值处理
-                        try:
-                            val = float(val)
-                            # ⭐ 特殊处理：睾酮/皮质醇比值保留4位小数
-                            if col_key == '睾酮/皮质醇比值':
-                                val_str = f"{val:.4f}"
-                            elif abs(val) >= 1000:
-                                val_str = f"{val:.0f}"
-                            elif abs(val) >= 100:
-                                val_str = f"{val:.1f}"
-                            else:
-                                val_str = f"{val:.2f}"
-                            status, bg_color, _ = get_indicator_status(col_key, val, ref_ranges, gender)
-                        except (ValueError, TypeError):
-                            val_str = "—"
-                            status = "-"
-                            bg_color = COLOR_NORMAL
+            require_indicators(ctx, selected_indicators)
+            view, ref_ranges = ctx['view'], ctx['view']['ref_ranges']
+            with st.spinner("正在生成趋势图..."):
+                # 用运动员索引二分查找出日期窗口，后面各指标不再对整张表做布尔筛选
+                if date_range and len(date_range) == 2:
+                    window_df = view['index'].between(compare_athletes, *date_range)
                 else:
-                    val_str = "—"
-                    status = "-"  # 无数据显示为"-"
-                    bg_color = COLOR_NORMAL  # ⭐ 改为COLOR_NORMAL
-            else:
-                val_str = "—"
-                status = "-"  # 未找到显示为"-"
-                bg_color = COLOR_NORMAL  # ⭐ 改为COLOR_NORMAL
-                missing_indicators.append((col_key, f"{cn_name}/{en_name}"))
-
-            # 构建双行文本
-            indicator_text = f"{cn_name}\n{en_name}"
-            # 如果status是"-"，直接显示"-"，否则查询翻译
-            if status == "-":
-                status_text = "—"
-            else:
-                status_cn, status_en = status_translation.get(status, (status, status))
-                status_text = f"{status_cn}\n{status_en}"
-            
-            cell_text.append([indicator_text, val_str, range_str, status_text])
-            cell_colors.append([COLOR_NORMAL, bg_color, COLOR_NORMAL, bg_color])  # ⭐ 改为COLOR_NORMAL
-
-    # 创建图表（4列，高清晰度）
-    fig_height = len(cell_text) * 0.9 + 1.5  # 增加行高以容纳双行文本
-    fig, ax = plt.subplots(figsize=(10, fig_height), dpi=150)
-    ax.axis('off')
-
-    # 列宽设置：保持原来的比例
-    col_widths = [0.45, 0.18, 0.18, 0.19]  # 不改变列宽
-    table = ax.table(
-        cellText=cell_text,
-        colLabels=['检测指标\nIndicator', '结果\nResult', '参考范围\nReference', '评价\nEvaluation'],
-        cellColours=cell_colors,
-        loc='center',
-        cellLoc='center',
-        colColours=[COLOR_TABLE_HEADER] * 4,
-        colWidths=col_widths
+                    window_df = view['index'].between(compare_athletes)
+                for indicator in selected_indicators:
+                    st.markdown(f"### {indicator}")
+                    if trend_mode.startswith("交互图"):
+                        records = build_trend_series(window_df, indicator, compare_athletes, None)
+                        if records:
+                            spec = build_trend_vega_spec(records, indicator, ref_ranges, compare_athletes, gender,
+                                                         smoothing_mode)
+                            st.vega_lite_chart(spec, use_container_width=True)
+                        else:
+                            st.info(f"ℹ️ {indicator} 数据不足")
+                        continue
+
+                    fig_key = trend_figure_key(ctx['dataset_key'], gender, indicator, compare_athletes,
+                                               date_range, smoothing_mode, view['ranges_key'])
+                    shown = show_figure(
+                        fig_key,
+                        lambda indicator=indicator: plot_trend_chart_multi(
+                            window_df, indicator, ref_ranges,
+                            compare_athletes, None, gender,
+                            smoothing=smoothing_mode
+                        ),
+                        f"{indicator.replace('/', '_')}_趋势.png",
+                        ctx['prebuild_hd']
+                    )
+                    if not shown:
+                        st.info(f"ℹ️ {indicator} 数据不足")
+
+                st.success("✅ 趋势图生成完成！")
+
+
+@st.fragment
+@holding_pipeline
+@profiled
+def radar_tab(ctx):
+    view, gender, athlete_name = ctx['view'], ctx['gender'], ctx['athlete_name']
+    gender_df, name_col, date_col = view['gender_df'], view['name_col'], view['date_col']
+    ref_ranges, athletes = view['ref_ranges'], view['athletes']
+
+    st.subheader(f"{athlete_name}的机能状态雷达图")
+    st.markdown(f"显示**{athlete_name}**最近4次测试的Z-Score雷达图")
+
+    # 说明Z-Score计算方式
+    st.info("💡 **Z-Score计算说明**：使用对比运动员组的数据作为基准，计算该运动员相对于组内的表现")
+
+    # 选择对比运动员组（用于计算baseline）
+    radar_athletes = st.multiselect(
+        "选择对比运动员组（用于计算Z-Score基准）",
+        athletes,
+        default=[athlete_name],
+        help="选择的运动员将作为基准组，用于计算Z-Score的均值和标准差",
+        key="radar_athletes"
     )
 
-    table.auto_set_font_size(False)
-    table.set_fontsize(FONTSIZE_VALUE)
-    table.scale(1, TABLE_ROW_HEIGHT)  # 增加行高比例
-    
-    # 将分类标题颜色转换为RGB元组用于比较
-    from matplotlib.colors import to_rgba
-    category_color_rgba = to_rgba(COLOR_CATEGORY_HEADER)
-    
-    # 🔍 调试信息
-    print(f"\n🎨 表格颜色调试信息:")
-    print(f"   目标颜色: {COLOR_CATEGORY_HEADER}")
-    print(f"   转换后: RGBA{category_color_rgba}")
-    
-    category_cell_count = 0  # 统计找到的分类标题单元格数量
-
-    # 样式设置
-    for (r, c), cell in table.get_celld().items():
-        if r == 0:  # 表头
-            cell.set_text_props(weight='bold', color='black', fontsize=FONTSIZE_HEADER)  # 黑色文字
-            cell.set_edgecolor('#DDDDDD')  # 灰色边框
-        else:
-            # 获取当前单元格颜色（RGBA元组）
-            cell_color = cell.get_facecolor()
-            # 比较RGB值（忽略alpha通道）
-            is_category = (abs(cell_color[0] - category_color_rgba[0]) < 0.01 and
-                          abs(cell_color[1] - category_color_rgba[1]) < 0.01 and
-                          abs(cell_color[2] - category_color_rgba[2]) < 0.01)
-            
-            if is_category:  # 分类标题
-                category_cell_count += 1
-                # ⭐ 分类标题：淡灰色边框（保留表格结构）
-                cell.set_edgecolor('#DDDDDD')  # 淡灰边框
-                cell.set_linewidth(1)          # 正常线宽
-                
-                if c == 0:  # 第一列：显示多行文字，居中
-                    cell.set_text_props(weight='bold', color='black', ha='center', va='center', fontsize=FONTSIZE_CATEGORY)
-                else:  # 其他列：隐藏文本
-                    cell.set_text_props(visible=False)
-                    # ⭐ 其他列的背景也设为分类标题颜色，确保整行一致
-                    cell.set_facecolor(COLOR_CATEGORY_HEADER)
-            else:  # 数据行
-                cell.set_edgecolor('#DDDDDD')
-                if r > 0 and c == 0:  # 指标名称列，左对齐
-                    cell.set_text_props(ha='left', fontsize=FONTSIZE_INDICATOR)
-                elif r > 0 and c in [1, 2]:  # 数值和范围列，较小字体
-                    cell.set_text_props(fontsize=FONTSIZE_VALUE)
-                elif r > 0 and c == 3:  # 评价列
-                    cell.set_text_props(fontsize=FONTSIZE_STATUS)
-    
-    # 🔍 输出统计
-    print(f"   找到分类标题单元格: {category_cell_count} 个")
-    print(f"   预期数量: {len([k for k in cell_colors if k[0] == COLOR_CATEGORY_HEADER]) * 4}")
-
-    # 获取中英文标题
-    if theme_name in CATEGORY_NAMES:
-        cn_title, en_title = CATEGORY_NAMES[theme_name]
-        title_text = f"{athlete_name} ({gender}) - {cn_title}\n{en_title} ({latest_date})"
-    else:
-        theme_display = theme_name.split('_')[-1]
-        title_text = f"{athlete_name} ({gender}) - {theme_display} ({latest_date})"
-    
-    # 一级标题：使用配置的字体大小，最小间距
-    ax.set_title(title_text, fontsize=FONTSIZE_MAIN_TITLE, weight='bold', pad=2)
-
-    plt.tight_layout()
-
-    return fig, missing_indicators
-
-def plot_trend_chart_multi(df, indicator, ref_ranges, selected_athletes, date_range, gender):
-    """绘制多运动员对比趋势图"""
-
-    # 查找实际的列名
-    actual_col = find_indicator_column(df, indicator)
-    if not actual_col:
-        return None
-
-    # 筛选日期范围
-    if date_range and len(date_range) == 2:
-        # 将date转换为datetime64以匹配df['Date']的类型
-        start_date = pd.to_datetime(date_range[0])
-        end_date = pd.to_datetime(date_range[1])
-        df_filtered = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)].copy()
-    else:
-        df_filtered = df.copy()
-
-    if df_filtered.empty:
-        return None
-
-    # 获取名字列
-    name_col = 'Name' if 'Name' in df_filtered.columns else 'Name_final'
-
-    # 只保留有该指标数据的日期
-    df_with_indicator = df_filtered[df_filtered[actual_col].notna()].copy()
-
-    if df_with_indicator.empty:
-        return None
-
-    # 获取所有选中运动员中有数据的日期（去重排序）
-    dates_with_data = set()
-    for athlete in selected_athletes:
-        athlete_data = df_with_indicator[df_with_indicator[name_col] == athlete]
-        if not athlete_data.empty:
-            dates_with_data.update(athlete_data['DateStr'].unique())
-
-    # 如果没有任何数据，返回None
-    if not dates_with_data:
-        return None
-
-    # 排序日期
-    all_dates = sorted(list(dates_with_data))
-    date_to_index = {date: i for i, date in enumerate(all_dates)}
-
-    fig, ax = plt.subplots(figsize=(12, 7), dpi=150)
-    ax.set_facecolor(COLOR_CHART_BG)
-
-    # 协调配色列表（用于多运动员曲线）
-    harmonious_colors = [
-        '#4A90E2',  # 深海蓝
-        '#D05A5E',  # 深砖红
-        '#8BC1E9',  # 浅天蓝
-        '#E89A9D',  # 浅柔红
-        '#5C7CFA',  # 靛蓝
-        '#9B59B6',  # 紫色
-        '#1ABC9C',  # 青绿
-        '#E67E22',  # 深橙
-    ]
-
-    # 确保有足够的颜色
-    if len(selected_athletes) > len(harmonious_colors):
-        colors = plt.cm.tab10(np.linspace(0, 1, len(selected_athletes)))
-    else:
-        colors = [harmonious_colors[i % len(harmonious_colors)] for i in range(len(selected_athletes))]
-
-    # 先收集所有y值，用于确定范围
-    all_y_values = []
-    
-    # 绘制每个运动员的数据
-    for idx, (athlete, color) in enumerate(zip(selected_athletes, colors)):
-        athlete_data = df_with_indicator[df_with_indicator[name_col] == athlete].copy()
-
-        if athlete_data.empty:
-            continue
-
-        athlete_data = athlete_data.sort_values('Date')
-        valid_data = athlete_data.dropna(subset=[actual_col])
-
-        if len(valid_data) == 0:
-            continue
-
-        x_data = np.array([date_to_index[d] for d in valid_data['DateStr']])
-        y_data = valid_data[actual_col].values
-        all_y_values.extend(y_data)
-
-        # 绘制平滑曲线
-        if len(valid_data) > 1:
-            try:
-                x_smooth = np.linspace(x_data.min(), x_data.max(), 200)
-                k = 2 if len(x_data) >= 3 else 1
-                spl = make_interp_spline(x_data, y_data, k=k)
-                y_smooth = spl(x_smooth)
-                ax.plot(x_smooth, y_smooth, color=color, linewidth=2.5, label=athlete, alpha=0.8)
-            except:
-                ax.plot(x_data, y_data, color=color, linewidth=2.5, label=athlete, alpha=0.8)
-        else:
-            ax.plot(x_data, y_data, color=color, linewidth=2.5, label=athlete, linestyle='--', alpha=0.6)
-
-        # 绘制数据点
-        ax.plot(x_data, y_data, marker='o', markersize=8, markerfacecolor='white',
-                markeredgecolor=color, markeredgewidth=2, linestyle='None')
-        
-        # 只为主运动员（第一个运动员）标注数据值
-        if idx == 0:
-            for x, y in zip(x_data, y_data):
-                ax.text(x, y, f'{y:.1f}', 
-                       fontsize=9, ha='center', va='bottom',
-                       color=color, fontweight='bold',
-                       bbox=dict(boxstyle='round,pad=0.3', facecolor='white', 
-                                edgecolor=color, alpha=0.8, linewidth=1))
-
-    # 在绘制数据后，添加理想范围标记
-    if indicator in ref_ranges and len(all_y_values) > 0:
-        ranges = ref_ranges[indicator]
-        low_2 = ranges.get('low_2')
-        high_2 = ranges.get('high_2')
-        
-        # 获取实际数据范围
-        data_min = min(all_y_values)
-        data_max = max(all_y_values)
-        y_range = data_max - data_min
-        
-        # 情况1：同时有上下限（完整范围）
-        if pd.notna(low_2) and pd.notna(high_2):
-            ax.axhspan(low_2, high_2, color='#4A90E2', alpha=0.15, zorder=0, label='理想范围')
-            ax.axhline(low_2, color=COLOR_SEVERE_LOW, linestyle=':', linewidth=1, alpha=0.7)
-            ax.axhline(high_2, color=COLOR_SEVERE_HIGH, linestyle=':', linewidth=1, alpha=0.7)
-        
-        # 情况2：只有上限（如 < 300）
-        elif pd.notna(high_2) and not pd.notna(low_2):
-            # 从0或数据最小值往下一点开始
-            y_min = min(0, data_min - y_range * 0.1)
-            ax.axhspan(y_min, high_2, color='#4A90E2', alpha=0.15, zorder=0, label=f'理想范围 (< {high_2})')
-            ax.axhline(high_2, color=COLOR_SEVERE_HIGH, linestyle=':', linewidth=1.5, alpha=0.7)
-        
-        # 情况3：只有下限（如 > 50）
-        elif pd.notna(low_2) and not pd.notna(high_2):
-            # 到数据最大值往上一点
-            y_max = data_max + y_range * 0.1
-            ax.axhspan(low_2, y_max, color='#4A90E2', alpha=0.15, zorder=0, label=f'理想范围 (> {low_2})')
-            ax.axhline(low_2, color=COLOR_SEVERE_LOW, linestyle=':', linewidth=1.5, alpha=0.7)
-
-    # 设置坐标轴 - 只显示有数据的日期
-    ax.set_xticks(np.arange(len(all_dates)))
-    ax.set_xticklabels(all_dates, rotation=45, ha='right')
-
-    plt.title(f"{indicator} 趋势对比 ({gender})", fontsize=14, fontweight='bold')
-    plt.xlabel('测试日期', fontsize=12)
-    plt.ylabel(f'{indicator}', fontsize=12)
-    plt.grid(axis='y', linestyle='--', alpha=0.5)
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-
-    # 图例
-    plt.legend(loc='upper left', bbox_to_anchor=(1.01, 1), frameon=True)
-    plt.tight_layout()
-
-    return fig
-
-def plot_radar_chart_with_baseline(athlete_df, radar_fields, lower_is_better, ref_ranges, athlete_name, baseline_athletes_df, gender):
-    """
-    绘制单个运动员的雷达图（最近4次测试）
-
-    参数：
-    - athlete_df: 主运动员的数据
-    - radar_fields: 雷达图指标列表
-    - lower_is_better: 逆指标列表
-    - ref_ranges: 参考范围
-    - athlete_name: 主运动员姓名
-    - baseline_athletes_df: 用于计算baseline的所有运动员数据（包括主运动员）
-    - gender: 性别
-    """
-    if athlete_df.empty:
-        return None
-
-    # 获取主运动员的最近4次数据
-    last_4_dates = athlete_df['DateStr'].unique()[-4:]
-    if len(last_4_dates) == 0:
-        return None
-
-    # 计算baseline统计值：使用对比运动员组的最近4次数据
-    # 这样可以看到主运动员相对于对比组的表现
-    baseline_stats = {}
-
-    for field in radar_fields:
-        actual_col = find_indicator_column(baseline_athletes_df, field)
-        if actual_col:
-            col_data = baseline_athletes_df[actual_col].dropna()
-            if len(col_data) >= 2:
-                baseline_stats[field] = {'mu': col_data.mean(), 'sigma': col_data.std()}
-            else:
-                baseline_stats[field] = {'mu': col_data.mean() if len(col_data) > 0 else 0, 'sigma': 1}
-        else:
-            baseline_stats[field] = {'mu': 0, 'sigma': 1}
+    # 选择雷达图指标
+    # 默认选择：优先使用RADAR_FIELDS中存在于数据的指标，都没有时使用前8个
+    default_radar = default_radar_indicators(view['indicators'])
 
-    # 计算Z-score范围（用于设置坐标轴）
-    athlete_z_scores = []
-    for date in last_4_dates:
-        date_row = athlete_df[athlete_df['DateStr'] == date]
-        if date_row.empty:
-            continue
+    radar_indicators = st.multiselect(
+        "选择雷达图指标",
+        view['indicators'],
+        default=default_radar,
+        format_func=view['indicator_label'],
+        help="选择要在雷达图中显示的指标（建议4-10个，可选择所有数值指标）"
+    )
 
-        for field in radar_fields:
-            actual_col = find_indicator_column(date_row, field)
-            stats = baseline_stats.get(field)
+    # 选择逆指标（值越低越好的指标）
+    st.markdown("**逆指标设置**（值越低越好的指标）")
+    lower_better = st.multiselect(
+        "选择逆指标",
+        radar_indicators,
+        default=[ind for ind in LOWER_IS_BETTER if ind in radar_indicators],
+        format_func=view['indicator_label'],
+        help="这些指标在雷达图中会取反（如肌酸激酶、血尿素等）"
+    )
 
-            if not stats or stats['sigma'] == 0:
-                z = 0
-            else:
-                if actual_col and actual_col in date_row.columns:
-                    val = date_row[actual_col].values[0]
-                    if pd.notna(val):
-                        z = (val - stats['mu']) / stats['sigma']
-                    else:
-                        z = 0
-                else:
-                    z = 0
-
-            if field in lower_is_better:
-                z = -z
-            athlete_z_scores.append(z)
-
-    max_abs_z = max([abs(z) for z in athlete_z_scores]) if athlete_z_scores else 0
-    limit = max(3, np.ceil(max_abs_z * 2) / 2)
-
-    # 设置标签
-    labels = [f + ('\n(逆)' if f in lower_is_better else '') for f in radar_fields]
-    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-    angles += angles[:1]
-
-    # 创建图表（高清晰度）
-    fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(polar=True), dpi=150)
-    plt.ylim(-limit - 1.0, limit)
-
-    # 绘制零线
-    ax.plot(angles, [0] * len(angles), color='red', linewidth=2, linestyle='--', zorder=0.5)
-
-    # ========== 绘制正常范围（浅绿色背景）==========
-    normal_range_lower = []
-    normal_range_upper = []
-    
-    for field in radar_fields:
-        if field in ref_ranges:
-            ranges = ref_ranges[field]
-            low_2 = ranges.get('low_2')  # 正常范围下限
-            high_2 = ranges.get('high_2')  # 正常范围上限
-            stats = baseline_stats.get(field)
-            
-            if stats and stats['sigma'] != 0:
-                # ⭐ 修复：分别处理下限和上限
-                # 计算下限
-                if pd.notna(low_2):
-                    z_lower = (low_2 - stats['mu']) / stats['sigma']
-                else:
-                    z_lower = -2.5  # 没有下限，使用较小值
-                
-                # 计算上限
-                if pd.notna(high_2):
-                    z_upper = (high_2 - stats['mu']) / stats['sigma']
-                else:
-                    z_upper = 2.5  # 没有上限，使用较大值
-                
-                # 如果是逆指标，取反
-                if field in lower_is_better:
-                    z_lower, z_upper = -z_upper, -z_lower
-                
-                normal_range_lower.append(z_lower)
-                normal_range_upper.append(z_upper)
-            else:
-                # 没有统计数据，使用默认值
-                normal_range_lower.append(-1)
-                normal_range_upper.append(1)
+    if st.button("🚀 生成雷达图", type="primary", use_container_width=True, key="radar_btn"):
+        if not radar_athletes:
+            st.warning("⚠️ 请至少选择一个对比运动员")
+        elif not radar_indicators:
+            st.warning("⚠️ 请至少选择一个指标")
+        elif len(radar_indicators) < 3:
+            st.warning("⚠️ 请至少选择3个指标，雷达图效果更好")
         else:
-            # 没有参考范围，使用默认值
-            normal_range_lower.append(-1)
-            normal_range_upper.append(1)
-    
-    # 闭合多边形
-    normal_range_lower.append(normal_range_lower[0])
-    normal_range_upper.append(normal_range_upper[0])
-    
-    # 绘制理想范围区域（浅绿色填充）
-    ax.fill_between(angles, normal_range_lower, normal_range_upper, 
-                     color='#90EE90', alpha=0.2, zorder=1, label='理想范围')
-    
-    # 绘制理想范围边界线
-    ax.plot(angles, normal_range_lower, color='#32CD32', linewidth=1.5, 
-            linestyle=':', alpha=0.6, zorder=1)
-    ax.plot(angles, normal_range_upper, color='#32CD32', linewidth=1.5, 
-            linestyle=':', alpha=0.6, zorder=1)
-
-    # 选择样式 - 最近4次测试
-    styles = RADAR_STYLES[-len(last_4_dates):]
-
-    # 绘制主运动员的最近4次数据
-    for i, date in enumerate(last_4_dates):
-        date_row = athlete_df[athlete_df['DateStr'] == date]
-        if date_row.empty:
-            continue
-
-        values = []
-        for field in radar_fields:
-            actual_col = find_indicator_column(date_row, field)
-            stats = baseline_stats.get(field)
-
-            if not stats or stats['sigma'] == 0:
-                z = 0
-            else:
-                if actual_col and actual_col in date_row.columns:
-                    val = date_row[actual_col].values[0]
-                    if pd.notna(val):
-                        z = (val - stats['mu']) / stats['sigma']
+            require_indicators(ctx, radar_indicators)
+            view = ctx['view']
+            gender_df = view['gender_df']
+            with st.spinner("正在生成雷达图..."):
+                # 对比运动员组的基准（每人最近4次数据）按数据集+性别缓存，
+                # 切换主运动员或重复生成时不再重新筛选、拼接、计算
+                baseline_cache = get_baseline_cache(
+                    ctx['dataset_key'], gender, gender_df, name_col,
+                    date_col=date_col, window=BASELINE_WINDOW,
+                    exclude_cols=BASELINE_EXCLUDE_COLS
+                )
+
+                if baseline_cache.has_data(radar_athletes):
+                    radar_cols = [find_indicator_column(gender_df, f) for f in radar_indicators]
+                    baseline_stats = baseline_cache.stats_for(radar_athletes, radar_cols)
+
+                    # 生成雷达图：只画主运动员的近4次，但用对比组的基准计算Z值
+                    fig_key = radar_figure_key(ctx['dataset_key'], gender, athlete_name, radar_indicators,
+                                               lower_better, radar_athletes, view['ranges_key'])
+                    shown = show_figure(
+                        fig_key,
+                        lambda: plot_radar_chart_with_baseline(
+                            ctx['recent_df'], radar_indicators, lower_better,
+                            ref_ranges, athlete_name, None, gender,
+                            baseline_stats=baseline_stats
+                        ),
+                        f"{athlete_name}_雷达图.png",
+                        ctx['prebuild_hd']
+                    )
+
+                    if shown:
+                        st.success("✅ 雷达图生成完成！")
+
+                        # 添加说明
+                        st.markdown("---")
+                        st.markdown("### 📖 雷达图说明")
+                        st.markdown(f"""
+                        - **显示内容**：{athlete_name}的最近4次测试
+                        - **对比基准**：使用{len(radar_athletes)}个运动员的最近4次数据计算均值和标准差
+                        - **Z-Score含义**：
+                          - **0**：等于基准组平均水平
+                          - **正值**：高于基准组平均水平
+                          - **负值**：低于基准组平均水平
+                        - **逆指标**：标记"(逆)"的指标已取反显示（值越低越好）
+                        - **线条样式**：
+                          - 蓝色虚点线：第1次测试
+                          - 橙色点划线：第2次测试
+                          - 绿色虚线：第3次测试
+                          - 红色实线+填充：第4次测试（最新）
+                        - **解读要点**：图形越向外，表现越好；图形越规则，机能越均衡
+                        """)
                     else:
-                        z = 0
+                        st.info("ℹ️ 数据不足，无法生成雷达图")
                 else:
-                    z = 0
+                    st.warning("⚠️ 对比运动员组没有足够的数据")
 
-            if field in lower_is_better:
-                z = -z
-            values.append(z)
-
-        values.append(values[0])
-        style = styles[i]
+    # === 全组雷达图画廊 ===
+    st.markdown("---")
+    st.markdown("### 🖼️ 全组雷达图画廊")
+    st.markdown("一次生成整组运动员的雷达图缩略图，使用同一个对比组基准，多进程并行渲染")
+
+    gallery_scope = st.radio(
+        "画廊范围",
+        ["对比运动员组", f"全部{gender}运动员"],
+        horizontal=True,
+        key="gallery_scope"
+    )
 
-        ax.plot(angles, values, color=style['color'], linewidth=style['linewidth'],
-                linestyle=style['linestyle'], label=date, zorder=2)
+    if st.button("🖼️ 生成雷达图画廊", use_container_width=True, key="gallery_btn"):
+        gallery_athletes = radar_athletes if gallery_scope == "对比运动员组" else athletes
+        if not radar_athletes:
+            st.warning("⚠️ 请至少选择一个对比运动员")
+        elif len(radar_indicators) < 3:
+            st.warning("⚠️ 请至少选择3个指标，雷达图效果更好")
+        elif not gallery_athletes:
+            st.warning("⚠️ 没有可显示的运动员")
+        else:
+            require_indicators(ctx, radar_indicators)
+            view = ctx['view']
+            gender_df = view['gender_df']
+            baseline_cache = get_baseline_cache(
+                ctx['dataset_key'], gender, gender_df, name_col,
+                date_col=date_col, window=BASELINE_WINDOW,
+                exclude_cols=BASELINE_EXCLUDE_COLS
+            )
+            radar_cols = [find_indicator_column(gender_df, f) for f in radar_indicators]
+            baseline_stats = baseline_cache.stats_for(radar_athletes, radar_cols)
+
+            # 先按运动员顺序占好位置，哪张先渲染完就先显示哪张
+            grid = st.columns(GALLERY_COLUMNS)
+            slots = {a: grid[i % GALLERY_COLUMNS].empty() for i, a in enumerate(gallery_athletes)}
+            for slot in slots.values():
+                slot.caption("⏳ 渲染中...")
+
+            progress = st.progress(0.0)
+            done = 0
+            for athlete, png, error in render_radar_gallery(
+                gallery_athletes, gender_df, name_col, date_col,
+                radar_indicators, lower_better, ref_ranges, gender, baseline_stats,
+                index=view['index']
+            ):
+                if png:
+                    slots[athlete].image(png, caption=str(athlete), use_container_width=True)
+                elif error:
+                    slots[athlete].warning(f"{athlete}：渲染失败（{error}）")
+                else:
+                    slots[athlete].info(f"{athlete}：数据不足")
+                done += 1
+                progress.progress(done / len(gallery_athletes))
 
-        # 最新一次填充
-        if i == len(last_4_dates) - 1:
-            ax.fill(angles, values, color=style['color'], alpha=0.15, zorder=3)
+            st.success(f"✅ 画廊生成完成：{len(gallery_athletes)} 名运动员")
 
-    # 设置坐标轴
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(labels, size=11)
 
-    # 数值刻度
-    step = 1 if limit <= 3 else 2
-    z_ticks = np.arange(-int(limit), int(limit) + 1, step)
-    ax.set_yticks(z_ticks)
-    ax.set_yticklabels([f'{i:.0f}' for i in z_ticks], color='grey', size=10)
+@st.fragment
+@holding_pipeline
+@profiled
+def data_tab(ctx):
+    athlete_df, athlete_name = ctx['athlete_df'], ctx['athlete_name']
 
-    plt.title(f"{athlete_name} ({gender}) - 机能状态 Z-Score 雷达图",
-              fontsize=16, y=1.08, fontweight='bold')
-    plt.legend(loc='upper right', bbox_to_anchor=(1.3, 1.1))
+    st.subheader("完整数据表")
+    st.write(to_dense(athlete_df))
 
-    plt.tight_layout()
+    try:
+        csv = athlete_df.to_csv(index=False, encoding='utf-8-sig', date_format='%Y-%m-%d')
+        st.download_button(
+            label="📥 下载CSV数据",
+            data=csv,
+            file_name=f"{athlete_name}_数据.csv",
+            mime="text/csv"
+        )
+    except:
+        st.warning("CSV下载功能暂时不可用")
+
+
+def timing_panel():
+    """侧边栏性能诊断：各阶段耗时汇总（本会话最近的计时记录），可导出为 JSON lines"""
+    st.sidebar.markdown("**⏱️ 各阶段耗时**")
+    summary = summarize_spans()
+    if len(summary) == 0:
+        st.sidebar.caption("暂无计时记录")
+        return
+    st.sidebar.dataframe(summary, hide_index=True, use_container_width=True)
+    st.sidebar.caption("整页刷新时更新；选项卡内的操作在下次整页刷新时计入")
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        st.download_button(
+            "📥 导出",
+            data=spans_jsonl(),
+            file_name="timing_spans.jsonl",
+            mime="application/jsonl",
+            on_click="ignore",
+            use_container_width=True
+        )
+    with col2:
+        if st.button("🧹 清空", use_container_width=True):
+            clear_spans()
+            st.rerun()
 
-    return fig
 
 # ========== 主应用 ==========
 
-def main():
+@profiled
+def main(run):
+    """run: 本次运行的 ExitStack，运行结束时退出（释放对会话数据集的持有）"""
+    if not check_password():
+        st.stop()
+
     st.title("🏃 运动员血液指标分析系统")
     st.markdown("**包含：表格图、多运动员趋势对比、雷达图**")
     st.markdown("---")
@@ -1739,46 +892,59 @@ def main():
             key="ranges_file"
         )
 
+    st.sidebar.markdown("---")
+    prebuild_hd = st.sidebar.checkbox(
+        "后台预生成高清图",
+        value=False,
+        help="页面先显示低分辨率预览；勾选后在后台提前生成高清版，点击下载时无需等待"
+    )
+    prerender = st.sidebar.checkbox(
+        "上传后后台预渲染",
+        value=True,
+        help="数据加载完成后，在后台按默认选项提前生成所有运动员的主题表格、趋势图和雷达图预览，当前运动员优先"
+    )
+    show_timing = st.sidebar.checkbox(
+        "⏱️ 性能诊断",
+        value=False,
+        help="在侧边栏显示数据读取、合并、清洗、绘图和图片缓存各阶段的耗时与缓存命中情况"
+    )
+
     if uploaded_file is None:
         st.info("👈 请在左侧上传Excel数据文件")
         st.stop()
 
-    # === 加载参考范围 ===
-    if use_custom_ranges and custom_ranges_file is not None:
-        with st.spinner("正在加载自定义参考范围..."):
-            male_ref_ranges, female_ref_ranges = load_reference_ranges_from_excel(custom_ranges_file)
-            if male_ref_ranges and female_ref_ranges:
-                st.sidebar.success(f"✅ 已加载自定义范围（男:{len(male_ref_ranges)}项，女:{len(female_ref_ranges)}项）")
-            else:
-                st.sidebar.warning("⚠️ 自定义范围加载失败，使用默认范围")
-                male_ref_ranges = MALE_REF_RANGES
-                female_ref_ranges = FEMALE_REF_RANGES
-    else:
-        # 使用默认范围
-        male_ref_ranges = MALE_REF_RANGES
-        female_ref_ranges = FEMALE_REF_RANGES
-        if not use_custom_ranges:
-            st.sidebar.info("ℹ️ 使用默认参考范围")
-
-    # === 数据加载 ===
-    with st.spinner("正在加载数据..."):
-        df = load_data_multisheet(uploaded_file)
+    # === 参考范围 + 数据加载（文件不变时直接复用上次结果）===
+    pipeline = load_pipeline(uploaded_file, custom_ranges_file)
+    if pipeline is None:
+        st.stop()
+    run.enter_context(pipeline.in_use())   # 运行期间被其他会话淘汰时，数据在运行结束后才释放
+    if pipeline.released:
+        st.rerun()
+    sync_pipeline(pipeline)   # 上一次运行中读入了辅助sheet（例如导出PDF、后台预渲染）时刷新视图
 
-        if df is None:
-            st.stop()
+    if pipeline['ranges_status'] is not None:
+        level, message = pipeline['ranges_status']
+        getattr(st.sidebar, level)(message)
+    elif not use_custom_ranges:
+        st.sidebar.info("ℹ️ 使用默认参考范围")
 
-        df = clean_data_final(df)
-
-        if df is None or len(df) == 0:
-            st.error("❌ 数据清洗后为空")
-            st.stop()
+    dataset_key = pipeline['dataset_key']
+    df = pipeline['df']
+    male_ref_ranges, female_ref_ranges = pipeline['male_ref_ranges'], pipeline['female_ref_ranges']
 
     st.success(f"🎉 数据准备完成：共 {len(df)} 条记录")
+    pending = [sheet for sheet in AUX_SHEETS if sheet not in pipeline['sheets']]
+    if pending:
+        st.caption(f"ℹ️ {'、'.join(pending)} 将在用到其中的指标时读取")
 
     # === 数据预览 ===
     with st.expander("👀 查看数据"):
         st.write("**前20行：**")
-        st.write(df.head(20))
+        st.write(to_dense(df.head(20)))
+
+    with st.expander("📚 指标目录"):
+        st.caption("每个指标的数据类型、各性别的测试次数、首次/最近测试日期和所属主题")
+        st.dataframe(pipeline['catalog'], use_container_width=True)
 
     st.markdown("---")
 
@@ -1789,29 +955,20 @@ def main():
         gender = st.selectbox("选择性别", ["男", "女"])
 
     # 筛选性别
-    if '性别' in df.columns:
-        gender_df = df[df['性别'] == gender].copy()
-    else:
+    if '性别' not in df.columns:
         st.warning("⚠️ 数据中没有'性别'列")
-        gender_df = df.copy()
+    view = gender_view(pipeline, gender)
 
-    if len(gender_df) == 0:
+    if len(view['gender_df']) == 0:
         st.warning(f"⚠️ 没有{gender}运动员的数据")
         st.stop()
 
     # 获取运动员列表
-    name_col = None
-    for possible_name in ['Name_final', 'Name', '姓名']:
-        if possible_name in gender_df.columns:
-            name_col = possible_name
-            break
-
-    if not name_col:
+    if not view['name_col']:
         st.error("❌ 未找到姓名列")
         st.stop()
 
-    athletes = sorted(gender_df[name_col].dropna().unique())
-    ref_ranges = male_ref_ranges if gender == "男" else female_ref_ranges
+    athletes = view['athletes']
 
     with col2:
         athlete_name = st.selectbox(
@@ -1821,234 +978,88 @@ def main():
         )
 
     # 筛选运动员数据
-    athlete_df = gender_df[gender_df[name_col] == athlete_name].copy()
-
-    date_col = 'Date' if 'Date' in athlete_df.columns else 'Date_auto'
-    if date_col in athlete_df.columns:
-        athlete_df = athlete_df.sort_values(date_col)
+    athlete_df = athlete_data(view, athlete_name)
 
     st.info(f"📊 **{athlete_name}**（{gender}）- 共 {len(athlete_df)} 次测试")
 
-    st.markdown("---")
+    # === 后台预渲染（上传新文件、更换参考范围或读入了预渲染之外的sheet时取消旧任务，切换运动员时让其优先）===
+    prerender_id = (pipeline['id'], content_key(male_ref_ranges, female_ref_ranges))
+    job = st.session_state.get('prerender_job')
+    if job is not None and (not prerender or st.session_state.get('prerender_id') != prerender_id
+                            or job.cancelled or prerender_outdated(job, pipeline)):
+        job.cancel()
+        job = st.session_state['prerender_job'] = None
+    if prerender:
+        if job is None:
+            job = start_prerender(pipeline, (gender, athlete_name))
+            st.session_state['prerender_job'] = job
+            st.session_state['prerender_id'] = prerender_id
+        else:
+            job.prioritize((gender, athlete_name))
+        if job.preparing:
+            st.sidebar.caption("⏳ 后台预渲染：正在读取主题表格用到的sheet…")
+        elif job.running:
+            st.sidebar.caption(f"⏳ 后台预渲染：{job.done}/{job.total}")
+        else:
+            st.sidebar.caption(f"✅ 预渲染完成：{job.done} 张")
 
-    # === 获取所有可用的数值指标 ===
-    # 排除非指标列
-    exclude_cols = ['Name', 'Name_final', '姓名', 'Date', 'Date_auto', '日期', 'DateStr', 
-                    '性别', 'Gender', '编号', 'ID', 'Unnamed: 0']
-    all_numeric_indicators = []
-    for col in gender_df.columns:
-        if col not in exclude_cols:
-            # 检查是否是数值列
-            try:
-                if gender_df[col].dtype in ['float64', 'int64'] or pd.to_numeric(gender_df[col], errors='coerce').notna().any():
-                    all_numeric_indicators.append(col)
-            except:
-                pass
-    
-    # 如果没有找到数值列，使用默认的TREND_INDICATORS
-    if not all_numeric_indicators:
-        all_numeric_indicators = TREND_INDICATORS
+    # === PDF报告导出（点击下载时才生成，页面在后台进程中并行构建）===
+    with st.expander("📄 导出PDF报告"):
+        st.caption("包含主题表格、雷达图和重点指标趋势图；全队报告人数多时需要较长时间")
+        pdf_col1, pdf_col2 = st.columns(2)
+        with pdf_col1:
+            st.download_button(
+                f"📥 {athlete_name} 的PDF报告",
+                data=lambda: squad_pdf_file(
+                    prepare_squad(full_data(pipeline), male_ref_ranges, female_ref_ranges),
+                    athletes=[athlete_name], title=f"{athlete_name} 血液指标报告"
+                ),
+                file_name=f"{athlete_name}_血液指标报告.pdf",
+                mime="application/pdf",
+                on_click="ignore",
+                use_container_width=True,
+                key=f"pdf_{dataset_key}_{athlete_name}"
+            )
+        with pdf_col2:
+            st.download_button(
+                "📥 全队PDF报告",
+                data=lambda: squad_pdf_file(prepare_squad(full_data(pipeline), male_ref_ranges, female_ref_ranges)),
+                file_name="全队血液指标报告.pdf",
+                mime="application/pdf",
+                on_click="ignore",
+                use_container_width=True,
+                key=f"pdf_{dataset_key}_team"
+            )
+
+    st.markdown("---")
 
     # === 功能选项卡 ===
+    ctx = make_ctx(pipeline, gender, athlete_name, prebuild_hd)
+    pipeline.on_release('ctx', ctx.clear)   # 片段保存着 ctx，数据集释放时一并清空
     tab1, tab2, tab3, tab4 = st.tabs(["📋 主题表格", "📈 趋势对比", "🎯 雷达图", "📊 数据表"])
 
     # --- Tab 1: 主题表格 ---
     with tab1:
-        st.subheader("最新数据主题表格")
-        st.markdown("显示最新一次测试的各项指标，使用五档判断")
-
-        if st.button("🚀 生成主题表格", type="primary", use_container_width=True):
-            with st.spinner("正在生成表格..."):
-
-                for theme_name, categories in THEME_CONFIG.items():
-                    st.markdown(f"<h2 style='margin-bottom: {TITLE_TABLE_SPACING}em;font-size: {FONTSIZE_MAIN_TITLE}px;'>{theme_name.split('_')[-1]}</h3>", unsafe_allow_html=True)
-                    result = plot_theme_table(athlete_df, theme_name, categories, ref_ranges, gender)
-
-                    if result:
-                        fig, missing = result
-                        if fig:
-                            st.pyplot(fig)
-                            plt.close()
-                        else:
-                            st.info(f"ℹ️ {theme_name} 数据不足")
-                    else:
-                        st.info(f"ℹ️ {theme_name} 数据不足")
-
-                st.success("✅ 表格生成完成！")
+        theme_tab(ctx)
 
     # --- Tab 2: 趋势对比 ---
     with tab2:
-        st.subheader("多运动员趋势对比")
-        st.markdown("可以选择多个运动员和日期范围进行对比")
-
-        # 选择对比运动员
-        compare_athletes = st.multiselect(
-            "选择对比运动员（可多选）",
-            athletes,
-            default=[athlete_name],
-            help="选择要对比的运动员"
-        )
-
-        # 日期范围选择
-        if date_col in gender_df.columns:
-            min_date = gender_df[date_col].min()
-            max_date = gender_df[date_col].max()
-
-            date_range = st.date_input(
-                "选择日期范围",
-                value=(min_date, max_date),
-                min_value=min_date,
-                max_value=max_date,
-                help="选择要分析的日期范围"
-            )
-        else:
-            date_range = None
-
-        # 选择指标
-        # 构建默认选择：优先使用TREND_INDICATORS中存在于数据的指标
-        default_trend = [ind for ind in TREND_INDICATORS if ind in all_numeric_indicators]
-        if not default_trend and all_numeric_indicators:
-            # 如果TREND_INDICATORS中的指标都不在数据中，使用前3个
-            default_trend = all_numeric_indicators[:3] if len(all_numeric_indicators) >= 3 else all_numeric_indicators
-        
-        selected_indicators = st.multiselect(
-            "选择要分析的指标",
-            all_numeric_indicators,
-            default=default_trend,
-            help="选择要绘制趋势图的指标（可选择所有数值指标）"
-        )
-
-        if st.button("🚀 生成趋势对比图", type="primary", use_container_width=True):
-            if not compare_athletes:
-                st.warning("⚠️ 请至少选择一个运动员")
-            elif not selected_indicators:
-                st.warning("⚠️ 请至少选择一个指标")
-            else:
-                with st.spinner("正在生成趋势图..."):
-                    for indicator in selected_indicators:
-                        st.markdown(f"### {indicator}")
-                        fig = plot_trend_chart_multi(
-                            gender_df, indicator, ref_ranges,
-                            compare_athletes, date_range, gender
-                        )
-                        if fig:
-                            st.pyplot(fig)
-                            plt.close()
-                        else:
-                            st.info(f"ℹ️ {indicator} 数据不足")
-
-                    st.success("✅ 趋势图生成完成！")
+        trend_tab(ctx)
 
     # --- Tab 3: 雷达图 ---
     with tab3:
-        st.subheader(f"{athlete_name}的机能状态雷达图")
-        st.markdown(f"显示**{athlete_name}**最近4次测试的Z-Score雷达图")
-
-        # 说明Z-Score计算方式
-        st.info("💡 **Z-Score计算说明**：使用对比运动员组的数据作为基准，计算该运动员相对于组内的表现")
-
-        # 选择对比运动员组（用于计算baseline）
-        radar_athletes = st.multiselect(
-            "选择对比运动员组（用于计算Z-Score基准）",
-            athletes,
-            default=[athlete_name],
-            help="选择的运动员将作为基准组，用于计算Z-Score的均值和标准差",
-            key="radar_athletes"
-        )
-
-        # 选择雷达图指标
-        # 构建默认选择：优先使用RADAR_FIELDS中存在于数据的指标
-        default_radar = [ind for ind in RADAR_FIELDS if ind in all_numeric_indicators]
-        if not default_radar and all_numeric_indicators:
-            # 如果RADAR_FIELDS中的指标都不在数据中，使用前8个
-            default_radar = all_numeric_indicators[:8] if len(all_numeric_indicators) >= 8 else all_numeric_indicators
-        
-        radar_indicators = st.multiselect(
-            "选择雷达图指标",
-            all_numeric_indicators,
-            default=default_radar,
-            help="选择要在雷达图中显示的指标（建议4-10个，可选择所有数值指标）"
-        )
-
-        # 选择逆指标（值越低越好的指标）
-        st.markdown("**逆指标设置**（值越低越好的指标）")
-        lower_better = st.multiselect(
-            "选择逆指标",
-            radar_indicators,
-            default=[ind for ind in LOWER_IS_BETTER if ind in radar_indicators],
-            help="这些指标在雷达图中会取反（如肌酸激酶、血尿素等）"
-        )
-
-        if st.button("🚀 生成雷达图", type="primary", use_container_width=True, key="radar_btn"):
-            if not radar_athletes:
-                st.warning("⚠️ 请至少选择一个对比运动员")
-            elif not radar_indicators:
-                st.warning("⚠️ 请至少选择一个指标")
-            elif len(radar_indicators) < 3:
-                st.warning("⚠️ 请至少选择3个指标，雷达图效果更好")
-            else:
-                with st.spinner("正在生成雷达图..."):
-                    # 获取对比运动员组的最近4次数据（用于计算baseline）
-                    baseline_data_list = []
-                    for comp_athlete in radar_athletes:
-                        comp_athlete_df = gender_df[gender_df[name_col] == comp_athlete].sort_values('Date')
-                        if not comp_athlete_df.empty:
-                            # 获取该运动员的最近4次数据
-                            last_4 = comp_athlete_df.tail(4)
-                            baseline_data_list.append(last_4)
-
-                    if baseline_data_list:
-                        baseline_df = pd.concat(baseline_data_list, ignore_index=True)
-
-                        # 生成雷达图：只画主运动员的近4次，但用baseline_df计算Z值
-                        fig = plot_radar_chart_with_baseline(
-                            athlete_df, radar_indicators, lower_better,
-                            ref_ranges, athlete_name, baseline_df, gender
-                        )
-
-                        if fig:
-                            st.pyplot(fig)
-                            plt.close()
-                            st.success("✅ 雷达图生成完成！")
-
-                            # 添加说明
-                            st.markdown("---")
-                            st.markdown("### 📖 雷达图说明")
-                            st.markdown(f"""
-                            - **显示内容**：{athlete_name}的最近4次测试
-                            - **对比基准**：使用{len(radar_athletes)}个运动员的最近4次数据计算均值和标准差
-                            - **Z-Score含义**：
-                              - **0**：等于基准组平均水平
-                              - **正值**：高于基准组平均水平
-                              - **负值**：低于基准组平均水平
-                            - **逆指标**：标记"(逆)"的指标已取反显示（值越低越好）
-                            - **线条样式**：
-                              - 蓝色虚点线：第1次测试
-                              - 橙色点划线：第2次测试
-                              - 绿色虚线：第3次测试
-                              - 红色实线+填充：第4次测试（最新）
-                            - **解读要点**：图形越向外，表现越好；图形越规则，机能越均衡
-                            """)
-                        else:
-                            st.info("ℹ️ 数据不足，无法生成雷达图")
-                    else:
-                        st.warning("⚠️ 对比运动员组没有足够的数据")
+        radar_tab(ctx)
 
     # --- Tab 4: 数据表 ---
     with tab4:
-        st.subheader("完整数据表")
-        st.write(athlete_df)
+        data_tab(ctx)
 
-        try:
-            csv = athlete_df.to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label="📥 下载CSV数据",
-                data=csv,
-                file_name=f"{athlete_name}_数据.csv",
-                mime="text/csv"
-            )
-        except:
-            st.warning("CSV下载功能暂时不可用")
+    if show_timing:
+        timing_panel()
+    if st.session_state.get('is_admin'):
+        profile_panel()
+        memory_panel()
 
 if __name__ == "__main__":
-    main()
+    with contextlib.ExitStack() as run:
+        main(run)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准（不使用真实运动员数据）
+
+    python -m benchmarks.synthetic 测试.xlsx --athletes 50 --dates 24   # 生成合成Excel
+    python -m benchmarks.bench_pipeline --scales small,medium           # 数据读取/清洗 + 绘图各阶段计时
+    python -m benchmarks.bench_indicators                               # 指标列查找、状态判断的扩展性
+    python -m benchmarks.bench_render                                   # 图表渲染计时 + 图像哈希回归检查
+
+结果写成 JSON（benchmarks/results/，已加入 .gitignore），用 --compare 与之前的结果对比。
+在仓库根目录运行（需要导入 config 和 blood_engine）。
+"""
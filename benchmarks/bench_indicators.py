@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+指标列查找和状态判断的扩展性基准（不读Excel，只用列名和随机数值）
+
+    python -m benchmarks.bench_indicators                               # 默认 50,100,250,500,1000 列
+    python -m benchmarks.bench_indicators --columns 100,1000 --values 1000000
+    python -m benchmarks.bench_indicators --compare benchmarks/results/indicators-旧.json
+
+- 列查找：列名为基本信息列 + '扩展指标NNN' 填充列 + 真实指标列（部分带 '#' 后缀、部分用别名），
+  填充列放在真实指标列之前，命中需要先扫过填充列。每种情况（精确、别名、'#'后缀、模糊、找不到）
+  分别计时：逐列扫描（无缓存，即原来的 find_indicator_column）、find_indicator_column（缓存已建立）、
+  列名相同的另一个子表（按列名内容命中缓存）、首次查找（清空缓存）和 find_indicator_columns
+  （全部情况一次查找）。结果写出每次调用的微秒数。
+- 状态判断：每条规则路径一列随机数值（覆盖各档），对比逐个调用 get_indicator_status 与
+  indicator_status_codes（整列向量化），结果写出每百万个值的毫秒数。
+
+find_indicator_columns 和 indicator_status_codes 是本文件中的批量候选实现（界面和报告逐个指标、
+逐个值调用，引擎中没有用到整列判断）。两种实现的结果逐个对比，不一致时报错退出（基准同时是正确性检查）。
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from config import MALE_REF_RANGES, FEMALE_REF_RANGES
+from blood_engine import get_indicator_status, find_indicator_column
+from blood_engine import indicators as indicators_module
+from blood_engine.indicators import HIGH_IS_BETTER_INDICATORS, NO_HIGH_EVALUATION_INDICATORS, FERRITIN_ATTENTION
+
+from .harness import (
+    summarize, measure, write_results, load_results, compare_results, print_comparison
+)
+
+COLUMN_COUNTS = [50, 100, 250, 500, 1000]
+BASIC_COLUMNS = ['项目', '编号', '姓名', '性别', '出生年月日', '身高', '体重', '测试日期', 'Name_final', 'Date_auto']
+# 真实指标列（'#'后缀和别名列名是原始Excel中常见的写法）
+INDICATOR_COLUMNS = [
+    '睾酮#1', '游离睾酮#1', '皮质醇', '睾酮/皮质醇比值', '肌酸激酶', '血糖', '血尿素', '尿酸', '肌酐',
+    '血红蛋白', '红细胞', '红细胞压积', '网织红细胞百分比', 'MCV', '平均红细胞血红蛋白量',
+    '平均红细胞血红蛋白浓度', '铁蛋白', '白细胞', '血小板', '超敏C反应蛋白', '渗透压',
+    '维生素B1', '维生素B2', '维生素B6（PA）', '维生素B12', '叶酸', '维生素D', '钾', '钠', '氯', '钙', '镁',
+    '甘油三酯', 'HDL-C', '总胆固醇', 'LDL-C', '触珠蛋白', '肌红蛋白', 'CYS-C',
+]
+# 情况 -> (要查找的指标, 应找到的列)
+LOOKUP_CASES = {
+    'exact': ('总胆固醇', '总胆固醇'),
+    'alias': ('高密度脂蛋白', 'HDL-C'),
+    'hash_suffix': ('睾酮', '睾酮#1'),
+    'fuzzy': ('超敏C反映蛋白', '超敏C反应蛋白'),
+    'miss': ('同型半胱氨酸', None),
+}
+
+# 规则路径 -> (指标, 性别, 数值生成方式)
+STATUS_PATHS = {
+    'two_sided': ('总胆固醇', '男', 'numeric'),
+    'ferritin_male': ('铁蛋白', '男', 'numeric'),
+    'ferritin_female': ('铁蛋白', '女', 'numeric'),
+    'high_is_better': ('睾酮', '男', 'numeric'),
+    'no_high_evaluation': ('维生素B12', '男', 'numeric'),
+    'mixed_text': ('肌酸激酶', '女', 'mixed'),
+    'no_range': ('同型半胱氨酸', '男', 'numeric'),
+}
+TEXT_SAMPLES = ['', '-', ' nan ', 'NaN', '-nan', '<5', '阴性', None]
+
+
+# ========== 批量候选实现 ==========
+
+def find_indicator_columns(df, indicators):
+    """一组指标的列名（与 indicators 对齐，找不到为 None），结果与逐个调用 find_indicator_column 相同"""
+    columns = df.columns if hasattr(df, 'columns') else pd.Index(df)
+    found = None
+    result = []
+    for indicator in indicators:
+        if indicator in columns:
+            result.append(indicator)
+            continue
+        if found is None:
+            found = indicators_module._column_lookups(columns)
+        result.append(indicators_module._cached_column(found, columns, indicator))
+    return result
+
+
+def _status_value(value):
+    """单个值 → (能否评价, 数值)，规则与 get_indicator_status 开头的转换相同"""
+    if pd.isna(value):
+        return False, np.nan
+    try:
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '' or value == '-' or value.lower() == 'nan':
+                return False, np.nan
+        return True, float(value)
+    except (ValueError, TypeError):
+        return False, np.nan
+
+
+def _status_bounds(ranges):
+    """参考范围 → (low_1, low_2, high_2, high_1)，缺失为 NaN；无法转换时返回 None"""
+    bounds = []
+    for key in ('low_1', 'low_2', 'high_2', 'high_1'):
+        bound = ranges.get(key)
+        try:
+            bounds.append(np.nan if bound is None or pd.isna(bound) else float(bound))
+        except (ValueError, TypeError):
+            return None
+    return bounds
+
+
+def indicator_status_codes(indicator, values, ref_ranges, gender=None):
+    """
+    一个指标一列值的状态代码（numpy 对象数组，与 values 等长）
+
+    结果与对每个值调用 get_indicator_status 得到的第三项相同。
+    数值列直接向量化比较；文本/混合列先对去重后的值做与 get_indicator_status 相同的转换。
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(series.dtype, pd.SparseDtype):
+        series = series.sparse.to_dense()
+    n = len(series)
+    codes = np.full(n, 'N/A', dtype=object)
+    ranges = ref_ranges.get(indicator) if indicator in ref_ranges else None
+    if not ranges:
+        return codes
+    bounds = _status_bounds(ranges)
+    if bounds is None:
+        return codes
+    low_1, low_2, high_2, high_1 = bounds
+
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        nums = series.to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(nums)
+    else:
+        try:
+            uniq_codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        except TypeError:       # 含不可哈希的值（list 等），逐个转换
+            uniq_codes, uniques = np.arange(n), series.to_numpy(dtype=object)
+        converted = [_status_value(v) for v in uniques]
+        ok = np.array([c[0] for c in converted] + [False], dtype=bool)
+        vals = np.array([c[1] for c in converted] + [np.nan], dtype=float)
+        valid, nums = ok[uniq_codes], vals[uniq_codes]    # 缺失值的 sentinel(-1) 取到末尾的 False/NaN
+
+    if indicator in NO_HIGH_EVALUATION_INDICATORS:
+        high_codes = ('N/A', 'N/A')
+    elif indicator in HIGH_IS_BETTER_INDICATORS:
+        high_codes = ('excellent', 'good')
+    else:
+        high_codes = ('severe_high', 'high')
+
+    labels = ['severe_low', 'low', *high_codes]
+    with np.errstate(invalid='ignore'):
+        conditions = [nums < low_1, nums < low_2, nums > high_1, nums > high_2]
+        if indicator == '铁蛋白' and gender and gender in FERRITIN_ATTENTION:
+            conditions.insert(0, nums > FERRITIN_ATTENTION[gender])
+            labels.insert(0, 'attention_needed')
+    # 按规则顺序取第一个满足的条件（都不满足为正常），用整数下标选择后再映射成代码
+    which = np.select(conditions, range(len(labels)), default=len(labels))
+    status = np.array(labels + ['normal'], dtype=object)[which]
+    codes[valid] = status[valid]
+    return codes
+
+
+# ========== 基准 ==========
+
+def make_columns(n_columns):
+    """n_columns 个列名：基本信息列 + 填充列 + 真实指标列"""
+    n_filler = max(0, n_columns - len(BASIC_COLUMNS) - len(INDICATOR_COLUMNS))
+    return BASIC_COLUMNS + [f"扩展指标{i + 1:03d}" for i in range(n_filler)] + INDICATOR_COLUMNS
+
+
+def _per_call(samples_ms, calls):
+    return round(float(np.median(samples_ms)) * 1000 / calls, 3)
+
+
+def bench_lookup(n_columns, calls, repeat):
+    """一种列数下各情况的查找耗时"""
+    columns = pd.Index(make_columns(n_columns))
+    df = pd.DataFrame(columns=columns)
+    scale = f"cols{len(columns)}"
+    results = []
+
+    indicators = [indicator for indicator, _ in LOOKUP_CASES.values()]
+    for case, (indicator, expected) in LOOKUP_CASES.items():
+        reference = indicators_module._scan_indicator_column(columns, indicator)
+        if reference != expected or find_indicator_column(df, indicator) != reference:
+            sys.exit(f"❌ {scale} {case}: 扫描={reference!r} 缓存={find_indicator_column(df, indicator)!r} "
+                     f"应为={expected!r}")
+
+        def scan():
+            for _ in range(calls):
+                indicators_module._scan_indicator_column(columns, indicator)
+
+        def cached():
+            for _ in range(calls):
+                find_indicator_column(df, indicator)
+
+        def cold():
+            for _ in range(calls):
+                indicators_module._clear_column_cache()
+                find_indicator_column(df, indicator)
+
+        # 列名相同、列索引对象不同（按行筛选得到的子表），缓存按列名内容命中
+        copies = iter([df.iloc[:0] for _ in range(calls * (repeat + 1))])
+
+        def same_names():
+            for _ in range(calls):
+                find_indicator_column(next(copies), indicator)
+
+        for stage, func in (('scan', scan), ('cached', cached), ('same_names', same_names), ('cold', cold)):
+            _, samples = measure(func, repeat, warmup=1)
+            results.append({'scale': scale, 'stage': f"find.{case}.{stage}",
+                            **summarize(samples, calls=calls, us_per_call=_per_call(samples, calls))})
+
+    if find_indicator_columns(df, indicators) != [expected for _, expected in LOOKUP_CASES.values()]:
+        sys.exit(f"❌ {scale}: find_indicator_columns 结果与逐个查找不一致")
+
+    def batch():
+        for _ in range(calls):
+            find_indicator_columns(df, indicators)
+
+    _, samples = measure(batch, repeat, warmup=1)
+    results.append({'scale': scale, 'stage': 'find.all_cases.batch',
+                    **summarize(samples, calls=calls, us_per_call=_per_call(samples, calls))})
+    return results
+
+
+def make_values(indicator, gender, kind, n_values, rng):
+    """覆盖各档的随机数值（从 low_1 以下到 high_1 以上；铁蛋白到需注意线以上），约3%缺失"""
+    ranges = (MALE_REF_RANGES if gender == '男' else FEMALE_REF_RANGES).get(indicator) or {}
+    bounds = [b for b in (ranges.get('low_1'), ranges.get('low_2'), ranges.get('high_2'), ranges.get('high_1'))
+              if b is not None] or [20.0, 80.0]
+    low, high = min(bounds), max(bounds)
+    if indicator == '铁蛋白':
+        high = max(high, 350.0)
+    values = np.round(rng.uniform(low * 0.5, high * 1.5, n_values), 2)
+    values[rng.random(n_values) < 0.03] = np.nan
+    if kind == 'numeric':
+        return pd.Series(values)
+
+    # 文本/混合列：数值、带空格的数字文本、空文本、'-'、'nan'、'<x' 等
+    mixed = values.astype(object)
+    as_text = rng.random(n_values) < 0.3
+    mixed[as_text] = [f" {v:g} " for v in values[as_text]]
+    special = rng.random(n_values) < 0.1
+    mixed[special] = rng.choice(np.array(TEXT_SAMPLES, dtype=object), special.sum())
+    return pd.Series(mixed, dtype=object)
+
+
+def bench_status(n_values, repeat, seed):
+    """各规则路径逐个判断与向量化判断的耗时"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for path, (indicator, gender, kind) in STATUS_PATHS.items():
+        ref_ranges = MALE_REF_RANGES if gender == '男' else FEMALE_REF_RANGES
+        values = make_values(indicator, gender, kind, n_values, rng)
+
+        loop_codes, loop_ms = measure(
+            lambda: [get_indicator_status(indicator, v, ref_ranges, gender)[2] for v in values], 1)
+        batch_codes, batch_ms = measure(
+            lambda: indicator_status_codes(indicator, values, ref_ranges, gender), repeat, warmup=1)
+        mismatch = np.flatnonzero(np.asarray(loop_codes, dtype=object) != batch_codes)
+        if len(mismatch):
+            i = mismatch[0]
+            sys.exit(f"❌ {path}: {len(mismatch)} 个值不一致，例如 {values.iloc[i]!r}: "
+                     f"逐个={loop_codes[i]!r} 向量化={batch_codes[i]!r}")
+
+        counts = pd.Series(batch_codes).value_counts().to_dict()
+        for stage, samples in (('loop', loop_ms), ('batch', batch_ms)):
+            results.append({'scale': 'status', 'stage': f"status.{path}.{stage}",
+                            **summarize(samples, values=n_values, indicator=indicator, gender=gender,
+                                        ms_per_million=round(float(np.median(samples)) * 1e6 / n_values, 1),
+                                        codes=counts)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_indicators',
+                                     description='指标列查找和状态判断的扩展性基准')
+    parser.add_argument('--columns', default=','.join(map(str, COLUMN_COUNTS)),
+                        help='列数，逗号分隔（默认: 50,100,250,500,1000）')
+    parser.add_argument('--calls', type=int, default=20, help='每次计时内的查找次数（默认: 20）')
+    parser.add_argument('--values', type=int, default=200000, help='每条规则路径的数值个数（默认: 200000）')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数（默认: 5；逐个判断只计1次）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认: 0）')
+    parser.add_argument('-o', '--output', help='结果JSON路径（默认: benchmarks/results/indicators-<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果JSON对比')
+    args = parser.parse_args(argv)
+
+    try:
+        column_counts = [int(c) for c in args.columns.split(',') if c.strip()]
+    except ValueError:
+        parser.error(f"列数必须是整数: {args.columns}")
+
+    results = []
+    for n_columns in column_counts:
+        lookup = bench_lookup(n_columns, args.calls, args.repeat)
+        print(f"📋 {lookup[0]['scale']}:")
+        for r in lookup:
+            print(f"  {r['stage']:<28} {r['us_per_call']:>10.1f} µs/次")
+        results += lookup
+
+    status = bench_status(args.values, args.repeat, args.seed)
+    print(f"🩸 状态判断（{args.values} 个值/路径）:")
+    for r in status:
+        print(f"  {r['stage']:<36} {r['ms_per_million']:>10.1f} ms/百万值")
+    results += status
+    print("✅ 两种实现结果一致")
+
+    params = {'columns': column_counts, 'calls': args.calls, 'values': args.values,
+              'repeat': args.repeat, 'seed': args.seed}
+    path = write_results('indicators', params, results, args.output)
+    print(f"✅ 结果已写入 {path}")
+
+    if args.compare:
+        print(f"\n与 {args.compare} 对比（median，▲ 变慢超过10%，▼ 变快超过10%）：")
+        print_comparison(compare_results(load_results(args.compare), load_results(path)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+数据读取/清洗和绘图各阶段的基准测试（合成数据，见 synthetic.py）
+
+    python -m benchmarks.bench_pipeline                              # 默认 small,medium
+    python -m benchmarks.bench_pipeline --scales small,medium,large --repeat 5
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/pipeline-旧.json
+
+每个规模生成一份合成Excel，然后：
+- 数据：load_data_multisheet（其中各sheet读取 excel.*、merge）、clean_data_final、
+  LazyWorkbook 首屏（只读月周sheet）、prepare_squad，各重复 --repeat 次
+- 绘图：每个性别前 --plot-athletes 名运动员的全部主题表格、雷达图、重点指标趋势图，
+  另有多名运动员对比的趋势图（plot.trend.cohort）；只计生成图表，不含PNG编码
+
+各阶段耗时取自 blood_engine.timing 的 span（函数内部阶段的耗时 *_ms 取平均一并写出）。
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import warnings
+from collections import defaultdict
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from config import MALE_REF_RANGES, FEMALE_REF_RANGES
+from blood_engine import (
+    set_reporter, setup_chinese_font, THEME_CONFIG, TREND_INDICATORS,
+    load_data_multisheet, clean_data_final, LazyWorkbook, prepare_squad,
+    plot_theme_table, plot_trend_chart_multi, plot_radar_chart_with_baseline,
+    recent_spans, clear_spans
+)
+
+from .harness import (
+    summarize, measure, write_results, load_results, compare_results, print_results, print_comparison
+)
+from .synthetic import make_workbook
+
+SCALES = {
+    'small': {'athletes': 20, 'dates': 12, 'extra_columns': 0},
+    'medium': {'athletes': 100, 'dates': 24, 'extra_columns': 40},
+    'large': {'athletes': 300, 'dates': 48, 'extra_columns': 120},
+}
+COHORT_SIZE = 5     # 对比趋势图的运动员数
+
+
+def _collect(samples, spans, prefix=''):
+    """span 记录按阶段归类到 samples[阶段]"""
+    for record in spans:
+        samples[prefix + record['stage']].append(record)
+
+
+def _stage_results(scale, samples):
+    results = []
+    for stage, records in samples.items():
+        laps = defaultdict(list)
+        for record in records:
+            for key, value in record.items():
+                if key.endswith('_ms'):
+                    laps[key].append(value)
+        extra = {key: round(sum(values) / len(values), 3) for key, values in laps.items()}
+        for field in ('rows', 'cols'):
+            if field in records[-1]:
+                extra[field] = records[-1][field]
+        results.append({'scale': scale, 'stage': stage, **summarize([r['ms'] for r in records], **extra)})
+    return results
+
+
+def bench_data(path, repeat):
+    """数据读取与清洗各阶段；返回 (阶段记录, 清洗后的数据)"""
+    samples = defaultdict(list)
+    df = clean_data_final(load_data_multisheet(path))   # 预热（首次导入 openpyxl 等），不计入
+    for _ in range(repeat):
+        clear_spans()
+        df = clean_data_final(load_data_multisheet(path))
+        _collect(samples, recent_spans())
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    _, lazy_ms = measure(lambda: LazyWorkbook(content).frame(), repeat)
+    samples['lazy.first_view'] = [{'ms': ms} for ms in lazy_ms]
+
+    _, prepare_ms = measure(lambda: prepare_squad(df, MALE_REF_RANGES, FEMALE_REF_RANGES), repeat)
+    samples['prepare_squad'] = [{'ms': ms, 'rows': len(df), 'cols': len(df.columns)} for ms in prepare_ms]
+    return samples, df
+
+
+def bench_plots(df, plot_athletes):
+    """每个性别前 plot_athletes 名运动员的全部图表（每次调用一条记录）"""
+    squad = prepare_squad(df, MALE_REF_RANGES, FEMALE_REF_RANGES)
+    samples = defaultdict(list)
+    clear_spans()
+    for gender, gs in squad.items():
+        index = gs['index']
+        for athlete in gs['athletes'][:plot_athletes]:
+            latest = index.latest_row(athlete)
+            for theme_name, categories in THEME_CONFIG.items():
+                plt.close(plot_theme_table(latest, theme_name, categories, gs['ref_ranges'], gender)[0])
+            if gs['baseline_stats'] is not None:
+                fig = plot_radar_chart_with_baseline(
+                    index.last_tests(athlete), gs['radar_fields'], gs['lower_is_better'],
+                    gs['ref_ranges'], athlete, None, gender, baseline_stats=gs['baseline_stats'])
+                if fig is not None:
+                    plt.close(fig)
+            athlete_df = index.athlete_df(athlete)
+            for indicator in TREND_INDICATORS:
+                fig = plot_trend_chart_multi(athlete_df, indicator, gs['ref_ranges'], [athlete], None, gender)
+                if fig is not None:
+                    plt.close(fig)
+    _collect(samples, recent_spans())
+
+    # 多名运动员对比（同一性别前 COHORT_SIZE 名）
+    clear_spans()
+    for gender, gs in squad.items():
+        cohort = gs['athletes'][:COHORT_SIZE]
+        for indicator in TREND_INDICATORS:
+            fig = plot_trend_chart_multi(gs['df'], indicator, gs['ref_ranges'], cohort, None, gender)
+            if fig is not None:
+                plt.close(fig)
+    for record in recent_spans():
+        if record['stage'] == 'plot.trend':
+            samples['plot.trend.cohort'].append(record)
+    return samples
+
+
+def run(scales, repeat=3, plot_athletes=3, seed=0, keep_dir=None):
+    """返回 (各阶段结果, 各规模合成Excel的大小和各sheet行列数)"""
+    results, workbooks = [], {}
+    for scale in scales:
+        params = SCALES[scale]
+        workdir = keep_dir or tempfile.mkdtemp(prefix='blood-bench-')
+        path = os.path.join(workdir, f"synthetic-{scale}.xlsx")
+        t0 = time.perf_counter()
+        shapes = make_workbook(path, seed=seed, **params)
+        gen_s = time.perf_counter() - t0
+        print(f"📄 {scale}: {params} → {os.path.getsize(path) / 1024:.0f} KB（生成 {gen_s:.1f}s）")
+
+        samples, df = bench_data(path, repeat)
+        samples.update(bench_plots(df, plot_athletes))
+        scale_results = _stage_results(scale, samples)
+        print_results(scale_results)
+        results += scale_results
+        workbooks[scale] = {'bytes': os.path.getsize(path), 'sheets': shapes}
+        if keep_dir is None:
+            os.remove(path)
+            os.rmdir(workdir)
+    return results, workbooks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_pipeline',
+                                     description='数据读取/清洗和绘图各阶段的基准测试（合成数据）')
+    parser.add_argument('--scales', default='small,medium', help=f"规模，逗号分隔（可选: {','.join(SCALES)}）")
+    parser.add_argument('--repeat', type=int, default=3, help='数据阶段重复次数（默认: 3）')
+    parser.add_argument('--plot-athletes', type=int, default=3, help='每个性别绘图的运动员数（默认: 3）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据随机种子（默认: 0）')
+    parser.add_argument('--keep', help='把合成Excel保存到这个目录（默认用临时目录并删除）')
+    parser.add_argument('-o', '--output', help='结果JSON路径（默认: benchmarks/results/pipeline-<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果JSON对比')
+    args = parser.parse_args(argv)
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"未知规模: {', '.join(unknown)}")
+
+    set_reporter(lambda level, message: None)
+    setup_chinese_font()
+    warnings.filterwarnings('ignore', message='Glyph .* missing')   # 没有中文字体时每张图都会警告
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+
+    results, workbooks = run(scales, args.repeat, args.plot_athletes, args.seed, args.keep)
+    params = {'scales': {s: SCALES[s] for s in scales}, 'repeat': args.repeat,
+              'plot_athletes': args.plot_athletes, 'seed': args.seed, 'workbooks': workbooks}
+    path = write_results('pipeline', params, results, args.output)
+    print(f"✅ 结果已写入 {path}")
+
+    if args.compare:
+        print(f"\n与 {args.compare} 对比（median，▲ 变慢超过10%，▼ 变快超过10%）：")
+        print_comparison(compare_results(load_results(args.compare), load_results(path)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+三种图表的渲染基准 + 图像哈希回归检查（合成数据，见 synthetic.py）
+
+    python -m benchmarks.bench_render                                   # 计时并与已保存的哈希对比
+    python -m benchmarks.bench_render --scales small --tier full
+    python -m benchmarks.bench_render --update                          # 确认输出正确后重新保存哈希
+    python -m benchmarks.bench_render --compare benchmarks/results/render-旧.json
+
+每个规模生成一份合成Excel（测试次数和对比人数不同），读取清洗后对每个性别第一名运动员生成
+全部主题表格（plot_theme_table）、雷达图（plot_radar_chart_with_baseline）、重点指标趋势图
+（plot_trend_chart_multi），另有前 cohort 名运动员的对比趋势图。每张图分别计时：
+生成图表（*.render）和 PNG 编码（*.png，按 figure_cache.RENDER_TIERS 的分辨率）。
+
+回归检查：每张图的PNG按 R、G、B 通道分别缩成小图后计算差异哈希（dHash，共 3 × HASH_SIZE² 位），与 render_hashes.json
+中保存的哈希比较汉明距离，超过 --tolerance 位即视为输出变化，列出后以非零状态退出。
+哈希对字体、抗锯齿等细微差异不敏感，但版式、颜色、曲线、状态标记的变化会被发现。
+保存的哈希记录了生成时的字体和 matplotlib 版本，环境不同时会提示（字体不同时文字区域会有差异）。
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+from collections import defaultdict
+from functools import partial
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.image as mpimg
+import matplotlib.pyplot as plt
+import numpy as np
+
+from config import MALE_REF_RANGES, FEMALE_REF_RANGES
+from blood_engine import (
+    set_reporter, setup_chinese_font, THEME_CONFIG, TREND_INDICATORS,
+    load_data_multisheet, clean_data_final, prepare_squad,
+    plot_theme_table, plot_trend_chart_multi, plot_radar_chart_with_baseline
+)
+from blood_engine.figure_cache import RENDER_TIERS
+
+from .harness import (
+    summarize, write_results, load_results, compare_results, print_results, print_comparison
+)
+from .synthetic import make_workbook
+
+HASHES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'render_hashes.json')
+HASH_SIZE = 16          # 每个颜色通道 HASH_SIZE × HASH_SIZE 位
+DEFAULT_TOLERANCE = 24  # 允许的汉明距离（位，共 3 × HASH_SIZE² 位）
+
+# 规模：测试次数决定趋势图的点数，cohort 为对比趋势图的人数
+SCALES = {
+    'small': {'athletes': 6, 'dates': 6, 'cohort': 2},
+    'medium': {'athletes': 12, 'dates': 24, 'cohort': 4},
+    'large': {'athletes': 24, 'dates': 96, 'cohort': 8},
+}
+
+
+# ========== 感知哈希 ==========
+def _shrink(gray, height, width):
+    """灰度图按区域平均缩小到 height × width"""
+    rows = np.linspace(0, gray.shape[0], height + 1).astype(int)
+    cols = np.linspace(0, gray.shape[1], width + 1).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(gray, rows[:-1], axis=0), cols[:-1], axis=1)
+    counts = np.outer(np.diff(rows), np.diff(cols))
+    return sums / counts
+
+
+def perceptual_hash(png, size=HASH_SIZE):
+    """PNG字节 → R、G、B 各通道差异哈希拼接成的十六进制字符串，以及图像尺寸 (宽, 高)"""
+    image = mpimg.imread(io.BytesIO(png), format='png')
+    if image.ndim == 2:
+        image = image[..., None].repeat(3, axis=2)
+    rgb = image[..., :3]
+    if image.shape[2] == 4:     # 透明部分按白色背景合成
+        alpha = image[..., 3:4]
+        rgb = rgb * alpha + (1 - alpha)
+    bits = []
+    for channel in range(3):    # 分通道计算：只改颜色（如状态底色、曲线颜色）时灰度可能几乎不变
+        small = _shrink(rgb[..., channel], size, size + 1)
+        bits.append(small[:, 1:] > small[:, :-1])
+    value = int(''.join('1' if b else '0' for b in np.concatenate(bits).ravel()), 2)
+    return f"{value:0{3 * size * size // 4}x}", [int(image.shape[1]), int(image.shape[0])]
+
+
+def hash_distance(a, b):
+    """两个哈希的汉明距离（位）"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def load_hashes(path=HASHES_PATH):
+    if not os.path.exists(path):
+        return {'env': {}, 'hashes': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def hash_environment(font_path):
+    return {'matplotlib': matplotlib.__version__,
+            'font': os.path.basename(font_path) if font_path else None}
+
+
+# ========== 合成数据 ==========
+def make_fixture(scale, seed, workdir):
+    """生成一个规模的合成Excel并读取清洗，返回 prepare_squad 的结果"""
+    params = SCALES[scale]
+    path = os.path.join(workdir, f"render-{scale}.xlsx")
+    make_workbook(path, athletes=params['athletes'], dates=params['dates'], seed=seed)
+    df = clean_data_final(load_data_multisheet(path))
+    os.remove(path)
+    return prepare_squad(df, MALE_REF_RANGES, FEMALE_REF_RANGES)
+
+
+def _theme_figure(*args):
+    return plot_theme_table(*args)[0]
+
+
+def figure_builders(squad, cohort_size):
+    """(图表种类, 名称, 生成图表的函数) 列表；名称在同一规模内唯一，用作哈希的键"""
+    builders = []
+    for gender, gs in squad.items():
+        index = gs['index']
+        athlete = gs['athletes'][0]
+        latest = index.latest_row(athlete)
+        for theme_name, categories in THEME_CONFIG.items():
+            builders.append(('theme', f"{gender}/theme/{theme_name}",
+                             partial(_theme_figure, latest, theme_name, categories, gs['ref_ranges'], gender)))
+        if gs['baseline_stats'] is not None:
+            builders.append(('radar', f"{gender}/radar", partial(
+                plot_radar_chart_with_baseline, index.last_tests(athlete), gs['radar_fields'],
+                gs['lower_is_better'], gs['ref_ranges'], athlete, None, gender, baseline_stats=gs['baseline_stats'])))
+        athlete_df = index.athlete_df(athlete)
+        cohort = gs['athletes'][:cohort_size]
+        for indicator in TREND_INDICATORS:
+            builders.append(('trend', f"{gender}/trend/{indicator}", partial(
+                plot_trend_chart_multi, athlete_df, indicator, gs['ref_ranges'], [athlete], None, gender)))
+            builders.append(('trend.cohort', f"{gender}/trend.cohort/{indicator}", partial(
+                plot_trend_chart_multi, gs['df'], indicator, gs['ref_ranges'], cohort, None, gender)))
+    return builders
+
+
+def render(build_fig, dpi):
+    """生成并编码一张图，返回 (PNG字节或None, 生成ms, 编码ms)"""
+    t0 = time.perf_counter()
+    fig = build_fig()
+    t1 = time.perf_counter()
+    if fig is None:
+        return None, (t1 - t0) * 1000, 0.0
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi)
+    plt.close(fig)
+    return buf.getvalue(), (t1 - t0) * 1000, (time.perf_counter() - t1) * 1000
+
+
+def bench_scale(scale, squad, tier, repeat, stored, tolerance):
+    """一个规模的全部图表：返回 (阶段结果, {键: 哈希记录}, 变化列表)"""
+    dpi = RENDER_TIERS[tier]
+    samples = defaultdict(lambda: {'render': [], 'png': [], 'bytes': []})
+    hashes, changed = {}, []
+    for kind, name, build_fig in figure_builders(squad, SCALES[scale]['cohort']):
+        png, _, _ = render(build_fig, dpi)      # 预热（首次绘图的字体加载等），不计时
+        if png is None:
+            continue
+        for _ in range(repeat):
+            png, render_ms, png_ms = render(build_fig, dpi)
+            samples[kind]['render'].append(render_ms)
+            samples[kind]['png'].append(png_ms)
+            samples[kind]['bytes'].append(len(png))
+
+        key = f"{tier}/{scale}/{name}"
+        digest, size = perceptual_hash(png)
+        hashes[key] = {'hash': digest, 'size': size}
+        old = stored.get(key)
+        if old is not None:
+            distance = hash_distance(old['hash'], digest)
+            if distance > tolerance or old.get('size') != size:
+                changed.append((key, distance, old.get('size'), size))
+
+    results = []
+    for kind, s in samples.items():
+        for part in ('render', 'png'):
+            results.append({'scale': scale, 'stage': f"{kind}.{part}",
+                            **summarize(s[part], figures=len(s[part]) // repeat,
+                                        **({'bytes': int(np.mean(s['bytes']))} if part == 'png' else {}))})
+    return results, hashes, changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_render',
+                                     description='主题表格/趋势图/雷达图的渲染基准和图像哈希回归检查')
+    parser.add_argument('--scales', default=','.join(SCALES), help=f"规模，逗号分隔（可选: {','.join(SCALES)}）")
+    parser.add_argument('--tier', default='preview', choices=list(RENDER_TIERS), help='PNG分辨率级别（默认: preview）')
+    parser.add_argument('--repeat', type=int, default=2, help='每张图计时次数（默认: 2，另有1次预热）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据随机种子（默认: 0，改变后哈希不可比）')
+    parser.add_argument('--tolerance', type=int, default=DEFAULT_TOLERANCE,
+                        help=f"允许的哈希汉明距离（默认: {DEFAULT_TOLERANCE} 位）")
+    parser.add_argument('--hashes', default=HASHES_PATH, help='保存哈希的JSON（默认: benchmarks/render_hashes.json）')
+    parser.add_argument('--update', action='store_true', help='用本次输出更新保存的哈希（确认输出正确后使用）')
+    parser.add_argument('-o', '--output', help='结果JSON路径（默认: benchmarks/results/render-<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果JSON对比')
+    args = parser.parse_args(argv)
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"未知规模: {', '.join(unknown)}")
+
+    set_reporter(lambda level, message: None)
+    font_path = setup_chinese_font()
+    warnings.filterwarnings('ignore', message='Glyph .* missing')   # 没有中文字体时每张图都会警告
+
+    saved = load_hashes(args.hashes)
+    env = hash_environment(font_path)
+    if saved['hashes'] and saved.get('env') != env:
+        print(f"⚠️ 保存的哈希生成于 {saved.get('env')}，当前环境 {env}，差异可能来自环境")
+
+    results, hashes, changed = [], {}, []
+    workdir = tempfile.mkdtemp(prefix='blood-render-')
+    try:
+        for scale in scales:
+            squad = make_fixture(scale, args.seed, workdir)
+            print(f"🖼️ {scale}: {SCALES[scale]}")
+            scale_results, scale_hashes, scale_changed = bench_scale(
+                scale, squad, args.tier, args.repeat, saved['hashes'], args.tolerance)
+            print_results(scale_results)
+            results += scale_results
+            hashes.update(scale_hashes)
+            changed += scale_changed
+    finally:
+        os.rmdir(workdir)
+
+    params = {'scales': {s: SCALES[s] for s in scales}, 'tier': args.tier, 'dpi': RENDER_TIERS[args.tier],
+              'repeat': args.repeat, 'seed': args.seed, 'tolerance': args.tolerance, 'hash_env': env}
+    path = write_results('render', params, results, args.output)
+    print(f"✅ 结果已写入 {path}")
+
+    if args.compare:
+        print(f"\n与 {args.compare} 对比（median，▲ 变慢超过10%，▼ 变快超过10%）：")
+        print_comparison(compare_results(load_results(args.compare), load_results(path)))
+
+    if args.update:
+        saved['hashes'].update(hashes)
+        saved['env'] = env
+        with open(args.hashes, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"✅ 已更新 {len(hashes)} 个图像哈希 → {args.hashes}")
+        return
+
+    new = [key for key in hashes if key not in saved['hashes']]
+    if new:
+        print(f"ℹ️ {len(new)} 张图还没有保存的哈希（用 --update 保存）")
+    if changed:
+        print(f"\n❌ {len(changed)} 张图与保存的哈希不同（允许 {args.tolerance} 位）：")
+        for key, distance, old_size, size in changed:
+            size_note = f"，尺寸 {old_size} → {size}" if old_size != size else ''
+            print(f"  {key:<48} 距离 {distance}{size_note}")
+        sys.exit(1)
+    print(f"✅ {len(hashes) - len(new)} 张图与保存的哈希一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试的公共部分：计时统计、运行环境、结果 JSON 的读写和对比
+
+结果文件格式（各基准脚本相同，便于对比）：
+
+    {"benchmark": "pipeline", "env": {...}, "params": {...},
+     "results": [{"scale": "small", "stage": "clean", "n": 3, "min_ms": …, "median_ms": …,
+                  "mean_ms": …, "max_ms": …, …附加字段}]}
+
+同一个 (scale, stage) 在两次结果之间按 median_ms 对比。
+"""
+
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def summarize(samples_ms, **extra):
+    """一组耗时（毫秒）→ 统计字段"""
+    samples = sorted(samples_ms)
+    return {
+        'n': len(samples),
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'max_ms': round(samples[-1], 3),
+        **extra,
+    }
+
+
+def measure(func, repeat=3, warmup=0):
+    """调用 func() warmup + repeat 次，返回 (最后一次的返回值, 各次耗时毫秒)"""
+    result = None
+    for _ in range(warmup):
+        result = func()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return result, samples
+
+
+def environment():
+    """运行环境：Python/库版本、平台、CPU数、代码版本"""
+    import matplotlib
+    import numpy
+    import pandas
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+def write_results(benchmark, params, results, output=None):
+    """写出结果 JSON（output 为空时写到 results/<benchmark>-<时间>.json），返回路径"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    payload = {'benchmark': benchmark, 'env': environment(), 'params': params, 'results': results}
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1, default=str)
+    return output
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(old, new):
+    """两次结果按 (scale, stage) 对比 median_ms，返回行列表 (scale, stage, 旧, 新, 新/旧)"""
+    before = {(r.get('scale'), r['stage']): r['median_ms'] for r in old['results']}
+    rows = []
+    for r in new['results']:
+        key = (r.get('scale'), r['stage'])
+        if key in before:
+            ratio = r['median_ms'] / before[key] if before[key] else float('nan')
+            rows.append((*key, before[key], r['median_ms'], ratio))
+    return rows
+
+
+def print_results(results):
+    """按 scale 分组打印结果表"""
+    for r in results:
+        print(f"  {str(r.get('scale', '')):<8} {r['stage']:<36} median {r['median_ms']:>10.2f} ms"
+              f"   min {r['min_ms']:>10.2f}   n={r['n']}")
+
+
+def print_comparison(rows):
+    print(f"  {'scale':<8} {'stage':<36} {'旧ms':>10} {'新ms':>10} {'新/旧':>7}")
+    for scale, stage, old_ms, new_ms, ratio in rows:
+        flag = ' ▲' if ratio > 1.1 else (' ▼' if ratio < 0.9 else '')
+        print(f"  {str(scale or ''):<8} {stage:<36} {old_ms:>10.2f} {new_ms:>10.2f} {ratio:>7.2f}{flag}")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+合成血液数据Excel（与 load_data_multisheet / LazyWorkbook 读取的真实文件格式相同）
+
+- 月周测试指标：第1行表头，第2~11行是说明/参考范围行（读取时跳过），之后每行一次测试
+- 季度测试指标、年度测试指标、其他：两行表头（第1行分类、第2行指标名；
+  分类只写在每组的第一列，相当于合并单元格；基本信息列第2行留空）
+- 部分指标使用原始（别名）列名，由 COLUMN_NAME_MAPPING 统一，例如 '平均红细胞容积'、'LDL-C'、'ALD'
+- 部分指标低于检测限，写成 '<x' 文本；少量单元格为空；测试日期部分写成 '2024/1/5' 这样的文本
+
+数值按 config 中的参考范围生成：每名运动员有自己的基础水平，每次测试在其附近波动，少数超出范围。
+
+    python -m benchmarks.synthetic 输出.xlsx --athletes 100 --dates 24 --extra-columns 50
+"""
+
+import argparse
+import datetime
+
+import numpy as np
+from openpyxl import Workbook
+
+from config import COLUMN_NAME_MAPPING, MALE_REF_RANGES, FEMALE_REF_RANGES
+
+MONTHLY_BASIC = ['项目', '编号', '姓名', '性别', '出生年月日', '身高', '体重', '测试日期']
+MONTHLY_INDICATORS = [
+    '睾酮', '游离睾酮', '皮质醇', '睾酮/皮质醇比值', '肌酸激酶', '血糖', '血尿素', '尿酸', '肌酐',
+    '血红蛋白', '红细胞', '红细胞压积', '网织红细胞百分比',
+    '平均红细胞容积', '平均红细胞血红蛋白量', '平均红细胞血红蛋白浓度',
+    '铁蛋白', '白细胞', '血小板', '超敏C反应蛋白', '渗透压', '血尿素/肌酐',
+]
+AUX_BASIC = ['编号', '姓名', '性别', '测试日期']
+# sheet -> ([(分类, [指标列名])], 每隔几次月周测试做一次)
+AUX_LAYOUT = {
+    '季度测试指标': ([
+        ('维生素', ['维生素B1', '维生素B2', '维生素B6（PA）', '维生素B12', '叶酸', '维生素D']),
+        ('电解质', ['钾', '钠', '氯', '钙', '镁']),
+    ], 3),
+    '年度测试指标': ([
+        ('甲功', ['总甲状腺素', '总三碘甲状腺原氨酸', '游离三碘甲状腺原氨酸', '游离甲状腺素', '超敏促甲状腺素']),
+        ('肝功', ['丙氨酸氨基转移酶（谷丙转氨酶）', '天冬氨酸氨基转移酶（谷草转氨酶）', '总胆红素', '总蛋白', '白蛋白']),
+        ('血脂四项', ['甘油三酯', '高密度脂蛋白', '总胆固醇', 'LDL-C']),
+    ], 12),
+    '其他': ([
+        ('其他', ['触珠蛋白', 'ALD', '肌红蛋白', 'CYS-C']),
+    ], 6),
+}
+CENSORABLE = {'超敏C反应蛋白', '铁蛋白', '肌红蛋白', '维生素B1', '超敏促甲状腺素', 'CYS-C'}   # 可能低于检测限的指标
+DEFAULT_RANGE = (20.0, 80.0)      # 参考范围中没有的指标（含扩展列）
+
+
+def _normal_range(column, ref_ranges):
+    """列名（可以是别名）→ 正常范围 (低, 高)"""
+    rng = ref_ranges.get(COLUMN_NAME_MAPPING.get(column, column))
+    if not rng:
+        return DEFAULT_RANGE
+    low, high = rng.get('low_2'), rng.get('high_2')
+    if low is None and high is None:
+        return DEFAULT_RANGE
+    if low is None:
+        low = high * 0.2
+    if high is None:
+        high = low * 2.5
+    return float(low), float(high)
+
+
+def _values(rng, column, genders, n_dates, missing_rate, censored_rate):
+    """一个指标列的数值矩阵（运动员 × 测试次数），元素为 float、'<x' 或 None"""
+    out = np.empty((len(genders), n_dates), dtype=object)
+    for gender in ('男', '女'):
+        rows = np.flatnonzero(genders == gender)
+        if len(rows) == 0:
+            continue
+        low, high = _normal_range(column, MALE_REF_RANGES if gender == '男' else FEMALE_REF_RANGES)
+        mid, sd = (low + high) / 2, (high - low) / 4
+        level = mid + rng.normal(0, 0.6 * sd, (len(rows), 1))      # 每名运动员的基础水平
+        values = level + rng.normal(0, 0.7 * sd, (len(rows), n_dates))
+        out[rows] = np.round(np.maximum(values, low * 0.05 + 0.01), 2)
+
+    if column in CENSORABLE and censored_rate > 0:
+        limit = round(_normal_range(column, MALE_REF_RANGES)[0] * 0.5, 2) or 0.5
+        out[rng.random(out.shape) < censored_rate] = f"<{limit:g}"
+    if missing_rate > 0:
+        out[rng.random(out.shape) < missing_rate] = None
+    return out
+
+
+def make_workbook(path, athletes=20, dates=12, extra_columns=0, interval_days=14,
+                  missing_rate=0.03, censored_rate=0.05, text_date_rate=0.1, seed=0):
+    """
+    生成合成Excel到 path
+
+    athletes 名运动员（男女交替），每人 dates 次月周测试（从2023-01-02起每 interval_days 天一次，
+    每人每次有0~2天偏移）；extra_columns 为月周sheet额外的指标列数（'扩展指标001' …）。
+    季度/年度/其他sheet按 AUX_LAYOUT 中的间隔取月周测试的日期。返回各sheet的 (行数, 列数)。
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"运动员{i:04d}" for i in range(athletes)])
+    genders = np.array(['男' if i % 2 == 0 else '女' for i in range(athletes)])
+
+    start = datetime.datetime(2023, 1, 2)
+    offsets = rng.integers(0, 3, (athletes, dates))
+    test_dates = [[start + datetime.timedelta(days=d * interval_days + int(offsets[a, d])) for d in range(dates)]
+                  for a in range(athletes)]
+    # 同一次测试在各sheet中的日期单元格完全相同（合并按 姓名 + 日期文本 匹配）
+    as_text = rng.random((athletes, dates)) < text_date_rate
+    date_cells = [[f"{t.year}/{t.month}/{t.day}" if as_text[a, d] else t for d, t in enumerate(row)]
+                  for a, row in enumerate(test_dates)]
+    birth = [datetime.datetime(1995 + i % 10, 1 + i % 12, 1 + i % 28) for i in range(athletes)]
+    height = np.round(rng.normal(178, 8, athletes), 1)
+    weight = np.round(rng.normal(72, 9, athletes), 1)
+
+    wb = Workbook(write_only=True)
+    shapes = {}
+
+    # === 月周测试指标 ===
+    indicators = MONTHLY_INDICATORS + [f"扩展指标{i + 1:03d}" for i in range(extra_columns)]
+    ws = wb.create_sheet('月周测试指标')
+    ws.append(MONTHLY_BASIC + indicators)
+    ws.append(['参考范围'] + [None] * (len(MONTHLY_BASIC) - 1)
+              + [f"{low:g}-{high:g}" for low, high in (_normal_range(c, MALE_REF_RANGES) for c in indicators)])
+    for note in range(9):
+        ws.append([f"说明{note + 1}"] if note < 2 else [])
+    values = {col: _values(rng, col, genders, dates, missing_rate, censored_rate) for col in indicators}
+    for a in range(athletes):
+        basic = ['田径', f"A{a:04d}", names[a], genders[a], birth[a], height[a], weight[a]]
+        for d in range(dates):
+            ws.append(basic + [date_cells[a][d]] + [values[col][a, d] for col in indicators])
+    shapes['月周测试指标'] = (athletes * dates, len(MONTHLY_BASIC) + len(indicators))
+
+    # === 辅助sheet（两行表头）===
+    for sheet, (groups, every) in AUX_LAYOUT.items():
+        ws = wb.create_sheet(sheet)
+        top = list(AUX_BASIC)
+        second = [None] * len(AUX_BASIC)
+        columns = []
+        for category, cols in groups:
+            top += [category] + [None] * (len(cols) - 1)
+            second += cols
+            columns += cols
+        ws.append(top)
+        ws.append(second)
+        picks = list(range(0, dates, every))
+        values = {col: _values(rng, col, genders, len(picks), missing_rate, censored_rate) for col in columns}
+        for a in range(athletes):
+            for k, d in enumerate(picks):
+                ws.append([f"A{a:04d}", names[a], genders[a], date_cells[a][d]] + [values[col][a, k] for col in columns])
+        shapes[sheet] = (athletes * len(picks), len(AUX_BASIC) + len(columns))
+
+    wb.save(path)
+    return shapes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成合成血液数据Excel（格式与真实数据相同）')
+    parser.add_argument('output', help='输出的 .xlsx 路径')
+    parser.add_argument('--athletes', type=int, default=20, help='运动员人数（默认: 20）')
+    parser.add_argument('--dates', type=int, default=12, help='每人月周测试次数（默认: 12）')
+    parser.add_argument('--extra-columns', type=int, default=0, help='月周sheet额外的指标列数（默认: 0）')
+    parser.add_argument('--interval-days', type=int, default=14, help='测试间隔天数（默认: 14）')
+    parser.add_argument('--missing-rate', type=float, default=0.03, help='空单元格比例（默认: 0.03）')
+    parser.add_argument('--censored-rate', type=float, default=0.05, help="可低于检测限的指标写成 '<x' 的比例（默认: 0.05）")
+    parser.add_argument('--text-date-rate', type=float, default=0.1, help='测试日期写成文本的比例（默认: 0.1）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认: 0）')
+    args = parser.parse_args(argv)
+
+    shapes = make_workbook(args.output, args.athletes, args.dates, args.extra_columns, args.interval_days,
+                           args.missing_rate, args.censored_rate, args.text_date_rate, args.seed)
+    for sheet, (rows, cols) in shapes.items():
+        print(f"{sheet}: {rows} 行, {cols} 列")
+    print(f"✅ 已生成 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
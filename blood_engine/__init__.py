@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+运动员血液指标分析引擎
+
+数据加载、合并、清洗、指标解析、状态评价和图表生成，不依赖 Streamlit、导入时没有副作用，
+可以在批处理脚本、基准测试和工作进程中直接使用。Streamlit 界面（app.py）只是其上的一层外壳。
+
+    from blood_engine import load_data_multisheet, clean_data_final, plot_theme_table, THEME_CONFIG
+    df = clean_data_final(load_data_multisheet('血液数据.xlsx'))
+"""
+
+from .messages import report, set_reporter
+from .fonts import setup_chinese_font
+from .style import (
+    TREND_INDICATORS, CATEGORY_NAMES, THEME_CONFIG, RADAR_FIELDS, LOWER_IS_BETTER,
+    RADAR_STYLES, TREND_COLORS, TREND_MAX_POINTS,
+    TITLE_TABLE_SPACING, FONTSIZE_MAIN_TITLE
+)
+from .dates import normalize_dates, format_dates, format_date
+from .timing import (
+    span, span_session, timed, annotate, lap, recent_spans, clear_spans, spans_jsonl, summarize_spans
+)
+from .profiling import ProfileReport, capture as capture_profile
+from .memory import (
+    DATASETS, SessionData, deep_bytes, process_rss, set_memory_limits, track_peak, recent_peaks, memory_report,
+    set_peak_tracing, peak_tracing_enabled
+)
+from .ranges import parse_range_value, load_reference_ranges_from_excel
+from .loader import (
+    load_data_multisheet, flatten_multiindex_columns, merge_all_sheets, merge_sheet_data, clean_data_final,
+    sparsify_low_frequency, to_dense, LazyWorkbook
+)
+from .indicators import (
+    INDICATOR_ALIASES, get_indicator_status, format_number, find_indicator_column,
+    list_numeric_indicators, default_trend_indicators, default_radar_indicators
+)
+from .catalog import build_indicator_catalog, catalog_indicators, coverage_label
+from .smoothing import SMOOTHING_MODES, DEFAULT_SMOOTHING_MODE, lttb_downsample, get_smoothed_curve
+from .plots import (
+    plot_theme_table, plot_trend_chart_multi, build_trend_series, build_trend_curves, build_trend_vega_spec,
+    compute_baseline_stats, compute_radar_zscores, plot_radar_chart_with_baseline
+)
+from .athletes import AthleteIndex
+from .store import BloodStore, split_censored
+from .cube import IndicatorCube, build_cube, open_cube
+from .baseline import BASELINE_WINDOW, CohortBaselineCache, get_baseline_cache, drop_baselines, baseline_bytes
+from .figure_cache import FIGURE_CACHE, RENDER_TIERS, content_key
+from .gallery import render_radar_gallery
+from .batch import prepare_squad, render_squad_reports
+from .report_pdf import write_squad_pdf, squad_pdf_file
+from .prerender import plan_prerender, plan_prerender_deferred, theme_figure_key, trend_figure_key, radar_figure_key
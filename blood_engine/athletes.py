@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+按运动员组织的数据索引（数据加载后建立一次）
+
+- data: 按 (姓名, 日期) 稳定排序的数据，每名运动员占连续的一段行
+- latest: 每名运动员最新一次测试（一行）
+- last_tests: 每名运动员最近 window 次不同日期的测试（雷达图、基准窗口使用）
+
+取某名运动员的数据是字典查位置 + iloc 切片，不再对整张表做布尔筛选和拷贝；
+每名运动员的行按日期有序，日期范围查询在该段内二分查找（between）。
+"""
+
+import numpy as np
+import pandas as pd
+
+from .baseline import BASELINE_WINDOW
+
+
+def _slices(names):
+    """已排序的姓名数组 → {姓名: (起始行, 结束行)}"""
+    if len(names) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+    stops = np.r_[starts[1:], len(names)]
+    return {name: (int(s), int(e)) for name, s, e in zip(names[starts], starts, stops)}
+
+
+class AthleteIndex:
+    """
+    一个数据集（或一个性别）的运动员索引
+
+    - athlete_df(name): 该运动员全部测试（按日期排序）
+    - latest_row(name): 最新一次测试（单行 DataFrame）
+    - last_tests(name): 最近 window 次不同日期的测试
+    - between(names, start, end): 一组运动员在日期范围内的测试（二分查找）
+    """
+
+    def __init__(self, df, name_col, date_col='Date', window=BASELINE_WINDOW):
+        self.name_col = name_col
+        self.date_col = date_col
+        self.window = window
+
+        data = df[df[name_col].notna()]
+        sort_cols = [name_col, date_col] if date_col in data.columns else [name_col]
+        self.data = data.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+        self._rows = _slices(self.data[name_col].to_numpy())
+        self._dates = None
+        if date_col in self.data.columns:
+            self._dates = pd.to_datetime(self.data[date_col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+
+        # 排序后 groupby + tail 一次得到每人最新一行和最近 window 次测试
+        grouped = self.data.groupby(name_col, sort=False)
+        self.latest = grouped.tail(1).reset_index(drop=True)
+        self._latest_pos = {name: i for i, name in enumerate(self.latest[name_col])}
+
+        dated = self.data
+        if date_col in dated.columns:
+            # 与雷达图取"最近几次测试"的规则一致：同一天只算一次
+            dated = dated.dropna(subset=[date_col]).drop_duplicates([name_col, date_col])
+        self.last_n = dated.groupby(name_col, sort=False).tail(window).reset_index(drop=True)
+        self._last_n_rows = _slices(self.last_n[name_col].to_numpy())
+
+    @property
+    def athletes(self):
+        return list(self._rows)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def athlete_df(self, name):
+        start, stop = self._rows.get(name, (0, 0))
+        return self.data.iloc[start:stop]
+
+    def latest_row(self, name):
+        pos = self._latest_pos.get(name)
+        return self.latest.iloc[0:0] if pos is None else self.latest.iloc[pos:pos + 1]
+
+    def last_tests(self, name):
+        start, stop = self._last_n_rows.get(name, (0, 0))
+        return self.last_n.iloc[start:stop]
+
+    def between(self, names, start=None, end=None):
+        """
+        一组运动员在 [start, end] 日期范围内的测试（按运动员、日期排序）
+
+        每名运动员的行已按日期排好，用 searchsorted 在该段内定位起止行，
+        代价是 O(人数 × log 测试次数)，与数据总行数无关。start/end 为 None 时不限制。
+        没有日期列时忽略日期范围。
+        """
+        lo_key = None if start is None else np.datetime64(pd.Timestamp(start), 'ns')
+        hi_key = None if end is None else np.datetime64(pd.Timestamp(end), 'ns')
+
+        pieces = []
+        for name in names:
+            start_row, stop_row = self._rows.get(name, (0, 0))
+            if start_row == stop_row:
+                continue
+            if self._dates is not None and (lo_key is not None or hi_key is not None):
+                dates = self._dates[start_row:stop_row]   # 日期缺失(NaT)排在每段末尾
+                lo = start_row if lo_key is None else start_row + int(np.searchsorted(dates, lo_key, 'left'))
+                if hi_key is None:
+                    # 只限制起点时仍需排除日期缺失的行
+                    hi = start_row + int(np.searchsorted(dates, np.datetime64('NaT'), 'left'))
+                else:
+                    hi = start_row + int(np.searchsorted(dates, hi_key, 'right'))
+                start_row, stop_row = lo, max(lo, hi)
+            pieces.append(np.arange(start_row, stop_row))
+
+        positions = np.concatenate(pieces) if pieces else np.array([], dtype=int)
+        return self.data.iloc[positions]
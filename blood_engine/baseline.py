@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+雷达图Z-Score基准缓存
+
+纯计算模块（不依赖 Streamlit），模块级缓存跨 rerun 保留。
+
+对每名运动员只保存最近 window 次测试的聚合量（有效个数、均值、离差平方和），
+任意队列（选中的对比运动员组）的均值/标准差由这些聚合量直接合并得到，
+不需要再筛选、排序、拼接原始数据。切换主运动员不会触发基准重算。
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .timing import span
+
+BASELINE_WINDOW = 4          # 每名运动员取最近几次测试
+_REGISTRY_MAX_ENTRIES = 8    # 最多保留几个 (数据集, 性别, 窗口) 的缓存
+_COHORT_MAX_ENTRIES = 64     # 每个缓存最多保留几个队列的合并结果
+_registry = OrderedDict()
+# 会话线程、预渲染线程和数据集淘汰（drop_baselines）并发读写登记表
+_registry_lock = threading.Lock()
+
+
+class CohortBaselineCache:
+    """
+    队列基准缓存（一个数据集 + 一个性别 + 一个窗口长度）
+
+    - stats_for(athletes, columns): 返回与 columns 对齐的 (mu, sigma)
+    - add_test(row): 新增一次测试，只更新该运动员的窗口并让包含该运动员的队列失效，
+      结果与把这一行追加到原数据后整体重建相同
+    """
+
+    def __init__(self, df, name_col, date_col='Date', window=BASELINE_WINDOW, exclude_cols=()):
+        self.name_col = name_col
+        self.date_col = date_col
+        self.window = window
+
+        skip = {name_col, date_col, *exclude_cols}
+        numeric = {}
+        for col in df.columns:
+            if col in skip:
+                continue
+            values = pd.to_numeric(df[col], errors='coerce')
+            if values.notna().any():
+                numeric[col] = values
+        self.columns = list(numeric.keys())
+        self._col_pos = {col: j for j, col in enumerate(self.columns)}
+
+        # 按日期排序后，用groupby一次取出每名运动员的最近window次测试
+        table = pd.DataFrame(numeric, index=df.index)
+        table.insert(0, date_col, df[date_col])
+        table.insert(0, name_col, df[name_col])
+        table = table.dropna(subset=[name_col]).sort_values(date_col, kind='stable')
+        last_n = table.groupby(name_col, sort=False).tail(window)
+
+        self._windows = {}   # 运动员 -> 最近window次测试（日期列 + 指标列），add_test 在此基础上更新
+        self._agg = {}
+        for athlete, rows in last_n.groupby(name_col, sort=False):
+            self._windows[athlete] = rows.drop(columns=[name_col])
+            self._agg[athlete] = self._aggregate(rows)
+
+        self._cohort_cache = OrderedDict()
+        self._version = 0                # add_test 每次加1，合并期间有新测试加入时结果不写入缓存
+        self._lock = threading.Lock()   # 同一缓存被多个会话和预渲染线程共用
+
+    def _aggregate(self, rows):
+        """单名运动员窗口内每个指标的 (有效个数, 均值, 离差平方和)"""
+        X = rows[self.columns].to_numpy(dtype=float)
+        n = np.sum(~np.isnan(X), axis=0).astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, np.nansum(X, axis=0) / np.where(n > 0, n, 1), 0.0)
+        m2 = np.nansum((X - mean) ** 2, axis=0)
+        return n, mean, m2
+
+    def has_data(self, athletes):
+        """队列中是否至少有一名运动员有测试数据"""
+        return any(a in self._agg for a in athletes)
+
+    def _cohort(self, athletes):
+        """合并队列内所有运动员的聚合量，得到每个指标的 (N, 均值, 标准差)"""
+        key = frozenset(athletes)
+        with self._lock:
+            cached = self._cohort_cache.get(key)
+            if cached is not None:
+                self._cohort_cache.move_to_end(key)
+                return cached
+            version = self._version
+            aggs = [self._agg[a] for a in key if a in self._agg]
+
+        if not aggs:
+            n_total = np.zeros(len(self.columns))
+            mean = np.zeros(len(self.columns))
+            std = np.ones(len(self.columns))
+        else:
+            n = np.array([agg[0] for agg in aggs])
+            means = np.array([agg[1] for agg in aggs])
+            m2 = np.array([agg[2] for agg in aggs])
+
+            n_total = n.sum(axis=0)
+            safe_n = np.where(n_total > 0, n_total, 1)
+            mean = (n * means).sum(axis=0) / safe_n
+            m2_total = m2.sum(axis=0) + (n * (means - mean) ** 2).sum(axis=0)
+            std = np.sqrt(m2_total / np.where(n_total > 1, n_total - 1, 1))
+
+        result = (n_total, mean, std)
+        with self._lock:
+            if version != self._version:
+                return result
+            self._cohort_cache[key] = result
+            while len(self._cohort_cache) > _COHORT_MAX_ENTRIES:
+                self._cohort_cache.popitem(last=False)
+        return result
+
+    def stats_for(self, athletes, columns):
+        """
+        返回与 columns 对齐的 (mu, sigma)
+
+        规则与原先逐次拼接计算一致：
+        - 有效值 ≥ 2：均值和样本标准差
+        - 有效值 = 1：mu=该值，sigma=1
+        - 没有有效值或列不存在（None）：mu=0，sigma=1
+        """
+        n_total, mean, std = self._cohort(athletes)
+        mu = np.zeros(len(columns))
+        sigma = np.ones(len(columns))
+        for j, col in enumerate(columns):
+            pos = self._col_pos.get(col)
+            if pos is None or n_total[pos] == 0:
+                continue
+            mu[j] = mean[pos]
+            if n_total[pos] >= 2:
+                sigma[j] = std[pos]
+        return mu, sigma
+
+    def add_test(self, row):
+        """
+        增量加入一次新测试（row: 包含姓名列、日期列和指标值的字典或Series）
+
+        只重新聚合该运动员的窗口（不超过 window 行），并清除包含该运动员的队列缓存。
+        新测试视为排在原数据之后：与窗口内同日期的测试并列时排在后面，和整体重建的稳定排序一致。
+        构建时没有数值的指标列不会新增（整体重建才会加入）；姓名为空的行忽略。
+        """
+        athlete = row[self.name_col]
+        if pd.isna(athlete):
+            return
+        values = pd.to_numeric(pd.Series([row.get(col, np.nan) for col in self.columns], dtype=object),
+                               errors='coerce')
+        new_frame = pd.DataFrame([values.to_numpy(dtype=float)], columns=self.columns)
+        new_frame.insert(0, self.date_col, pd.to_datetime(pd.Series([row[self.date_col]]), errors='coerce'))
+
+        with self._lock:
+            rows = self._windows.get(athlete)
+            rows = new_frame if rows is None else pd.concat([rows, new_frame], ignore_index=True)
+            rows = rows.sort_values(self.date_col, kind='stable').tail(self.window)
+            self._windows[athlete] = rows
+            self._agg[athlete] = self._aggregate(rows)
+            self._version += 1
+            for key in [k for k in self._cohort_cache if athlete in k]:
+                del self._cohort_cache[key]
+
+
+def get_baseline_cache(dataset_key, gender, df, name_col, date_col='Date', window=BASELINE_WINDOW, exclude_cols=()):
+    """
+    取得 (数据集, 性别, 窗口) 对应的基准缓存，不存在时用 df 构建
+
+    dataset_key 应能唯一标识上传的数据（如文件内容哈希）。
+    """
+    key = (dataset_key, gender, window)
+    with _registry_lock:
+        cache = _registry.get(key)
+        if cache is not None:
+            _registry.move_to_end(key)
+    if cache is not None:
+        with span('baseline', cache='hit'):
+            return cache
+
+    # 构建较慢，不持有锁；两个线程同时构建同一个键时保留先登记的那个
+    with span('baseline', cache='miss', rows=len(df), cols=len(df.columns)):
+        cache = CohortBaselineCache(df, name_col, date_col, window, exclude_cols)
+    with _registry_lock:
+        cache = _registry.setdefault(key, cache)
+        _registry.move_to_end(key)
+        while len(_registry) > _REGISTRY_MAX_ENTRIES:
+            _registry.popitem(last=False)
+    return cache
+
+
+def drop_baselines(keep=()):
+    """丢弃数据集标识不在 keep 中的基准缓存（数据集被淘汰后释放内存）"""
+    with _registry_lock:
+        for key in [k for k in _registry if k[0] not in keep]:
+            del _registry[key]
+
+
+def baseline_bytes():
+    """基准缓存占用的内存字节数"""
+    from .memory import deep_bytes
+
+    with _registry_lock:
+        caches = list(_registry.values())
+    total = 0
+    for cache in caches:
+        with cache._lock:   # 统计期间队列缓存不变
+            total += deep_bytes(cache)
+    return total
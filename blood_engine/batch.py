@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+全队批量报告：一次加载数据，为每名运动员渲染主题表格、趋势图和雷达图
+
+- 加载、合并、清洗只在主进程做一次
+- 每个性别的数据、参考范围和队列基准在工作进程启动时共享一次，任务只传 (性别, 姓名)
+- 工作进程直接把PNG写到输出目录，只把文件列表和错误信息传回主进程
+
+输出目录结构：
+    输出目录/性别/姓名/主题表格_<主题>.png
+                       趋势_<指标>.png
+                       雷达图.png
+"""
+
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .style import THEME_CONFIG, TREND_INDICATORS, RADAR_FIELDS, LOWER_IS_BETTER
+from .figure_cache import RENDER_TIERS
+
+BATCH_DPI = RENDER_TIERS['full']                       # 输出图片分辨率
+BATCH_MAX_WORKERS = max(1, os.cpu_count() or 1)        # 默认工作进程数
+NAME_COLUMNS = ['Name_final', 'Name', '姓名']
+BASELINE_EXCLUDE_COLS = ['DateStr', '性别', '姓名', 'Name', 'Name_final']
+# 进程池统一用 spawn 启动工作进程：Streamlit 服务是多线程的，fork 出的子进程可能继承
+# 其他线程（预渲染、高清渲染）正持有的 matplotlib/渲染锁，在 savefig 中永久等待
+MP_CONTEXT = multiprocessing.get_context('spawn')
+
+_worker_state = {}
+
+
+def safe_filename(text):
+    """把指标名/姓名中不能出现在文件名里的字符替换为下划线"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(text)).strip('_') or '_'
+
+
+def find_name_column(df):
+    """返回数据中的姓名列，没有时返回None"""
+    for col in NAME_COLUMNS:
+        if col in df.columns:
+            return col
+    return None
+
+
+def prepare_squad(df, male_ref_ranges, female_ref_ranges):
+    """
+    按性别拆分数据并预先计算每个性别的队列基准
+
+    返回 {性别: state}，state 里是工作进程渲染一名运动员需要的全部数据。
+    数据中没有'性别'列时，全部按男性参考范围处理。
+    """
+    from .athletes import AthleteIndex
+    from .baseline import CohortBaselineCache
+    from .indicators import find_indicator_column
+
+    name_col = find_name_column(df)
+    if name_col is None:
+        raise ValueError("未找到姓名列")
+    date_col = 'Date' if 'Date' in df.columns else 'Date_auto'
+
+    if '性别' in df.columns:
+        groups = [(g, df[df['性别'] == g]) for g in ['男', '女']]
+    else:
+        groups = [('男', df)]
+
+    squad = {}
+    for gender, gender_df in groups:
+        gender_df = gender_df[gender_df[name_col].notna()].reset_index(drop=True)
+        if gender_df.empty:
+            continue
+
+        athletes = sorted(gender_df[name_col].unique())
+        radar_fields = [f for f in RADAR_FIELDS if find_indicator_column(gender_df, f)]
+        baseline_stats = None
+        if len(radar_fields) >= 3:
+            # 基准组为同性别全体运动员
+            cache = CohortBaselineCache(gender_df, name_col, date_col, exclude_cols=BASELINE_EXCLUDE_COLS)
+            radar_cols = [find_indicator_column(gender_df, f) for f in radar_fields]
+            baseline_stats = cache.stats_for(athletes, radar_cols)
+
+        squad[gender] = {
+            'df': gender_df,
+            'index': AthleteIndex(gender_df, name_col, date_col),
+            'athletes': athletes,
+            'name_col': name_col,
+            'date_col': date_col,
+            'ref_ranges': male_ref_ranges if gender == '男' else female_ref_ranges,
+            'radar_fields': radar_fields,
+            'lower_is_better': [f for f in LOWER_IS_BETTER if f in radar_fields],
+            'baseline_stats': baseline_stats,
+        }
+    return squad
+
+
+def _init_worker(state):
+    """工作进程初始化：切换到Agg后端，设置中文字体"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.close('all')
+
+    from .fonts import setup_chinese_font
+    setup_chinese_font()
+
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def iter_athlete_figures(gs, gender, athlete):
+    """
+    依次生成一名运动员的全部图表（主题表格 → 雷达图 → 趋势图）
+
+    yield (文件名主干, 图表对象或None)；调用方负责保存并关闭图表。
+    """
+    from .plots import plot_theme_table, plot_trend_chart_multi, plot_radar_chart_with_baseline
+
+    index = gs['index']
+    if athlete not in index:
+        return
+    athlete_df = index.athlete_df(athlete)
+    latest = index.latest_row(athlete)
+
+    for theme_name, categories in THEME_CONFIG.items():
+        fig = plot_theme_table(latest, theme_name, categories, gs['ref_ranges'], gender)[0]
+        yield f"主题表格_{safe_filename(theme_name)}", fig
+
+    if gs['baseline_stats'] is not None:
+        fig = plot_radar_chart_with_baseline(
+            index.last_tests(athlete), gs['radar_fields'], gs['lower_is_better'],
+            gs['ref_ranges'], athlete, None, gender,
+            baseline_stats=gs['baseline_stats']
+        )
+        yield "雷达图", fig
+
+    for indicator in TREND_INDICATORS:
+        fig = plot_trend_chart_multi(athlete_df, indicator, gs['ref_ranges'], [athlete], None, gender)
+        yield f"趋势_{safe_filename(indicator)}", fig
+
+
+def _render_athlete(gender, athlete):
+    """渲染并保存一名运动员的全部图表，返回 (性别, 姓名, 写出的文件列表, 错误信息或None)"""
+    import matplotlib.pyplot as plt
+
+    state = _worker_state
+    gs = state['squad'][gender]
+    out_dir = os.path.join(state['out_dir'], gender, safe_filename(athlete))
+    written = []
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        for stem, fig in iter_athlete_figures(gs, gender, athlete):
+            if fig is None:
+                continue
+            path = os.path.join(out_dir, f"{stem}.png")
+            fig.savefig(path, dpi=state['dpi'])
+            plt.close(fig)
+            written.append(path)
+        return gender, athlete, written, None
+    except Exception as e:
+        plt.close('all')
+        return gender, athlete, written, str(e)
+
+
+def render_squad_reports(squad, out_dir, dpi=BATCH_DPI, max_workers=None, athletes=None):
+    """
+    为 squad（prepare_squad 的返回值）中的运动员渲染报告（生成器）
+
+    athletes: 可选，只渲染这些姓名；默认全部。
+    每完成一名运动员就 yield (性别, 姓名, 写出的文件列表, 错误信息或None)，顺序为完成顺序。
+    """
+    state = {'squad': squad, 'out_dir': out_dir, 'dpi': dpi}
+    tasks = [(gender, athlete) for gender, gs in squad.items() for athlete in gs['athletes']
+             if athletes is None or athlete in athletes]
+    max_workers = max_workers or BATCH_MAX_WORKERS
+
+    if max_workers == 1:
+        _init_worker(state)
+        for gender, athlete in tasks:
+            yield _render_athlete(gender, athlete)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=MP_CONTEXT,
+                             initializer=_init_worker, initargs=(state,)) as pool:
+        futures = [pool.submit(_render_athlete, gender, athlete) for gender, athlete in tasks]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+指标目录：数据加载完成后一次性统计每个指标列的概况
+
+每行一个指标列：
+- 类型：列的 dtype
+- 男 / 女（没有'性别'列时为'全部'）：该性别能转换为数字的测试次数
+- 首次测试 / 最近测试：有数值的最早、最晚测试日期
+- 所属主题：THEME_CONFIG 中包含该指标的"主题/分类"
+
+界面的指标多选框直接从目录取选项和覆盖次数，不再每次rerun扫描整张表。
+"""
+
+import numpy as np
+import pandas as pd
+
+from .indicators import NON_INDICATOR_COLS, find_indicator_column
+from .style import THEME_CONFIG, TREND_INDICATORS
+
+ALL_GENDERS = '全部'
+
+
+def _theme_membership(df):
+    """指标列 -> ['主题/分类', ...]"""
+    membership = {}
+    for theme_name, categories in THEME_CONFIG.items():
+        for category, indicators in categories.items():
+            label = f"{theme_name.split('_')[-1]}/{category.split(chr(10))[0]}"
+            for indicator in indicators:
+                col = find_indicator_column(df, indicator)
+                if col:
+                    membership.setdefault(col, []).append(label)
+    return membership
+
+
+def build_indicator_catalog(df):
+    """统计 df 中每个指标列的类型、各性别覆盖次数、首末测试日期和所属主题，返回以列名为索引的 DataFrame"""
+    cols = [col for col in df.columns if col not in NON_INDICATOR_COLS]
+    numeric = pd.DataFrame({col: pd.to_numeric(df[col], errors='coerce') for col in cols}, index=df.index)
+    has_value = numeric.notna()
+
+    if '性别' in df.columns:
+        genders = ['男', '女']
+        counts = has_value.groupby(df['性别']).sum().reindex(genders, fill_value=0).T
+    else:
+        genders = [ALL_GENDERS]
+        counts = has_value.sum().to_frame(ALL_GENDERS)
+
+    catalog = pd.DataFrame(index=pd.Index(cols, name='指标'))
+    catalog['类型'] = [str(getattr(df[col].dtype, 'subtype', df[col].dtype)) for col in cols]   # 稀疏列记元素类型
+    for gender in genders:
+        catalog[gender] = counts[gender].astype(int)
+
+    date_col = 'Date' if 'Date' in df.columns else 'Date_auto'
+    if date_col in df.columns and len(cols):
+        dates = pd.to_datetime(df[date_col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        masked = np.where(has_value.to_numpy(), dates[:, None], np.datetime64('NaT'))
+        masked = pd.DataFrame(masked, columns=cols)
+        catalog['首次测试'] = masked.min()
+        catalog['最近测试'] = masked.max()
+    else:
+        catalog['首次测试'] = pd.NaT
+        catalog['最近测试'] = pd.NaT
+
+    membership = _theme_membership(df)
+    catalog['所属主题'] = ['、'.join(membership.get(col, [])) for col in cols]
+    return catalog
+
+
+def catalog_indicators(catalog, gender):
+    """
+    某个性别可用的数值指标（按数据列顺序）
+
+    与 list_numeric_indicators(gender_df) 的规则一致：数值类型的列，或该性别至少有一个值能转换为数字；
+    一个都没有时返回 TREND_INDICATORS。
+    """
+    column = gender if gender in catalog.columns else ALL_GENDERS
+    numeric_dtype = catalog['类型'].isin(['float64', 'int64'])
+    selected = catalog.index[numeric_dtype | (catalog[column] > 0)].tolist()
+    return selected or list(TREND_INDICATORS)
+
+
+def coverage_label(catalog, gender):
+    """返回 format_func：在指标名后附上该性别的测试次数，例如 '铁蛋白（36次）'"""
+    column = gender if gender in catalog.columns else ALL_GENDERS
+    counts = catalog[column].to_dict() if column in catalog.columns else {}
+
+    def label(indicator):
+        n = counts.get(indicator)
+        return indicator if n is None else f"{indicator}（{n}次）"
+    return label
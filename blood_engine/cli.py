@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+命令行批量生成全队报告
+
+    python -m blood_engine.cli 血液数据.xlsx -o 报告输出 --jobs 4
+    python -m blood_engine.cli 血液数据.xlsx --ranges 参考范围.xlsx --athlete 张三 --athlete 李四
+    python -m blood_engine.cli 血液数据.xlsx --pdf -o 报告输出          # 全队一份多页PDF
+    python -m blood_engine.cli 血液数据.xlsx --store 历史数据.sqlite    # 同时追加到长表仓库
+    python -m blood_engine.cli --store 历史数据.sqlite --from-store    # 用仓库中累积的全部历史生成报告
+    python -m blood_engine.cli 血液数据.xlsx --cube 立方体              # 同时生成内存映射立方体
+
+为每名运动员输出4张主题表格、各趋势指标的趋势图和雷达图（见 batch.py 中的目录结构），
+最后打印耗时和吞吐量（名/秒）。
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+from .batch import BATCH_DPI, BATCH_MAX_WORKERS, prepare_squad, render_squad_reports
+from .fonts import setup_chinese_font
+from .loader import load_data_multisheet, clean_data_final
+from .ranges import load_reference_ranges_from_excel
+from .report_pdf import write_squad_pdf
+from .cube import build_cube
+from .store import BloodStore
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m blood_engine.cli',
+        description='批量生成全队运动员血液指标报告（主题表格、趋势图、雷达图）'
+    )
+    parser.add_argument('workbook', nargs='?', help='血液数据Excel文件（使用 --from-store 时可省略）')
+    parser.add_argument('--ranges', help='自定义参考范围Excel文件（默认使用 config.py 中的范围）')
+    parser.add_argument('-o', '--out', default='reports', help='输出目录（默认: reports）')
+    parser.add_argument('-j', '--jobs', type=int, default=BATCH_MAX_WORKERS,
+                        help=f'并行工作进程数（默认: {BATCH_MAX_WORKERS}，1 为单进程）')
+    parser.add_argument('--dpi', type=int, default=BATCH_DPI, help=f'图片分辨率（默认: {BATCH_DPI}）')
+    parser.add_argument('--athlete', action='append', help='只生成指定运动员，可重复')
+    parser.add_argument('--pdf', action='store_true', help='输出一份多页PDF（<输出目录>/血液指标报告.pdf）代替PNG')
+    parser.add_argument('--store', help='同时把数据追加到SQLite长表仓库（文件不存在时新建）')
+    parser.add_argument('--from-store', action='store_true',
+                        help='用 --store 仓库中的全部历史数据生成报告（指定了Excel时先把它写入仓库）')
+    parser.add_argument('--cube', help='同时生成内存映射的数据立方体目录（已存在时替换）')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不逐个打印运动员进度')
+    return parser
+
+
+def load_ranges(path):
+    """读取参考范围；未指定或读取失败时使用 config.py 中的默认范围"""
+    from config import MALE_REF_RANGES, FEMALE_REF_RANGES
+
+    if path:
+        male, female = load_reference_ranges_from_excel(path)
+        if male and female:
+            print(f"✅ 已加载自定义范围（男:{len(male)}项，女:{len(female)}项）")
+            return male, female
+        print("⚠️ 自定义范围加载失败，使用默认范围")
+    return MALE_REF_RANGES, FEMALE_REF_RANGES
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.from_store and not args.store:
+        parser.error('--from-store 需要同时指定 --store')
+    if args.workbook is None and not args.from_store:
+        parser.error('请指定血液数据Excel文件，或使用 --store 仓库 --from-store')
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(message)s')
+
+    import matplotlib
+    matplotlib.use('Agg')
+    setup_chinese_font()
+
+    male_ref_ranges, female_ref_ranges = load_ranges(args.ranges)
+
+    t0 = time.perf_counter()
+    df = None
+    if args.workbook:
+        df = load_data_multisheet(args.workbook)
+        if df is None:
+            print("❌ 数据加载失败")
+            return 1
+        df = clean_data_final(df)
+        if df is None or len(df) == 0:
+            print("❌ 数据清洗后为空")
+            return 1
+    if args.store:
+        with BloodStore(args.store) as store:
+            if df is not None:
+                n_cells = store.ingest(df)
+                first, last = store.date_span()
+                span = f"，仓库覆盖 {first:%Y-%m-%d} ~ {last:%Y-%m-%d}" if first is not None else ""
+                print(f"🗄️ 已写入仓库 {args.store}：{n_cells} 个数值{span}")
+            if args.from_store:
+                df = store.frame()
+                if len(df) == 0:
+                    print(f"❌ 仓库 {args.store} 中没有数据")
+                    return 1
+                print(f"🗄️ 从仓库读取 {df['Name'].nunique()} 人、{len(df)} 次测试")
+
+    if args.cube:
+        cube = build_cube(df, args.cube)
+        n_athletes, n_slots, n_indicators = cube.values.shape
+        print(f"🧊 已生成立方体 {args.cube}：{n_athletes} 人 × {n_slots} 次测试 × {n_indicators} 个指标")
+
+    squad = prepare_squad(df, male_ref_ranges, female_ref_ranges)
+    t_load = time.perf_counter() - t0
+    print(f"🎉 数据准备完成：共 {len(df)} 条记录，"
+          + "，".join(f"{g} {len(s['athletes'])} 人" for g, s in squad.items())
+          + f"（{t_load:.2f}s）")
+
+    if args.pdf:
+        os.makedirs(args.out, exist_ok=True)
+        path = os.path.join(args.out, '血液指标报告.pdf')
+        t1 = time.perf_counter()
+        n_pages = write_squad_pdf(squad, path, athletes=args.athlete, max_workers=args.jobs)
+        t_render = time.perf_counter() - t1
+        n_athletes = len(args.athlete) if args.athlete else sum(len(s['athletes']) for s in squad.values())
+        rate = n_athletes / t_render if t_render > 0 else 0.0
+        print(f"✅ 完成 {n_athletes} 名运动员，共 {n_pages} 页 → {path}")
+        print(f"⏱️ 加载 {t_load:.2f}s，渲染 {t_render:.2f}s，吞吐量 {rate:.2f} 名/秒（{args.jobs} 个进程）")
+        return 0
+
+    t1 = time.perf_counter()
+    done = failed = n_files = 0
+    for gender, athlete, written, error in render_squad_reports(
+            squad, args.out, dpi=args.dpi, max_workers=args.jobs, athletes=args.athlete):
+        done += 1
+        n_files += len(written)
+        if error:
+            failed += 1
+            print(f"❌ {gender} {athlete}: {error}")
+        elif not args.quiet:
+            print(f"  [{done}] {gender} {athlete}: {len(written)} 张图")
+    t_render = time.perf_counter() - t1
+
+    rate = done / t_render if t_render > 0 else 0.0
+    print(f"✅ 完成 {done} 名运动员（失败 {failed}），共 {n_files} 张图 → {args.out}")
+    print(f"⏱️ 加载 {t_load:.2f}s，渲染 {t_render:.2f}s，吞吐量 {rate:.2f} 名/秒（{args.jobs} 个进程）")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+内存映射的 运动员 × 测试次序 × 指标 数据立方体（全队多年历史分析使用）
+
+由清洗后的数据一次性生成一个目录：
+
+    values.f32      float32 立方体，形状 (运动员数, 最多测试次数, 指标数)，空位为 NaN
+    names.npy       运动员姓名                 (A,)
+    genders.npy     性别（没有'性别'列时为空串）  (A,)
+    counts.npy      每名运动员的测试次数          (A,)
+    dates.npy       每个测试位的日期 datetime64[D]，空位为 NaT   (A, T)
+    indicators.npy  指标列名                   (I,)
+    meta.json       形状和版本
+
+每名运动员的测试按日期排列在前 counts[a] 个位置（同一天多行以最后一行为准），
+检测限结果（'<0.5'）取数字部分。打开时用 np.memmap / np.load(mmap_mode='r') 只读映射，
+series() 和 recent() 返回立方体上的切片视图，不复制数据；latest() 和 frame() 按指标取列，
+结果是新的数组/数据框。多个进程打开同一个目录时共用操作系统的页缓存。
+
+适用范围：目前只由 `python -m blood_engine.cli --cube` 生成，供离线的全队、多年分析脚本读取。
+Streamlit 界面的趋势图、雷达图和主题表格仍使用各会话自己的 DataFrame，不读取立方体：
+立方体同一天只保留一次测试、检测限只保留数字、按 float32 存储，口径与界面（保留同日多次测试、
+显示原始文本、float64）不同，换成立方体会改变图表内容。
+"""
+
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .athletes import _slices
+from .indicators import find_indicator_column
+from .store import _indicator_columns, split_censored
+
+CUBE_VERSION = 1
+_VALUES_FILE = 'values.f32'
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def build_cube(df, path, name_col=None, date_col=None):
+    """
+    由 clean_data_final 的结果生成立方体目录 path（已存在时整体替换），返回 IndicatorCube
+
+    只收录至少有一个数值的指标列；姓名或日期缺失的行不收录。
+    """
+    from .batch import find_name_column
+
+    name_col = name_col or find_name_column(df)
+    date_col = date_col or ('Date' if 'Date' in df.columns else 'Date_auto')
+    if name_col is None or date_col not in df.columns:
+        raise ValueError('数据中找不到姓名列或日期列，无法生成立方体')
+
+    keyed = df[df[name_col].notna()].copy()
+    keyed['_day'] = pd.to_datetime(keyed[date_col], errors='coerce').dt.normalize()
+    keyed = (keyed[keyed['_day'].notna()]
+             .assign(**{name_col: lambda d: d[name_col].astype(str)})
+             .sort_values([name_col, '_day'], kind='stable')
+             .drop_duplicates([name_col, '_day'], keep='last'))
+
+    numeric = {}
+    for col in _indicator_columns(keyed, name_col, date_col):
+        if col == '_day':
+            continue
+        values = split_censored(keyed[col])[0]
+        if values.notna().any():
+            numeric[col] = values.to_numpy(dtype=np.float32)
+
+    rows = _slices(keyed[name_col].to_numpy())
+    names = np.array(list(rows), dtype=str)
+    counts = np.array([stop - start for start, stop in rows.values()], dtype=np.int32)
+    n_athletes, n_slots, n_indicators = len(names), int(counts.max(initial=0)), len(numeric)
+
+    # 每一行在立方体中的 (运动员, 测试位)
+    athlete_idx = np.repeat(np.arange(n_athletes), counts)
+    slot_idx = np.arange(len(keyed)) - np.repeat(np.r_[0, np.cumsum(counts)[:-1]], counts)
+
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    if n_athletes and n_slots and n_indicators:
+        cube = np.memmap(os.path.join(tmp, _VALUES_FILE), dtype=np.float32, mode='w+',
+                         shape=(n_athletes, n_slots, n_indicators))
+        cube[:] = np.nan
+        for j, values in enumerate(numeric.values()):
+            cube[athlete_idx, slot_idx, j] = values
+        cube.flush()
+        del cube
+    else:
+        open(os.path.join(tmp, _VALUES_FILE), 'wb').close()
+
+    dates = np.full((n_athletes, n_slots), np.datetime64('NaT'), dtype='datetime64[D]')
+    dates[athlete_idx, slot_idx] = keyed['_day'].to_numpy(dtype='datetime64[D]')
+    genders = (keyed.groupby(name_col, sort=False)['性别'].last().reindex(names).fillna('').astype(str).to_numpy()
+               if '性别' in keyed.columns else np.full(n_athletes, '', dtype=str))
+
+    np.save(os.path.join(tmp, 'names.npy'), names)
+    np.save(os.path.join(tmp, 'genders.npy'), genders.astype(str))
+    np.save(os.path.join(tmp, 'counts.npy'), counts)
+    np.save(os.path.join(tmp, 'dates.npy'), dates)
+    np.save(os.path.join(tmp, 'indicators.npy'), np.array(list(numeric), dtype=str))
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': CUBE_VERSION, 'shape': [n_athletes, n_slots, n_indicators]}, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return open_cube(path)
+
+
+def open_cube(path):
+    """打开（或复用本进程中已打开的）立方体；目录被重新生成后自动重新映射"""
+    stamp = os.path.getmtime(os.path.join(path, 'meta.json'))
+    key = os.path.abspath(path)
+    with _registry_lock:
+        cube = _registry.get(key)
+        if cube is None or cube.stamp != stamp:
+            cube = _registry[key] = IndicatorCube(path)
+        return cube
+
+
+class IndicatorCube:
+    """
+    只读映射的数据立方体（见模块说明）
+
+    - series(athlete, indicator, start, end): 一名运动员一个指标的 (日期, 数值)，切片视图
+    - recent(athlete, n): 最近 n 次测试 (日期, 数值矩阵[n, I])，切片视图
+    - latest(indicators, gender): 全队每人最新一次测试，运动员 × 指标的 DataFrame（复制）
+    - frame(athletes, indicators, start, end): 还原成宽表（复制为 float64），可直接交给现有绘图函数
+    """
+
+    def __init__(self, path):
+        self.path = path
+        meta_path = os.path.join(path, 'meta.json')
+        self.stamp = os.path.getmtime(meta_path)
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        shape = tuple(meta['shape'])
+
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode='r')
+        self.names = load('names.npy')
+        self.genders = load('genders.npy')
+        self.counts = load('counts.npy')
+        self.dates = load('dates.npy')
+        self.indicators = [str(col) for col in load('indicators.npy')]
+        self.values = (np.memmap(os.path.join(path, _VALUES_FILE), dtype=np.float32, mode='r', shape=shape)
+                       if all(shape) else np.full(shape, np.nan, dtype=np.float32))
+
+        self._athlete_pos = {str(name): a for a, name in enumerate(self.names)}
+        self._columns = pd.Index(self.indicators)
+        self._indicator_pos = {col: j for j, col in enumerate(self.indicators)}
+
+    @property
+    def athletes(self):
+        return list(self._athlete_pos)
+
+    def __contains__(self, athlete):
+        return athlete in self._athlete_pos
+
+    def column(self, indicator):
+        """界面上的指标名 → 立方体中的指标位置（沿用 find_indicator_column 的别名规则），找不到时为 None"""
+        col = find_indicator_column(pd.DataFrame(columns=self._columns), indicator)
+        return self._indicator_pos.get(col)
+
+    def _span(self, a, start=None, end=None):
+        """运动员 a 在 [start, end] 内的测试位范围（日期有序，二分查找）"""
+        n = int(self.counts[a])
+        dates = self.dates[a, :n]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'D'), 'left'))
+        hi = n if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), 'D'), 'right'))
+        return lo, max(lo, hi)
+
+    def series(self, athlete, indicator, start=None, end=None):
+        a, j = self._athlete_pos.get(athlete), self.column(indicator)
+        if a is None or j is None:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float32)
+        lo, hi = self._span(a, start, end)
+        return self.dates[a, lo:hi], self.values[a, lo:hi, j]
+
+    def recent(self, athlete, n):
+        a = self._athlete_pos.get(athlete)
+        if a is None:
+            return np.array([], dtype='datetime64[D]'), self.values[0:0, 0, :]
+        count = int(self.counts[a])
+        lo = max(0, count - n)
+        return self.dates[a, lo:count], self.values[a, lo:count, :]
+
+    def latest(self, indicators=None, gender=None):
+        """每名运动员最新一次测试的指标值（运动员 × 指标），gender 给出时只含该性别"""
+        cols = self._resolve(indicators)
+        mask = np.asarray(self.counts) > 0
+        if gender is not None:
+            mask &= np.asarray(self.genders) == gender
+        rows = np.flatnonzero(mask)
+        block = self.values[rows, np.asarray(self.counts)[rows] - 1][:, cols]
+        return pd.DataFrame(block, index=pd.Index(self.names[rows], name='Name'),
+                            columns=[self.indicators[j] for j in cols])
+
+    def _resolve(self, indicators):
+        if indicators is None:
+            return list(range(len(self.indicators)))
+        cols = [self.column(ind) for ind in indicators]
+        return list(dict.fromkeys(j for j in cols if j is not None))
+
+    def frame(self, athletes=None, indicators=None, start=None, end=None):
+        """宽表：Name、性别、Date + 指标列（float64，复制），一行一次测试"""
+        cols = self._resolve(indicators)
+        names = self.athletes if athletes is None else [a for a in athletes if a in self._athlete_pos]
+        pieces = []
+        for name in names:
+            a = self._athlete_pos[name]
+            lo, hi = self._span(a, start, end)
+            if hi == lo:
+                continue
+            block = pd.DataFrame(self.values[a, lo:hi][:, cols].astype(np.float64),
+                                 columns=[self.indicators[j] for j in cols])
+            block.insert(0, 'Name', name)
+            block.insert(1, '性别', str(self.genders[a]))
+            block.insert(2, 'Date', self.dates[a, lo:hi].astype('datetime64[ns]'))
+            pieces.append(block)
+        if not pieces:
+            return pd.DataFrame(columns=['Name', '性别', 'Date', *[self.indicators[j] for j in cols]])
+        return pd.concat(pieces, ignore_index=True)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+测试日期规范化
+
+各种写法的测试日期统一转换为精确到天的 datetime64[ns]。数据中只保存这一列（Date），
+分组、排序、去重、日期范围查询都直接用它；'YYYY-MM-DD' 文本只在显示时由 format_dates / format_date 生成。
+
+按值的类型走各自的快速路径，文本只对去重后的值解析一次：
+- datetime64 列、Timestamp / datetime / date 对象：直接截断到天
+- 数字：Excel 序列号（1900 日期系统，45292 → 2024-01-01）
+- 文本：'2024-01-05'、'2024/1/5'、'2024.01.05'、'2024年1月5日'、'20240105'（可带时间部分）
+其余写法交给 pd.to_datetime 兜底，无法识别的为 NaT。
+"""
+
+import datetime
+import re
+
+import numpy as np
+import pandas as pd
+
+EXCEL_EPOCH = np.datetime64('1899-12-30', 'D')
+EXCEL_SERIAL_RANGE = (1, 100000)          # 视为Excel序列号的数值范围（1900-01-01 ~ 2173年）
+
+_YMD = re.compile(r'^\s*(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*日?(?:[\sT].*)?$')
+_COMPACT = re.compile(r'^\s*(\d{4})(\d{2})(\d{2})\s*$')
+_NAT = np.datetime64('NaT', 'ns')
+
+
+def _from_serial(values):
+    """Excel 序列号数组 → datetime64[ns]，超出范围或缺失为 NaT"""
+    values = np.asarray(values, dtype=float)
+    low, high = EXCEL_SERIAL_RANGE
+    valid = np.isfinite(values) & (values >= low) & (values < high)
+    days = np.where(valid, np.floor(np.where(valid, values, 0)), 0).astype('int64')
+    result = (EXCEL_EPOCH + days.astype('timedelta64[D]')).astype('datetime64[ns]')
+    result[~valid] = _NAT
+    return result
+
+
+def _from_text(texts):
+    """文本数组 → datetime64[ns]：先匹配常见的年月日写法，剩下的交给 pd.to_datetime"""
+    texts = pd.Series(texts, dtype=object).astype(str)
+    result = np.full(len(texts), _NAT)
+
+    for pattern in (_YMD, _COMPACT):
+        pending = np.isnat(result)
+        if not pending.any():
+            break
+        parts = texts[pending].str.extract(pattern)
+        matched = parts.notna().all(axis=1).to_numpy()
+        if matched.any():
+            ymd = parts[matched].astype(int)
+            parsed = pd.to_datetime(dict(year=ymd[0], month=ymd[1], day=ymd[2]), errors='coerce')
+            idx = np.flatnonzero(pending)[matched]
+            result[idx] = parsed.to_numpy(dtype='datetime64[ns]')
+
+    pending = np.isnat(result)
+    if pending.any():
+        rest = texts[pending]
+        numeric = pd.to_numeric(rest, errors='coerce').to_numpy(dtype=float)
+        parsed = _from_serial(numeric)
+        unparsed = np.isnat(parsed)
+        if unparsed.any():
+            fallback = pd.to_datetime(rest[unparsed], errors='coerce', format='mixed')
+            parsed[unparsed] = fallback.to_numpy(dtype='datetime64[ns]')
+        result[pending] = parsed
+
+    return result.astype('datetime64[D]').astype('datetime64[ns]')
+
+
+def _from_objects(values):
+    """混合类型的去重值 → datetime64[ns]（日期对象、数字、文本分别处理）"""
+    values = np.asarray(values, dtype=object)
+    result = np.full(len(values), _NAT)
+
+    is_date = np.fromiter((isinstance(v, (datetime.date, np.datetime64)) for v in values), bool, len(values))
+    is_number = np.fromiter((isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in values),
+                            bool, len(values))
+    is_text = ~is_date & ~is_number
+
+    if is_date.any():
+        result[is_date] = pd.to_datetime(pd.Series(values[is_date]), errors='coerce').dt.normalize().to_numpy(
+            dtype='datetime64[ns]')
+    if is_number.any():
+        result[is_number] = _from_serial(values[is_number].astype(float))
+    if is_text.any():
+        result[is_text] = _from_text(values[is_text])
+    return result
+
+
+def normalize_dates(values):
+    """
+    一列测试日期 → 精确到天的 datetime64[ns] Series（索引与输入相同），无法识别的为 NaT
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(series.dtype, pd.SparseDtype):
+        series = series.sparse.to_dense()
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_localize(None)
+        return series.dt.normalize().astype('datetime64[ns]')
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.Series(_from_serial(series.to_numpy(dtype=float, na_value=np.nan)),
+                         index=series.index, name=series.name)
+
+    codes, uniques = pd.factorize(series)
+    parsed = _from_objects(np.asarray(uniques, dtype=object))
+    result = np.where(codes >= 0, parsed[np.maximum(codes, 0)], _NAT) if len(parsed) else np.full(len(codes), _NAT)
+    return pd.Series(result.astype('datetime64[ns]'), index=series.index, name=series.name)
+
+
+def format_dates(values, fmt='%Y-%m-%d'):
+    """datetime64 数组/Series → 显示用的日期文本（NaT 为 None）"""
+    dates = pd.DatetimeIndex(pd.to_datetime(np.asarray(values)))
+    labels = dates.strftime(fmt)
+    return [None if pd.isna(d) else label for d, label in zip(dates, labels)]
+
+
+def format_date(value, default='未知', fmt='%Y-%m-%d'):
+    """单个日期 → 显示用的文本；缺失时返回 default"""
+    if value is None or pd.isna(value):
+        return default
+    return pd.Timestamp(value).strftime(fmt)
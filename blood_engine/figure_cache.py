@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+图表两级渲染与缓存
+
+纯计算模块（不依赖 Streamlit），模块级缓存跨 rerun、跨会话保留。
+
+- 'preview': 低分辨率预览，先发送给浏览器，编码快、传输小
+- 'full'   : 打印级高清版，只在用户点击导出时生成，或交给后台线程预先生成
+
+两级都以同一个内容键缓存：键由生成图表的全部输入计算，输入不变就直接复用PNG。
+pyplot 不是线程安全的，所有渲染都在同一把锁内完成。
+"""
+
+import contextvars
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from .timing import lap, span
+
+# 各级分辨率（dpi）
+RENDER_TIERS = {
+    'preview': 72,
+    'full': 150,
+}
+
+FIGURE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 缓存PNG总大小上限（超过时淘汰最久未用的）
+
+_RENDER_LOCK = threading.RLock()
+
+
+def content_key(*parts):
+    """
+    由生成图表的全部输入计算内容键
+
+    DataFrame 按内容哈希（pd.util.hash_pandas_object），其余对象按 repr 哈希。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            h.update(repr(list(part.columns)).encode('utf-8'))
+            h.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+        else:
+            h.update(repr(part).encode('utf-8'))
+        h.update(b'\x1f')
+    return h.hexdigest()
+
+
+class FigureCache:
+    """按 (内容键, 级别) 缓存PNG字节的LRU缓存"""
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key, tier):
+        with self._lock:
+            png = self._entries.get((key, tier))
+            if png is not None:
+                self._entries.move_to_end((key, tier))
+            return png
+
+    def put(self, key, tier, png):
+        with self._lock:
+            old = self._entries.pop((key, tier), None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[(key, tier)] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def resize(self, max_bytes):
+        """调整总大小上限，立即淘汰超出的最久未用条目"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def render_png(self, key, tier, build_fig):
+        """
+        取得某一级别的PNG，未缓存时调用 build_fig() 生成图表并编码
+
+        build_fig 返回 matplotlib Figure 或 None（数据不足）；
+        返回 PNG 字节，数据不足时返回 None。
+        """
+        with span('render.png', tier=tier) as s:
+            png = self.get(key, tier)
+            if png is not None:
+                self.stats['hits'] += 1
+                s['cache'] = 'hit'
+                return png or None
+
+            self.stats['misses'] += 1
+            s['cache'] = 'miss'
+            with _RENDER_LOCK:
+                lap('lock')
+                # 等锁期间可能已被后台线程生成
+                png = self.get(key, tier)
+                if png is None:
+                    png = b''
+                    fig = build_fig()
+                    lap('build')
+                    if fig is not None:
+                        buf = io.BytesIO()
+                        fig.savefig(buf, format='png', dpi=RENDER_TIERS[tier])
+                        plt.close(fig)
+                        png = buf.getvalue()
+                        lap('savefig')
+                    self.put(key, tier, png)
+            s['bytes'] = len(png)
+            return png or None
+
+    def schedule(self, key, tier, build_fig):
+        """在后台线程中生成某一级别（已缓存或已在排队时不重复提交）"""
+        if self.get(key, tier) is not None:
+            return None
+        with self._lock:
+            self._pending = {k: f for k, f in self._pending.items() if not f.done()}
+            pending = self._pending.get((key, tier))
+            if pending is not None and not pending.done():
+                return pending
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='figure-render')
+            # 在提交时的上下文中运行：高清渲染的计时记录归入提交它的会话
+            future = self._executor.submit(contextvars.copy_context().run, self.render_png, key, tier, build_fig)
+            self._pending[(key, tier)] = future
+            return future
+
+    def info(self):
+        """缓存条目数、总字节数和命中统计"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.stats['hits'],
+                'misses': self.stats['misses'],
+            }
+
+
+FIGURE_CACHE = FigureCache()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+中文字体配置
+
+注册 fonts/SimHei.ttf 并设置 matplotlib 的中文字体。界面、命令行和工作进程在绘图前各调用一次。
+"""
+
+import os
+
+import matplotlib
+import matplotlib.font_manager as fm
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fonts', 'SimHei.ttf')
+
+_font_registered = False
+
+
+def setup_chinese_font(font_path=FONT_PATH):
+    """
+    设置中文字体
+
+    返回：字体文件存在并已注册时返回字体路径，否则返回 None（使用系统字体回退）
+    """
+    global _font_registered
+
+    found = os.path.exists(font_path)
+    if found and not _font_registered:
+        fm.fontManager.addfont(font_path)
+        _font_registered = True
+
+    matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    return font_path if found else None
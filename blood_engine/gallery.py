@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+雷达图画廊：用进程池并行渲染一组运动员的雷达图缩略图
+
+- 每个工作进程使用无界面的 Agg 后端
+- 运动员索引（每人最近几次测试）、参考范围和预先算好的基准（mu, sigma）在进程启动时共享一次，
+  每个任务只传运动员姓名，返回PNG字节
+- render_radar_gallery 是生成器，每完成一张就立即返回，界面可以边渲染边显示
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .batch import MP_CONTEXT
+
+GALLERY_THUMB_DPI = 40                                   # 缩略图分辨率（10英寸 × 40 = 400像素）
+GALLERY_MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))  # 最多使用的工作进程数
+
+_worker_state = {}
+
+
+def _init_worker(state):
+    """工作进程初始化：切换到Agg后端，设置中文字体，关闭从主进程继承来的图表"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.close('all')
+
+    from .fonts import setup_chinese_font
+    setup_chinese_font()
+
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def _render_one(athlete, state=None):
+    """
+    渲染一名运动员的雷达图，返回 (姓名, PNG字节或None, 错误信息或None)
+
+    state: 共享数据；工作进程中为 None，使用 _init_worker 保存的 _worker_state
+    """
+    import matplotlib.pyplot as plt
+    from .plots import plot_radar_chart_with_baseline
+
+    if state is None:
+        state = _worker_state
+    try:
+        index = state['index']
+        if athlete not in index:
+            return athlete, None, None
+
+        fig = plot_radar_chart_with_baseline(
+            index.last_tests(athlete), state['radar_fields'], state['lower_is_better'],
+            state['ref_ranges'], athlete, None, state['gender'],
+            baseline_stats=state['baseline_stats']
+        )
+        if fig is None:
+            return athlete, None, None
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=state.get('dpi', GALLERY_THUMB_DPI))
+        plt.close(fig)
+        return athlete, buf.getvalue(), None
+    except Exception as e:
+        return athlete, None, str(e)
+
+
+def render_radar_gallery(athletes, df, name_col, date_col, radar_fields, lower_is_better,
+                         ref_ranges, gender, baseline_stats, dpi=GALLERY_THUMB_DPI, max_workers=None, index=None):
+    """
+    并行渲染一组运动员的雷达图缩略图（生成器）
+
+    index: 可选，已建好的 AthleteIndex；工作进程只需要其中每人最近几次测试
+    每完成一张就 yield (姓名, PNG字节或None, 错误信息或None)，顺序为完成顺序。
+    """
+    if index is None:
+        from .athletes import AthleteIndex
+        index = AthleteIndex(df, name_col, date_col)
+
+    state = {
+        'index': index,
+        'radar_fields': radar_fields,
+        'lower_is_better': lower_is_better,
+        'ref_ranges': ref_ranges,
+        'gender': gender,
+        'baseline_stats': baseline_stats,
+        'dpi': dpi,
+    }
+    max_workers = max_workers or GALLERY_MAX_WORKERS
+
+    if max_workers == 1:
+        # 单进程时在当前进程逐个渲染：不调用 _init_worker（避免关闭当前进程里其他会话的图表），
+        # 也不写模块级 _worker_state（其他会话可能同时在渲染）；pyplot 不是线程安全的，
+        # 与预渲染/高清渲染线程共用同一把渲染锁（锁只在绘制一张图期间持有，不跨 yield）
+        from .figure_cache import _RENDER_LOCK
+
+        for athlete in athletes:
+            with _RENDER_LOCK:
+                result = _render_one(athlete, state)
+            yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=MP_CONTEXT,
+                             initializer=_init_worker, initargs=(state,)) as pool:
+        futures = [pool.submit(_render_one, athlete) for athlete in athletes]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""
+指标解析与评价：五档状态判断、数值格式化、指标列智能查找
+
+- get_indicator_status: 单个值的状态
+- find_indicator_column: 单个指标的列名。精确匹配直接返回，其余（别名、前缀、模糊匹配）按列名序列缓存，
+  同一数据集重复查找不再逐列扫描
+"""
+
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from .style import (
+    COLOR_SEVERE_LOW, COLOR_LOW, COLOR_NORMAL, COLOR_HIGH, COLOR_SEVERE_HIGH,
+    COLOR_GOOD, COLOR_EXCELLENT
+)
+
+
+HIGH_IS_BETTER_INDICATORS = ['铁蛋白', '血红蛋白', '睾酮', '游离睾酮']     # 高于正常范围是好事
+NO_HIGH_EVALUATION_INDICATORS = ['维生素B1', '维生素B2', '维生素B12']     # 偏高不评价
+FERRITIN_ATTENTION = {'男': 300, '女': 200}                              # 铁蛋白高于此值需注意
+
+def get_indicator_status(indicator, value, ref_ranges, gender=None):
+    """判断指标状态（五档）- 完全修复版
+    
+    参数:
+    - indicator: 指标名称
+    - value: 指标值
+    - ref_ranges: 参考范围字典
+    - gender: 性别（'男'或'女'），可选，用于铁蛋白特殊评价
+    """
+    # 先检查是否为NaN
+    if indicator not in ref_ranges or pd.isna(value):
+        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
+    
+    # 🔧 修复1：转换value为数值类型
+    try:
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '' or value == '-' or value.lower() == 'nan':
+                return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
+            value = float(value)
+        elif not isinstance(value, (int, float)):
+            value = float(value)
+    except (ValueError, TypeError):
+        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
+
+    ranges = ref_ranges[indicator]
+    
+    # ⭐ 新增：检查是否为空字典（不评价的指标）
+    if not ranges or len(ranges) == 0:
+        return '-', COLOR_NORMAL, 'N/A'
+    
+    # 🔧 修复2：确保参考范围值也是数值类型
+    try:
+        low_1 = ranges.get('low_1')
+        low_2 = ranges.get('low_2')
+        high_2 = ranges.get('high_2')
+        high_1 = ranges.get('high_1')
+        
+        # 转换参考范围值为浮点数
+        if low_1 is not None and not isinstance(low_1, (int, float)):
+            low_1 = float(low_1) if not pd.isna(low_1) else None
+        if low_2 is not None and not isinstance(low_2, (int, float)):
+            low_2 = float(low_2) if not pd.isna(low_2) else None
+        if high_2 is not None and not isinstance(high_2, (int, float)):
+            high_2 = float(high_2) if not pd.isna(high_2) else None
+        if high_1 is not None and not isinstance(high_1, (int, float)):
+            high_1 = float(high_1) if not pd.isna(high_1) else None
+    except (ValueError, TypeError):
+        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
+
+    # 高优指标列表（高于正常范围是好事）
+    high_is_better_indicators = HIGH_IS_BETTER_INDICATORS
+    
+    # ⭐ 新增：偏高不评价的指标列表（偏高时返回"正常"）
+    no_high_evaluation_indicators = NO_HIGH_EVALUATION_INDICATORS
+    
+    # ⭐ 新增：铁蛋白特殊处理 - 过高需要注意
+    if indicator == '铁蛋白' and gender:
+        if (gender == '男' and value > 300) or (gender == '女' and value > 200):
+            return '需注意', '#FFA500', 'attention_needed'  # 橙色
+
+    # 🔧 修复3：判断状态时添加异常保护
+    try:
+        if pd.notna(low_1) and value < low_1:
+            return '严重偏低', COLOR_SEVERE_LOW, 'severe_low'
+        elif pd.notna(low_2) and value < low_2:
+            return '偏低', COLOR_LOW, 'low'
+        elif pd.notna(high_1) and value > high_1:
+            # ⭐ 修改：如果是不评价偏高的指标，返回"-"
+            if indicator in no_high_evaluation_indicators:
+                return '-', COLOR_NORMAL, 'N/A'
+            elif indicator in high_is_better_indicators:
+                return '优秀', COLOR_EXCELLENT, 'excellent'  # 使用绿色
+            else:
+                return '严重偏高', COLOR_SEVERE_HIGH, 'severe_high'
+        elif pd.notna(high_2) and value > high_2:
+            # ⭐ 修改：如果是不评价偏高的指标，返回"-"
+            if indicator in no_high_evaluation_indicators:
+                return '-', COLOR_NORMAL, 'N/A'
+            elif indicator in high_is_better_indicators:
+                return '良好', COLOR_GOOD, 'good'  # 使用绿色
+            else:
+                return '偏高', COLOR_HIGH, 'high'
+        else:
+            return '正常', COLOR_NORMAL, 'normal'
+    except (TypeError, ValueError):
+        return '-', COLOR_NORMAL, 'N/A'  # ⭐ 改为COLOR_NORMAL
+
+
+def format_number(val):
+    """智能格式化数值，保留完整小数位但去除尾部0"""
+    if pd.isna(val):
+        return "—"
+    try:
+        val = float(val)
+        # 如果是整数，直接显示整数
+        if val == int(val):
+            return f"{int(val)}"
+        # 否则保留原始精度，但去除尾部0
+        # 先格式化为字符串，保留足够精度
+        formatted = f"{val:.10f}".rstrip('0').rstrip('.')
+        return formatted
+    except (ValueError, TypeError):
+        return "—"
+
+
+# 指标别名映射（用于处理常见的名称差异）
+INDICATOR_ALIASES = {
+    # 红细胞指标
+    '平均红细胞血红蛋白浓度': ['平均红细胞血红浓度', 'MCHC', '平均血红蛋白浓度'],
+    '平均红细胞血红蛋白': ['平均红细胞血红蛋白量', 'MCH'],
+    '平均红细胞体积': ['平均红细胞容积', 'MCV'],
+    '平均红细胞容积': ['平均红细胞体积', 'MCV'],
+    '平均血红蛋白浓度': ['平均红细胞血红蛋白浓度', 'MCHC'],
+    '网织红细胞百分比': ['网织红细胞', 'retic', 'Retic'],
+    
+    # 炎症指标
+    '超敏C反应蛋白': ['C反应蛋白', 'CRP', 'hsCRP', 'hs-CRP'],
+    
+    # 维生素指标（季度测试）
+    '维生素B1': ['VB1', 'VitB1'],
+    '维生素B2': ['VB2', 'VitB2'],
+    '维生素B6（PA）': ['VB6', 'VitB6', 'VitB6(PA)', 'B6'],  # ⭐ 修改
+    '维生素B6（PLP）': ['vitB6（PLP）', 'VitB6(PLP)', 'B6(PLP)'],  # ⭐ 新增
+    '维生素B12': ['VB12', 'VitB12'],
+    '叶酸': ['FOL', '维生素B9'],
+    '维生素D3': ['VD3', 'VD3(25-OH)', 'VD-(25-OH)'],
+    
+    # 电解质（季度测试）
+    '钾': ['K'],
+    '钠': ['Na'],
+    '氯': ['Cl'],
+    '钙': ['Ca'],
+    '镁': ['Mg'],
+    
+    # 甲状腺功能（年度测试）
+    '总甲状腺素': ['T4', 'TT4'],
+    '总三碘甲状腺原氨酸': ['T3', 'TT3'],
+    '游离三碘甲状原氨酸': ['FT3', '游离T3'],
+    '游离甲状腺素': ['FT4', '游离T4'],
+    '超敏促甲状腺素': ['TSH', 'hs-TSH', '促甲状腺激素'],
+    
+    # 肝功能（年度测试）
+    '丙氨酸氨基转移酶': ['ALT', '谷丙转氨酶', '丙氨酸基转移酶'],
+    '天冬氨酸氨基转移酶': ['AST', '谷草转氨酶'],
+    '碱性磷酸酶': ['ALP'],
+    'γ-谷氨酰基转移酶': ['GGT', 'γ-GT', 'γ-谷氨酰转移酶'],
+    '总胆红素': ['TBIL', 'TB'],
+    '直接胆红素': ['DBIL', 'DB'],
+    '间接胆红素': ['IBIL', 'IB'],
+    '总蛋白': ['TP'],
+    '白蛋白': ['ALB', 'Alb'],
+    
+    # 血脂（年度测试）
+    '甘油三酯': ['TG', 'TAG'],
+    '高密度脂蛋白': ['HDL', 'HDL-C'],
+    '总胆固醇': ['TC', 'CHOL'],
+    '低密度脂蛋白': ['LDL', 'LDL-C'],
+}
+
+_COLUMN_CACHE_MAX_ENTRIES = 64
+_column_cache = OrderedDict()     # 列名序列 -> {指标: 匹配到的列名或None}
+_index_lookups = {}               # id(列索引) -> (弱引用, 上面的查找结果)，同一个列索引对象不必再取列名序列
+# 脚本线程、预渲染线程、图表渲染线程都会查找指标列，缓存的读取、插入、淘汰都在锁内完成。
+# 用 RLock：弱引用回调（_forget_index）可能在持锁期间由垃圾回收在同一线程触发
+_column_lock = threading.RLock()
+_NOT_CACHED = object()
+
+
+def _forget_index(ref, key):
+    with _column_lock:
+        entry = _index_lookups.get(key)
+        if entry is not None and entry[0] is ref:
+            del _index_lookups[key]
+
+
+def _column_lookups(columns):
+    """列名序列对应的查找结果缓存（LRU）；先按列索引对象查，再按列名内容查"""
+    with _column_lock:
+        entry = _index_lookups.get(id(columns))
+        if entry is not None and entry[0]() is columns:
+            return entry[1]
+
+    key = tuple(columns.tolist()) if hasattr(columns, 'tolist') else tuple(columns)
+    try:
+        ref = weakref.ref(columns, lambda r, k=id(columns): _forget_index(r, k))
+    except TypeError:       # list 等不能弱引用
+        ref = None
+    with _column_lock:
+        found = _column_cache.get(key)
+        if found is None:
+            found = _column_cache[key] = {}
+            if len(_column_cache) > _COLUMN_CACHE_MAX_ENTRIES:
+                _column_cache.popitem(last=False)
+        else:
+            _column_cache.move_to_end(key)
+        if ref is not None:
+            _index_lookups[id(columns)] = (ref, found)
+    return found
+
+
+def _cached_column(found, columns, indicator):
+    """从查找结果缓存中取一个指标的列名，没有时扫描后存入（扫描在锁外，并发时最多重复扫描一次）"""
+    with _column_lock:
+        col = found.get(indicator, _NOT_CACHED)
+    if col is _NOT_CACHED:
+        col = _scan_indicator_column(columns, indicator)
+        with _column_lock:
+            found[indicator] = col
+    return col
+
+
+def _clear_column_cache():
+    with _column_lock:
+        _column_cache.clear()
+        _index_lookups.clear()
+
+
+def find_indicator_column(df, indicator):
+    """智能查找指标列（支持带#的列名、模糊匹配、别名匹配）；精确匹配以外的结果按列名序列缓存"""
+    columns = df.columns
+    if indicator in columns:
+        return indicator
+    return _cached_column(_column_lookups(columns), columns, indicator)
+
+
+def _scan_indicator_column(columns, indicator):
+    """逐列扫描查找指标列（find_indicator_column 的匹配规则，不使用缓存）"""
+    # ⭐ 特殊处理：重要指标优先精确匹配（避免匹配到.1后缀的重复列）
+    PRIORITY_INDICATORS = ['睾酮', '游离睾酮', '皮质醇', '睾酮/皮质醇比值']
+    if indicator in PRIORITY_INDICATORS:
+        # 优先精确匹配
+        if indicator in columns:
+            return indicator
+        # 如果没有精确匹配，再尝试带#后缀的
+        for col in columns:
+            col_str = str(col)
+            if col_str.startswith(indicator):
+                suffix = col_str[len(indicator):]
+                if suffix.startswith('#'):  # 只允许#后缀，不允许.数字
+                    return col
+
+    # 方法1：精确匹配
+    if indicator in columns:
+        return indicator
+
+    # 方法2：别名匹配
+    # 先查找是否有直接的别名定义
+    if indicator in INDICATOR_ALIASES:
+        for alias in INDICATOR_ALIASES[indicator]:
+            if alias in columns:
+                return alias
+            # 也尝试前缀匹配别名
+            possible_cols = [col for col in columns if str(col).startswith(alias)]
+            if possible_cols:
+                return possible_cols[0]
+
+    # 反向查找：indicator是否是某个别名
+    for main_name, aliases in INDICATOR_ALIASES.items():
+        if indicator in aliases:
+            # 尝试匹配主名称
+            if main_name in columns:
+                return main_name
+            possible_cols = [col for col in columns if str(col).startswith(main_name)]
+            if possible_cols:
+                return possible_cols[0]
+            # 尝试匹配其他别名
+            for alias in aliases:
+                if alias in columns:
+                    return alias
+                possible_cols = [col for col in columns if str(col).startswith(alias)]
+                if possible_cols:
+                    return possible_cols[0]
+
+    # 方法3：前缀匹配（处理带#的列名）
+    possible_cols = [col for col in columns if str(col).startswith(indicator)]
+    if possible_cols:
+        return possible_cols[0]
+
+    # 方法4：去除空格后匹配
+    indicator_no_space = indicator.replace(' ', '').replace('\u3000', '')
+    for col in columns:
+        col_no_space = str(col).replace(' ', '').replace('\u3000', '')
+        if col_no_space == indicator_no_space:
+            return col
+        if col_no_space.startswith(indicator_no_space):
+            return col
+
+    # 方法5：部分匹配（宽松匹配）
+    for col in columns:
+        col_str = str(col)
+        col_base = col_str.split('#')[0]  # 去除#后缀
+
+        # 如果指标名是列名的子串
+        if indicator in col_str or indicator in col_base:
+            return col
+
+        # 如果列名是指标名的子串
+        if col_base in indicator:
+            return col
+
+    # 方法6：关键词匹配（最宽松）
+    indicator_clean = re.sub(r'[（(].*?[）)]', '', indicator)  # 去除括号及内容
+    indicator_clean = indicator_clean.strip()
+
+    for col in columns:
+        col_str = str(col).split('#')[0]  # 去除#后缀
+        col_clean = re.sub(r'[（(].*?[）)]', '', col_str)
+        col_clean = col_clean.strip()
+
+        # 如果清理后的名称相同
+        if indicator_clean == col_clean:
+            return col
+
+        # 如果指标名包含在列名中，或列名包含在指标名中
+        if indicator_clean in col_clean or col_clean in indicator_clean:
+            return col
+
+    # 方法7：模糊匹配（允许1-2个字符不同）
+    # 例如："平均红细胞血红浓度" vs "平均红细胞血红蛋白浓度"
+    for col in columns:
+        col_str = str(col).split('#')[0].strip()
+        # 去除括号内容后比较
+        col_clean = re.sub(r'[（(].*?[）)]', '', col_str).strip()
+        indicator_clean_v2 = re.sub(r'[（(].*?[）)]', '', indicator).strip()
+
+        # 如果长度相近（差距在3个字符以内）
+        if abs(len(col_clean) - len(indicator_clean_v2)) <= 3:
+            # 计算相似度：有多少个字符是相同的
+            common_chars = sum(1 for c in indicator_clean_v2 if c in col_clean)
+            similarity = common_chars / max(len(indicator_clean_v2), len(col_clean))
+
+            # 如果相似度超过80%，认为匹配
+            if similarity >= 0.8:
+                return col
+
+    return None
+
+
+# 不是指标的列（姓名、日期、性别、编号等）
+NON_INDICATOR_COLS = ['Name', 'Name_final', '姓名', 'Date', 'Date_auto', '日期', 'DateStr',
+                      '性别', 'Gender', '编号', 'ID', 'Unnamed: 0']
+
+
+def list_numeric_indicators(df):
+    """返回 df 中所有可用的数值指标列（至少有一个值能转换为数字）；一个都没有时返回 TREND_INDICATORS"""
+    from .style import TREND_INDICATORS
+
+    indicators = []
+    for col in df.columns:
+        if col in NON_INDICATOR_COLS:
+            continue
+        try:
+            dtype = getattr(df[col].dtype, 'subtype', df[col].dtype)    # 稀疏列按其元素类型判断
+            if dtype in ['float64', 'int64'] or pd.to_numeric(df[col], errors='coerce').notna().any():
+                indicators.append(col)
+        except Exception:
+            pass
+    return indicators or list(TREND_INDICATORS)
+
+
+def default_trend_indicators(all_indicators):
+    """趋势图默认选中的指标：TREND_INDICATORS 中数据里有的，都没有时取前3个"""
+    from .style import TREND_INDICATORS
+
+    selected = [ind for ind in TREND_INDICATORS if ind in all_indicators]
+    return selected or list(all_indicators[:3])
+
+
+def default_radar_indicators(all_indicators):
+    """雷达图默认选中的指标：RADAR_FIELDS 中数据里有的，都没有时取前8个"""
+    from .style import RADAR_FIELDS
+
+    selected = [ind for ind in RADAR_FIELDS if ind in all_indicators]
+    return selected or list(all_indicators[:8])
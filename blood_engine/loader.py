@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+"""
+数据加载：读取多个sheet、展平双层表头、按 姓名+测试日期 合并、清洗
+
+季度、年度和"其他"sheet 的指标左连接到每一行月周测试上，大部分单元格为空；
+清洗完成后这些低频列转为 pandas 稀疏列（只保存有值的单元格），用到时按普通列读取即可。
+LazyWorkbook 只立即读取月周测试指标，辅助sheet在第一次用到其中的指标时才读取。
+"""
+
+import io
+import threading
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from config import COLUMN_NAME_MAPPING
+from .dates import normalize_dates
+from .messages import report
+from .memory import track_peak
+from .timing import span, timed
+
+LOW_FREQUENCY_DENSITY = 0.5     # 非月周sheet的列有值比例低于此值时转为稀疏列
+MONTHLY_SHEET = '月周测试指标'
+AUX_SHEETS = {'季度测试指标': '季度测试', '年度测试指标': '年度测试', '其他': '其他'}   # 辅助sheet -> 提示中的简称
+AUX_BASIC_COLS = [
+    '项目', '编号', '姓名', '性别', '出生年月日', '身高', '体重', '测试日期',
+    'Name', 'Name_final', 'Date', 'Date_auto',
+    '教练', '训练地点', '测试单位', '测试阶段', '重点运动员', '专项'
+]
+
+
+def _read_monthly(source):
+    """读取月周测试指标（主数据，header=0），列名保证唯一"""
+    with span(f'excel.{MONTHLY_SHEET}') as s:
+        df_monthly = pd.read_excel(
+            source,
+            sheet_name=MONTHLY_SHEET,
+            header=0,
+            skiprows=lambda x: x in range(1, 11)
+        )
+        s['rows'], s['cols'] = df_monthly.shape
+    report('write', f"   ✓ 月周测试：{len(df_monthly)} 行，{len(df_monthly.columns)} 列")
+
+    # 确保列名唯一
+    new_columns = []
+    for i, col in enumerate(df_monthly.columns):
+        col_str = str(col)
+        count = new_columns.count(col_str)
+        if count > 0:
+            unique_col = f"{col_str}#{i}"
+            new_columns.append(unique_col)
+        else:
+            new_columns.append(col_str)
+    df_monthly.columns = new_columns
+    return df_monthly
+
+
+def _read_aux(source, sheet_name):
+    """读取一个辅助sheet（双层表头）并展平列名；读取失败时返回 None"""
+    label = AUX_SHEETS[sheet_name]
+    try:
+        report('write', f"正在读取：{sheet_name}...")
+        # 使用header=[0,1]读取双层表头
+        with span(f'excel.{sheet_name}') as s:
+            df_raw = pd.read_excel(source, sheet_name=sheet_name, header=[0, 1])
+            s['rows'], s['cols'] = df_raw.shape
+        # 合并双层列名
+        df_aux = flatten_multiindex_columns(df_raw, label)
+        report('write', f"   ✓ {label}：{len(df_aux)} 行，{len(df_aux.columns)} 列")
+        return df_aux
+    except Exception as e:
+        report('warning', f"   ⚠ {sheet_name}读取失败：{e}")
+        return None
+
+
+@timed('load')
+def load_data_multisheet(file_path_or_buffer):
+    """
+    从多个sheet加载数据并合并
+    支持：月周测试指标、季度测试指标、年度测试指标、其他
+    处理双层表头
+
+    只需要部分指标时可以用 LazyWorkbook：辅助sheet在用到时才读取。
+    """
+    try:
+        report('info', "📊 开始读取多个sheet的数据...")
+        
+        # ===== 1. 读取月周测试指标（主数据，header=0）=====
+        report('write', "正在读取：月周测试指标...")
+        df_monthly = _read_monthly(file_path_or_buffer)
+        
+        # ===== 2~4. 季度测试指标（维生素和电解质）、年度测试指标（甲状腺、肝功、血脂）、其他（触珠蛋白等）=====
+        df_quarterly, df_yearly, df_other = (_read_aux(file_path_or_buffer, sheet) for sheet in AUX_SHEETS)
+        
+        # ===== 5. 合并数据 =====
+        report('write', "\n正在合并数据...")
+        df_merged = merge_all_sheets(df_monthly, df_quarterly, df_yearly, df_other)
+        
+        report('success', f"✅ 数据合并完成：{len(df_merged)} 行，{len(df_merged.columns)} 列")
+        
+        return df_merged
+        
+    except Exception as e:
+        report('error', f"❌ 数据加载失败：{e}")
+        report('error', traceback.format_exc())
+        return None
+
+
+class LazyWorkbook:
+    """
+    按需读取的血液数据Excel：月周测试指标立即读取，辅助sheet在第一次用到其中的指标时才读取
+
+    - frame(): 已读取的sheet合并、清洗后的数据（全部读取后与 load_data_multisheet + clean_data_final 相同）
+    - sheets_for(indicators): 这些指标所在的、尚未读取的辅助sheet
+    - load(sheets) / load_all(): 读取并合并辅助sheet，返回是否有新的sheet读入
+    - pending_indicators(): 尚未读取的辅助sheet中的指标列名（只读表头）
+    - loaded: 已读取的辅助sheet
+    - snapshot(): 同一时刻的 (loaded, frame())，供后台线程读取辅助sheet时使用
+
+    辅助sheet的指标归属由其表头（经 flatten_multiindex_columns 和 COLUMN_NAME_MAPPING）决定，
+    指标名按 find_indicator_column 的别名规则匹配，与界面、THEME_CONFIG 使用的名字一致。
+    月周测试指标读取失败时构造函数抛出异常。
+    """
+
+    def __init__(self, source):
+        # 上传的文件以 bytes 保存，之后每次读取辅助sheet都重新包装成文件对象
+        self._source = source.getvalue() if hasattr(source, 'getvalue') else source
+        self._lock = threading.RLock()
+        report('info', "📊 读取月周测试指标（其余sheet用到时再读取）...")
+        with track_peak(f'ingest.{MONTHLY_SHEET}'):
+            self._monthly = _read_monthly(self._open())
+        self._aux = {}          # sheet -> 展平后的数据框（读取失败为 None）
+        self._headers = None    # sheet -> 该sheet的指标列名（只读表头）
+        self._frame = None
+
+    def _open(self):
+        return io.BytesIO(self._source) if isinstance(self._source, bytes) else self._source
+
+    @property
+    def loaded(self):
+        return tuple(sheet for sheet in AUX_SHEETS if sheet in self._aux)
+
+    def _aux_headers(self):
+        if self._headers is None:
+            headers = {}
+            try:
+                book = pd.ExcelFile(self._open())
+            except Exception:
+                book = None
+            for sheet, label in AUX_SHEETS.items():
+                cols = []
+                if book is not None and sheet in book.sheet_names:
+                    try:
+                        head = flatten_multiindex_columns(book.parse(sheet, header=[0, 1], nrows=0), label)
+                        cols = [COLUMN_NAME_MAPPING.get(col, col) for col in head.columns
+                                if col not in AUX_BASIC_COLS and not str(col).startswith('Unnamed')]
+                    except Exception:
+                        pass
+                headers[sheet] = cols
+            self._headers = headers
+        return self._headers
+
+    def pending_indicators(self):
+        """尚未读取的辅助sheet中的指标列名（按sheet顺序去重）"""
+        with self._lock:
+            headers = self._aux_headers()
+            cols = [col for sheet in AUX_SHEETS if sheet not in self._aux for col in headers[sheet]]
+        return list(dict.fromkeys(cols))
+
+    def sheets_for(self, indicators):
+        """indicators 中不在已读取数据里、但出现在未读取辅助sheet表头中的指标所在的sheet"""
+        from .indicators import find_indicator_column
+
+        with self._lock:
+            current = self.frame()
+            headers = self._aux_headers()
+            missing = [ind for ind in indicators if find_indicator_column(current, ind) is None]
+            sheets = []
+            for sheet in AUX_SHEETS:
+                if sheet in self._aux or not headers[sheet]:
+                    continue
+                head = pd.DataFrame(columns=headers[sheet])
+                if any(find_indicator_column(head, ind) for ind in missing):
+                    sheets.append(sheet)
+        return sheets
+
+    def load(self, sheets):
+        """读取并合并 sheets 中尚未读取的辅助sheet，返回是否有新的sheet读入"""
+        with self._lock:
+            new = [sheet for sheet in sheets if sheet in AUX_SHEETS and sheet not in self._aux]
+            read = {}
+            for sheet in new:
+                with track_peak(f'ingest.{sheet}'):
+                    read[sheet] = _read_aux(self._open(), sheet)
+            if new:
+                # 全部读完后一次替换：其他线程不加锁读取 loaded 时不会看到只读了一半的状态
+                self._aux = {**self._aux, **read}
+                self._frame = None
+        return bool(new)
+
+    def load_for(self, indicators):
+        return self.load(self.sheets_for(indicators))
+
+    def load_all(self):
+        return self.load(list(AUX_SHEETS))
+
+    def snapshot(self):
+        """(已读取的辅助sheet, 对应的数据)，两者保证一致"""
+        with self._lock:
+            return self.loaded, self.frame()
+
+    def frame(self):
+        """已读取的sheet合并、清洗后的数据（结果缓存到下一次读入新sheet）"""
+        with self._lock:
+            if self._frame is None:
+                aux = [self._aux.get(sheet) for sheet in AUX_SHEETS]
+                with track_peak('ingest.merge+clean'):
+                    self._frame = clean_data_final(merge_all_sheets(self._monthly, *aux))
+            return self._frame
+
+
+def flatten_multiindex_columns(df, sheet_name):
+    """
+    将双层MultiIndex列名展平为单层
+    优先使用具体的指标名称
+    """
+    # 定义分类名称（这些应该跳过，使用level1）
+    category_names = ['维生素', '电解质', '甲功', '肝功', '血脂四项', '糖类指标', '性别']
+    
+    # 定义基础信息列名（这些应该保留level0）
+    basic_info_cols = ['项目', '编号', '姓名', '出生年月日', '身高', '体重', '测试日期', '备注']
+    
+    new_columns = []
+    
+    for col in df.columns:
+        if isinstance(col, tuple):
+            level0, level1 = col[0], col[1]
+            
+            # 判断逻辑：
+            # 1. 如果level0是基础信息列，使用level0
+            # 2. 如果level0是分类名称，使用level1（指标名）
+            # 3. 如果level1是Unnamed，使用level0
+            # 4. 否则优先使用level1
+            
+            if str(level0) in basic_info_cols:
+            # ⭐ 修改：基础信息列，只有当level1无效时才使用level0
+                if pd.isna(level1) or str(level1).startswith('Unnamed'):
+                    col_name = str(level0)
+                else:
+        # 如果level1有效，使用level1（实际指标名）
+                    col_name = str(level1)
+            elif str(level0) in category_names:
+                # 分类名称：使用level1（实际指标名）
+                if not (pd.isna(level1) or str(level1).startswith('Unnamed')):
+                    col_name = str(level1)
+                else:
+                    col_name = f'Unnamed_{len(new_columns)}'
+            elif pd.isna(level1) or str(level1).startswith('Unnamed'):
+                # level1无效：使用level0
+                if not (pd.isna(level0) or str(level0).startswith('Unnamed')):
+                    col_name = str(level0)
+                else:
+                    col_name = f'Unnamed_{len(new_columns)}'
+            else:
+                # 其他情况：优先使用level1
+                col_name = str(level1)
+        else:
+            col_name = str(col)
+        
+        new_columns.append(col_name)
+    
+    df.columns = new_columns
+    
+    # 🔧 确保列名唯一
+    seen = {}
+    unique_columns = []
+    for col in df.columns:
+        if col in seen:
+            seen[col] += 1
+            unique_columns.append(f"{col}_{seen[col]}")
+        else:
+            seen[col] = 0
+            unique_columns.append(col)
+    
+    df.columns = unique_columns
+    
+    return df
+
+
+@timed('merge')
+def merge_all_sheets(df_monthly, df_quarterly, df_yearly, df_other):
+    """
+    合并所有sheet的数据
+    使用姓名和测试日期作为合并键
+    """
+    # 以月周测试数据为基础
+    df_result = df_monthly.copy()
+    
+    # 确定合并键 - 尝试多种可能的列名
+    name_col_monthly = None
+    for col_name in ['姓名', 'Name', 'Name_final']:
+        if col_name in df_result.columns:
+            name_col_monthly = col_name
+            break
+    
+    date_col_monthly = None
+    for col_name in ['测试日期', 'Date', 'Date_auto']:
+        if col_name in df_result.columns:
+            date_col_monthly = col_name
+            break
+    
+    if not name_col_monthly or not date_col_monthly:
+        report('warning', "⚠ 无法找到姓名或日期列，仅使用月周测试数据")
+        return df_result
+    
+    # 创建合并键
+    df_result['_merge_key'] = (
+        df_result[name_col_monthly].astype(str) + '_' + 
+        df_result[date_col_monthly].astype(str)
+    )
+    
+    # 记录每一列来自哪个sheet（写入长表仓库时使用，见 store.py）
+    column_sheets = {col: '月周测试指标' for col in df_result.columns}
+
+    # 合并季度测试数据
+    if df_quarterly is not None:
+        df_result = merge_sheet_data(df_result, df_quarterly, name_col_monthly, date_col_monthly, '季度测试')
+        column_sheets.update({col: '季度测试指标' for col in df_result.columns if col not in column_sheets})
+    
+    # 合并年度测试数据
+    if df_yearly is not None:
+        df_result = merge_sheet_data(df_result, df_yearly, name_col_monthly, date_col_monthly, '年度测试')
+        column_sheets.update({col: '年度测试指标' for col in df_result.columns if col not in column_sheets})
+    
+    # 合并其他数据
+    if df_other is not None:
+        df_result = merge_sheet_data(df_result, df_other, name_col_monthly, date_col_monthly, '其他')
+        column_sheets.update({col: '其他' for col in df_result.columns if col not in column_sheets})
+    
+    # 删除临时合并键
+    if '_merge_key' in df_result.columns:
+        df_result = df_result.drop('_merge_key', axis=1)
+    
+    # 🔧 新增：应用列名映射，标准化列名
+    df_result = df_result.rename(columns=COLUMN_NAME_MAPPING)
+    report('write', f"   ✓ 列名标准化完成")
+    
+    # 🔧 检查并处理映射后的重复列名
+    if df_result.columns.duplicated().any():
+        report('warning', "   ⚠ 映射后发现重复列名，正在处理...")
+        
+        # 对于重复列名，保留第一列，删除后续列
+        seen = {}
+        cols_to_keep = []
+        for i, col in enumerate(df_result.columns):
+            if col not in seen:
+                seen[col] = i
+                cols_to_keep.append(i)
+        
+        df_result = df_result.iloc[:, cols_to_keep]
+        report('write', f"   ✓ 重复列名已处理，保留了{len(cols_to_keep)}列")
+
+    # 列名映射后仍保留来源信息（attrs 在后续的清洗步骤中会随数据框保留）
+    df_result.attrs['column_sheets'] = {
+        COLUMN_NAME_MAPPING.get(col, col): sheet for col, sheet in reversed(list(column_sheets.items()))
+    }
+    
+    return df_result
+
+
+def merge_sheet_data(df_main, df_add, name_col, date_col, sheet_name):
+    """
+    将额外sheet的数据合并到主数据框
+    """
+    try:
+        # 🔧 新增：检查df_add是否有重复列名
+        if df_add.columns.duplicated().any():
+            report('warning', f"   ⚠ {sheet_name}：发现重复列名，正在修复...")
+            # 修复重复列名
+            seen = {}
+            unique_columns = []
+            for col in df_add.columns:
+                if col in seen:
+                    seen[col] += 1
+                    unique_columns.append(f"{col}_{seen[col]}")
+                else:
+                    seen[col] = 0
+                    unique_columns.append(col)
+            df_add.columns = unique_columns
+            report('write', f"   ✓ 列名已唯一化")
+        
+        # 在额外sheet中找到对应的姓名和日期列
+        name_col_add = None
+        for col_name in ['姓名', 'Name', 'Name_final']:
+            if col_name in df_add.columns:
+                name_col_add = col_name
+                break
+        
+        date_col_add = None
+        for col_name in ['测试日期', 'Date', 'Date_auto']:
+            if col_name in df_add.columns:
+                date_col_add = col_name
+                break
+        
+        if not name_col_add:
+            report('warning', f"   ⚠ {sheet_name}：无法找到姓名列，跳过合并")
+            return df_main
+            
+        if not date_col_add:
+            report('warning', f"   ⚠ {sheet_name}：无法找到日期列，跳过合并")
+            return df_main
+        
+        # 创建合并键（使用.copy()避免SettingWithCopyWarning）
+        df_add = df_add.copy()
+        df_add['_merge_key'] = (
+            df_add[name_col_add].astype(str) + '_' + 
+            df_add[date_col_add].astype(str)
+        )
+        
+        # 选择要合并的指标列（排除基本信息列）
+        exclude_cols = AUX_BASIC_COLS + ['_merge_key']
+        
+        indicator_cols = []
+        for col in df_add.columns:
+            if col in exclude_cols:
+                continue
+            if str(col).startswith('Unnamed'):
+                continue
+            if pd.isna(col):
+                continue
+            indicator_cols.append(col)
+        
+        if len(indicator_cols) == 0:
+            report('warning', f"   ⚠ {sheet_name}：没有找到指标列，跳过合并")
+            return df_main
+        
+        # 只保留指标列和合并键
+        df_add_indicators = df_add[['_merge_key'] + indicator_cols].copy()
+        
+        # 🔧 新增：检查df_add_indicators是否有重复列名
+        if df_add_indicators.columns.duplicated().any():
+            report('warning', f"   ⚠ {sheet_name}：指标列有重复，正在去重...")
+            # 再次确保唯一性
+            seen = {}
+            unique_columns = []
+            for col in df_add_indicators.columns:
+                if col in seen:
+                    seen[col] += 1
+                    unique_columns.append(f"{col}_{seen[col]}")
+                else:
+                    seen[col] = 0
+                    unique_columns.append(col)
+            df_add_indicators.columns = unique_columns
+        
+        # 合并数据
+        df_merged = df_main.merge(
+            df_add_indicators,
+            on='_merge_key',
+            how='left',
+            suffixes=('', f'_from_{sheet_name}')
+        )
+        
+        # 🔧 新增：合并后再次检查重复列名
+        if df_merged.columns.duplicated().any():
+            report('warning', f"   ⚠ 合并后发现重复列名，正在修复...")
+            seen = {}
+            unique_columns = []
+            for col in df_merged.columns:
+                if col in seen:
+                    seen[col] += 1
+                    unique_columns.append(f"{col}_{seen[col]}")
+                else:
+                    seen[col] = 0
+                    unique_columns.append(col)
+            df_merged.columns = unique_columns
+        
+        report('write', f"   ✓ {sheet_name}合并：添加了 {len(indicator_cols)} 个指标")
+        
+        return df_merged
+        
+    except Exception as e:
+        report('warning', f"   ⚠ {sheet_name}合并失败：{e}")
+        report('write', traceback.format_exc())
+        return df_main
+
+
+
+@timed('clean')
+def clean_data_final(df):
+    """数据清洗函数"""
+    if df is None:
+        return None
+
+    report('info', "🧹 开始清洗数据...")
+
+    # 删除空行
+    df = df.dropna(how='all')
+    df = df.reset_index(drop=True)
+
+    # 处理姓名列
+    if '姓名' in df.columns:
+        name_cols = [col for col in df.columns if col.startswith('Name')]
+        if not name_cols:
+            df['Name'] = df['姓名']
+        else:
+            df['Name_final'] = df['姓名']
+
+    # 处理日期列
+    possible_date_cols = ['测试日期', '日期', '开始日期']
+    date_col_found = False
+
+    for col in possible_date_cols:
+        if col in df.columns:
+            try:
+                date_cols = [c for c in df.columns if c.startswith('Date')]
+
+                if not date_cols:
+                    # 日期对象、Excel序列号、中文日期文本统一转为精确到天的 datetime64
+                    # （显示用的文本在绘图时再生成，不再保存 DateStr 列）
+                    df['Date'] = normalize_dates(df[col])
+                    date_col_found = True
+                else:
+                    date_col_found = True
+
+                break
+
+            except Exception as e:
+                continue
+
+    if not date_col_found:
+        # 没有日期列时按行号生成日期；同时写入 Date，绘图、雷达图、运动员索引都按 Date 取日期
+        df['Date_auto'] = pd.date_range(start='2024-01-01', periods=len(df), freq='D')
+        df['Date'] = df['Date_auto']
+
+    # 最终清理
+    df = df.dropna(how='all')
+    df = df.reset_index(drop=True)
+    df = sparsify_low_frequency(df)
+
+    report('success', f"✅ 清洗完成：保留 {len(df)} 行有效数据")
+
+    return df
+
+
+def sparsify_low_frequency(df, max_density=LOW_FREQUENCY_DENSITY):
+    """
+    把来自季度/年度/其他sheet、有值比例低于 max_density 的列转为稀疏列（缺失值不占内存）
+
+    列的来源取自 merge_all_sheets 记录的 df.attrs['column_sheets']；没有记录时不做转换。
+    数值列转为 Sparse[float64]，含 '<0.5' 等文本的列转为 Sparse[object]。
+    """
+    column_sheets = df.attrs.get('column_sheets', {})
+    sparse = {}
+    for col, sheet in column_sheets.items():
+        if sheet == '月周测试指标' or col not in df.columns or isinstance(df[col].dtype, pd.SparseDtype):
+            continue
+        dtype = df[col].dtype
+        if pd.api.types.is_float_dtype(dtype):
+            sparse_dtype = pd.SparseDtype(dtype, np.nan)
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            # pandas 3 中文本列默认为 StringDtype，与 object 列一样转为 Sparse[object]
+            sparse_dtype = pd.SparseDtype(object, np.nan)
+        else:
+            continue
+        if df[col].notna().mean() < max_density:
+            sparse[col] = sparse_dtype
+    return df.astype(sparse) if sparse else df
+
+
+def to_dense(df):
+    """稀疏列还原为普通列（交给 Streamlit 显示或导出时使用）"""
+    sparse = {col: dtype.subtype for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)}
+    return df.astype(sparse) if sparse else df
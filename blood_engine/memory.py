@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+内存统计与超限淘汰（多个教练会话共用一个进程时防止内存耗尽）
+
+纯计算模块（不依赖 Streamlit），模块级状态跨 rerun、跨会话保留。
+
+- DATASETS: 各会话的数据集登记表。会话里保存的数据集（SessionData）登记后按 DataFrame
+  memory_usage(deep=True) 统计大小（建好各性别视图后重新登记，计入视图的拷贝和运动员索引）；
+  合计超过 DATASET_BUDGET_BYTES 时，从最久未使用的会话开始淘汰，当前会话不会被淘汰。
+  淘汰时标记 evicted 并调用 on_evict 注册的回调（例如取消该会话的后台预渲染），然后释放数据：
+  清空 SessionData（只剩 evicted 标记，属主会话下一次运行时据此从上传的文件重新加载）并调用 on_release
+  注册的回调（例如清空引用了数据的界面上下文）。属主会话的脚本或片段运行期间用 in_use() 持有数据集，
+  这时释放推迟到运行结束；尚未释放的字节数由 DATASETS.unreleased_bytes() 单独统计。
+  只保存弱引用，会话结束后登记自动失效。
+- 图表缓存的上限沿用 FIGURE_CACHE.max_bytes（超过时淘汰最久未用的PNG），可用 set_memory_limits 调整。
+- track_peak(stage): 记录一段代码（数据读取、合并清洗）的内存变化，最近 PEAK_HISTORY 条保存在 recent_peaks()。
+  默认只记录进程常驻内存（RSS）前后之差，几乎没有开销；set_peak_tracing(True)（管理员内存面板）后
+  改用 tracemalloc 记录 Python 分配的峰值。tracemalloc 作用于整个进程，会让数据读取慢数倍，
+  其他会话的线程同时变慢，只在排查内存问题时临时打开。
+- memory_report(): 各会话数据集（含已淘汰尚未释放的）、图表缓存、基准缓存、未关闭的 matplotlib 图表数、进程常驻内存。
+"""
+
+import contextlib
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+DATASET_BUDGET_BYTES = 512 * 1024 * 1024   # 所有会话的数据集合计上限（超过时淘汰最久未使用的会话）
+PEAK_HISTORY = 50
+
+
+class SessionData(dict):
+    """
+    会话中保存的数据集（可弱引用的 dict，交给 DATASETS 登记）
+
+    evicted: 已被 DATASETS 淘汰，属主会话应在下一次运行开始时丢弃并重新加载
+    released: 淘汰后数据已释放（dict 已清空）
+    in_use(): 属主会话运行期间持有，期间被淘汰时数据在退出时才释放
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evicted = False
+        self.released = False
+        self._lock = threading.RLock()
+        self._evict_callbacks = []
+        self._release_callbacks = {}
+
+    def on_evict(self, callback):
+        """被淘汰时调用 callback()（在执行淘汰的线程中调用，不能使用 Streamlit）"""
+        self._evict_callbacks.append(callback)
+
+    def on_release(self, name, callback):
+        """释放数据时调用 callback()（不在使用中时调用，同名回调只保留最新的；不能使用 Streamlit）"""
+        self._release_callbacks[name] = callback
+
+    @contextlib.contextmanager
+    def in_use(self):
+        with self._lock:
+            try:
+                yield self
+            finally:
+                if self.evicted:
+                    self._release()
+
+    def mark_evicted(self):
+        self.evicted = True
+        callbacks, self._evict_callbacks = self._evict_callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        if self._lock.acquire(blocking=False):   # 属主会话正在运行时由 in_use() 退出时释放
+            try:
+                self._release()
+            finally:
+                self._lock.release()
+
+    def _release(self):
+        if self.released:
+            return
+        callbacks, self._release_callbacks = list(self._release_callbacks.values()), {}
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        self.clear()
+        self.released = True
+
+
+def deep_bytes(obj, _seen=None):
+    """
+    对象占用的内存字节数（DataFrame/Series 按 memory_usage(deep=True)，
+    ndarray 按 nbytes，容器和普通对象递归统计其内容，同一对象只计一次；内存映射的数组不计）
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.memmap):
+        return 0
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray, str)):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_bytes(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return sys.getsizeof(obj) + sum(deep_bytes(v, seen) for v in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return sys.getsizeof(obj) + deep_bytes(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+def process_rss():
+    """进程当前常驻内存（字节），无法读取时为 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # 取不到当前值时用峰值代替
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class DatasetRegistry:
+    """各会话数据集的登记表（见模块说明）"""
+
+    def __init__(self, max_bytes=DATASET_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # owner -> {'ref', 'key', 'bytes', 'ts'}
+        self._unreleased = []           # [(ref, bytes)] 已淘汰、属主会话正在使用、尚未释放的数据集
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def register(self, owner, key, data):
+        """
+        登记（或更新、重新统计大小）owner 会话的数据集 data（SessionData），超出上限时淘汰其他会话；
+        返回被淘汰的会话。已被淘汰的数据集不再登记。
+        """
+        if getattr(data, 'evicted', False):
+            return []
+        size = deep_bytes(data)
+        with self._lock:
+            self._entries.pop(owner, None)
+            self._entries[owner] = {'ref': weakref.ref(data), 'key': key, 'bytes': size, 'ts': time.time()}
+        return self.enforce(keep=owner)
+
+    def touch(self, owner):
+        """owner 会话本次运行用到了数据集（移到最近使用）"""
+        with self._lock:
+            entry = self._entries.get(owner)
+            if entry is not None:
+                entry['ts'] = time.time()
+                self._entries.move_to_end(owner)
+
+    def _purge(self):
+        for owner in [o for o, e in self._entries.items() if e['ref']() is None]:
+            del self._entries[owner]
+
+    def total_bytes(self):
+        with self._lock:
+            self._purge()
+            return sum(e['bytes'] for e in self._entries.values())
+
+    def enforce(self, keep=None):
+        """合计超过上限时，从最久未使用的会话开始淘汰数据集（keep 会话除外，见模块说明）；返回被淘汰的会话"""
+        evicted = []
+        with self._lock:
+            self._purge()
+            total = sum(e['bytes'] for e in self._entries.values())
+            for owner in list(self._entries):
+                if total <= self.max_bytes:
+                    break
+                if owner == keep:
+                    continue
+                entry = self._entries.pop(owner)
+                total -= entry['bytes']
+                evicted.append((owner, entry['ref'](), entry['bytes']))
+            self.evictions += len(evicted)
+        for _, data, _ in evicted:
+            if data is not None:
+                data.mark_evicted()
+        with self._lock:
+            self._unreleased += [(weakref.ref(data), size) for _, data, size in evicted
+                                 if data is not None and not data.released]
+        if evicted:
+            from .baseline import drop_baselines
+            drop_baselines(keep=self.keys())
+        return [owner for owner, _, _ in evicted]
+
+    def unreleased_bytes(self):
+        """已淘汰、但属主会话运行尚未结束所以还没释放的数据集字节数（不计入 total_bytes）"""
+        with self._lock:
+            self._unreleased = [(ref, size) for ref, size in self._unreleased
+                                if not getattr(ref(), 'released', True)]
+            return sum(size for _, size in self._unreleased)
+
+    def keys(self):
+        """仍登记着的数据集标识"""
+        with self._lock:
+            self._purge()
+            return {e['key'] for e in self._entries.values()}
+
+    def info(self):
+        """各会话数据集：会话、数据集标识、字节数、最近使用时间（从旧到新）"""
+        with self._lock:
+            self._purge()
+            return [{'owner': owner, 'key': e['key'], 'bytes': e['bytes'], 'ts': e['ts']}
+                    for owner, e in self._entries.items()]
+
+
+DATASETS = DatasetRegistry()
+
+
+def set_memory_limits(datasets=None, figures=None, keep=None):
+    """调整数据集合计上限和图表缓存上限（字节，None 表示不变），立即按新上限淘汰（keep 会话除外）"""
+    from .figure_cache import FIGURE_CACHE
+
+    if datasets is not None:
+        DATASETS.max_bytes = int(datasets)
+        DATASETS.enforce(keep=keep)
+    if figures is not None:
+        FIGURE_CACHE.resize(int(figures))
+
+
+# ========== 数据读取的内存峰值（tracemalloc）==========
+_peaks = deque(maxlen=PEAK_HISTORY)
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+_peak_tracing = False
+
+
+def set_peak_tracing(enabled):
+    """打开/关闭 track_peak 的 tracemalloc 峰值记录（进程级，对所有会话生效）"""
+    global _peak_tracing
+    _peak_tracing = bool(enabled)
+
+
+def peak_tracing_enabled():
+    return _peak_tracing
+
+
+@contextlib.contextmanager
+def track_peak(stage):
+    """
+    记录 with 块内的内存变化，结果追加到 recent_peaks()
+
+    默认记录进程常驻内存前后之差（rss_delta_bytes，可为负；peak_bytes 为 None）。
+    set_peak_tracing(True) 后另用 tracemalloc 记录 Python 分配的峰值（peak_bytes，相对进入时）；
+    tracemalloc 是进程级的：多个会话同时读取数据时峰值互相叠加，是近似值。
+    tracemalloc 已被外部启动时沿用，不负责停止。
+    """
+    if not _peak_tracing:
+        record = {'stage': stage, 'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'mode': 'rss', 'peak_bytes': None}
+        rss_before = process_rss()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            rss_after = process_rss()
+            record.update(rss_delta_bytes=(rss_after - rss_before) if None not in (rss_before, rss_after) else None,
+                          ms=round((time.perf_counter() - t0) * 1000, 1))
+            _peaks.append(record)
+        return
+
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        if _trace_users == 0:
+            _trace_owned = not tracemalloc.is_tracing()
+            if _trace_owned:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        _trace_users += 1
+        base = tracemalloc.get_traced_memory()[0]
+    record = {'stage': stage, 'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'mode': 'tracemalloc'}
+    rss_before = process_rss()
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        with _trace_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            _trace_users -= 1
+            if _trace_users == 0 and _trace_owned:
+                tracemalloc.stop()
+        rss_after = process_rss()
+        record.update(peak_bytes=max(0, peak - base), net_bytes=current - base,
+                      rss_delta_bytes=(rss_after - rss_before) if None not in (rss_before, rss_after) else None,
+                      ms=round((time.perf_counter() - t0) * 1000, 1))
+        _peaks.append(record)
+
+
+def recent_peaks():
+    """最近的数据读取内存峰值记录（从旧到新）"""
+    return list(_peaks)
+
+
+def memory_report():
+    """内存统计汇总（见模块说明）"""
+    import matplotlib.pyplot as plt
+
+    from .baseline import baseline_bytes
+    from .figure_cache import FIGURE_CACHE
+
+    figures = FIGURE_CACHE.info()
+    return {
+        'datasets': DATASETS.info(),
+        'datasets_bytes': DATASETS.total_bytes(),
+        'datasets_unreleased_bytes': DATASETS.unreleased_bytes(),
+        'datasets_max_bytes': DATASETS.max_bytes,
+        'dataset_evictions': DATASETS.evictions,
+        'figure_cache_bytes': figures['bytes'],
+        'figure_cache_max_bytes': figures['max_bytes'],
+        'figure_cache_entries': figures['entries'],
+        'baseline_bytes': baseline_bytes(),
+        'open_figures': len(plt.get_fignums()),
+        'rss_bytes': process_rss(),
+        'ingest_peaks': recent_peaks(),
+        'peak_tracing': _peak_tracing,
+    }
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+进度与提示消息
+
+引擎本身不依赖 Streamlit：加载、合并、清洗过程中的提示统一交给 report()。
+默认写入 logging；Streamlit 界面启动时用 set_reporter() 把消息转给 st.info / st.warning 等。
+"""
+
+import logging
+
+logger = logging.getLogger('blood_engine')
+
+_LEVELS = {
+    'info': logging.INFO,
+    'write': logging.INFO,
+    'success': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+_reporter = None
+
+
+def set_reporter(reporter):
+    """
+    设置消息处理函数 reporter(level, message)
+
+    level 为 'info' / 'write' / 'success' / 'warning' / 'error'；传入 None 恢复为 logging。
+    """
+    global _reporter
+    _reporter = reporter
+
+
+def report(level, message):
+    """发出一条进度/提示消息"""
+    if _reporter is not None:
+        _reporter(level, message)
+    else:
+        logger.log(_LEVELS.get(level, logging.INFO), message)
@@ -0,0 +1,760 @@
+# -*- coding: utf-8 -*-
+"""
+图表生成：主题表格图、多运动员趋势图（静态/交互）、Z-Score雷达图
+
+只生成 matplotlib Figure 或 Vega-Lite 规格，不负责显示；显示由界面层决定。
+"""
+
+import logging
+import re
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.colors import to_rgba
+
+from .dates import format_date, format_dates
+from .timing import lap, timed
+from .indicators import find_indicator_column, format_number, get_indicator_status
+from .smoothing import DEFAULT_SMOOTHING_MODE, lttb_downsample, get_smoothed_curve
+from .style import (
+    COLOR_SEVERE_LOW, COLOR_NORMAL, COLOR_SEVERE_HIGH,
+    COLOR_CATEGORY_HEADER, COLOR_TABLE_HEADER, COLOR_CHART_BG,
+    FONTSIZE_MAIN_TITLE, FONTSIZE_HEADER, FONTSIZE_CATEGORY, FONTSIZE_INDICATOR,
+    FONTSIZE_VALUE, FONTSIZE_STATUS, TABLE_ROW_HEIGHT,
+    CATEGORY_NAMES, RADAR_STYLES, TREND_COLORS, TREND_MAX_POINTS
+)
+
+logger = logging.getLogger(__name__)
+
+
+@timed('plot.theme')
+def plot_theme_table(athlete_df, theme_name, categories, ref_ranges, gender):
+    """生成主题表格图 - 支持中英文双行显示"""
+    if athlete_df.empty:
+        return None, []
+
+    latest_row = athlete_df.iloc[-1]
+    latest_date = format_date(latest_row.get('Date'))
+    athlete_name = latest_row.get('Name', latest_row.get('Name_final', '未知'))
+
+    cell_text = []
+    cell_colors = []
+    missing_indicators = []  # 记录缺失的指标
+
+    # 状态中英文对照（包含优秀、良好等）
+    status_translation = {
+        '严重偏低': ('严重偏低', 'Severely Low'),
+        '偏低': ('偏低', 'Low'),
+        '正常': ('正常', 'Normal'),
+        '良好': ('良好', 'Good'),
+        '偏高': ('偏高', 'High'),
+        '优秀': ('优秀', 'Excellent'),
+        '严重偏高': ('严重偏高', 'Severely High'),
+        '需注意': ('需注意', ' Attention'),
+        '-': ('—', '—'),  # 无数据或未找到
+        'N/A': ('—', '—'),  # 保留兼容
+        '未找到': ('—', '—'),  # 保留兼容
+    }
+
+    # ⭐ 新增：格式化分类标题为多行显示
+    def format_category_title(title):
+        """
+        将分类标题拆分为多行：
+        输入："免疫防御（炎性监控）\nImmune Defense (Inflammatory Monitoring)"
+        输出："免疫防御\nImmune Defense\n(Inflammatory Monitoring)"  ← 用英文括号！
+        """
+        lines = title.split('\n')
+        if len(lines) != 2:
+            return title  # 格式不对，保持原样
+        
+        cn_line = lines[0]  # 中文行：免疫防御（炎性监控）
+        en_line = lines[1]  # 英文行：Immune Defense (Inflammatory Monitoring)
+        
+        # 提取中文主体（去掉中文括号部分）
+        cn_match = re.match(r'(.+?)（.+?）', cn_line)
+        if cn_match:
+            cn_main = cn_match.group(1)  # 免疫防御
+        else:
+            cn_main = cn_line
+        
+        # 提取英文主体和括号内容
+        en_match = re.match(r'(.+?)\s*\((.+?)\)', en_line)
+        if en_match:
+            en_main = en_match.group(1).strip()  # Immune Defense
+            en_paren = en_match.group(2)  # Inflammatory Monitoring ← 用英文！
+            # 有括号：3行，括号内容用英文
+            return f"{cn_main}\n{en_main}\n({en_paren})"
+        else:
+            # 无括号：2行
+            return f"{cn_main}\n{en_line}"
+
+    for category_title, indicators in categories.items():
+        # ⭐ 格式化分类标题为多行
+        formatted_title = format_category_title(category_title)
+        # 添加分类标题行（4列）- 居中对齐
+        cell_text.append([formatted_title, '', '', ''])
+        cell_colors.append([COLOR_CATEGORY_HEADER, COLOR_CATEGORY_HEADER, COLOR_CATEGORY_HEADER, COLOR_CATEGORY_HEADER])
+
+        for col_key, name_tuple in indicators.items():
+            # name_tuple是(中文名, 英文名)
+            cn_name, en_name = name_tuple
+            
+            # 普通指标处理（包括睾酮/皮质醇比值）
+            # 查找实际的列名
+            actual_col = find_indicator_column(athlete_df, col_key)
+
+            # 获取正常范围
+            range_str = "—"
+            if col_key in ref_ranges:
+                ranges = ref_ranges[col_key]
+                low_2 = ranges.get('low_2')
+                high_2 = ranges.get('high_2')
+
+                if pd.notna(low_2) and pd.notna(high_2):
+                    # 两个值都存在，显示范围
+                    range_str = f"{format_number(low_2)}-{format_number(high_2)}"
+                elif pd.notna(low_2):
+                    # 只有下限
+                    range_str = f"≥{format_number(low_2)}"
+                elif pd.notna(high_2):
+                    # 只有上限
+                    range_str = f"≤{format_number(high_2)}"
+
+            if actual_col and actual_col in latest_row.index:
+                val = latest_row[actual_col]
+                
+                if pd.notna(val):
+                    # 🔧 处理带<或>符号的值
+                    val_str_raw = str(val).strip()
+                    
+                    # ⭐ 特殊处理：保留<或>符号
+                    if val_str_raw.startswith('<') or val_str_raw.startswith('>') or val_str_raw.startswith('＜') or val_str_raw.startswith('＞'):
+                        val_str = val_str_raw  # 直接使用原始字符串
+                        # 尝试提取数值进行评价
+                        try:
+                            num_str = val_str_raw.lstrip('<>＜＞').strip()
+                            val_num = float(num_str)
+                            status, bg_color, _ = get_indicator_status(col_key, val_num, ref_ranges, gender)
+                        except:
+                            status = "-"
+                            bg_color = COLOR_NORMAL
+                    else:
+                        # 正常数值处理
+                        try:
+                            val = float(val)
+                            # ⭐ 特殊处理：睾酮/皮质醇比值保留4位小数
+                            if col_key == '睾酮/皮质醇比值':
+                                val_str = f"{val:.4f}"
+                            elif abs(val) >= 1000:
+                                val_str = f"{val:.0f}"
+                            elif abs(val) >= 100:
+                                val_str = f"{val:.1f}"
+                            else:
+                                val_str = f"{val:.2f}"
+                            status, bg_color, _ = get_indicator_status(col_key, val, ref_ranges, gender)
+                        except (ValueError, TypeError):
+                            val_str = "—"
+                            status = "-"
+                            bg_color = COLOR_NORMAL
+                else:
+                    val_str = "—"
+                    status = "-"  # 无数据显示为"-"
+                    bg_color = COLOR_NORMAL  # ⭐ 改为COLOR_NORMAL
+            else:
+                val_str = "—"
+                status = "-"  # 未找到显示为"-"
+                bg_color = COLOR_NORMAL  # ⭐ 改为COLOR_NORMAL
+                missing_indicators.append((col_key, f"{cn_name}/{en_name}"))
+
+            # 构建双行文本
+            indicator_text = f"{cn_name}\n{en_name}"
+            # 如果status是"-"，直接显示"-"，否则查询翻译
+            if status == "-":
+                status_text = "—"
+            else:
+                status_cn, status_en = status_translation.get(status, (status, status))
+                status_text = f"{status_cn}\n{status_en}"
+            
+            cell_text.append([indicator_text, val_str, range_str, status_text])
+            cell_colors.append([COLOR_NORMAL, bg_color, COLOR_NORMAL, bg_color])  # ⭐ 改为COLOR_NORMAL
+
+    lap('status')   # 指标列匹配 + 状态判断
+    # 创建图表（4列，高清晰度）
+    fig_height = len(cell_text) * 0.9 + 1.5  # 增加行高以容纳双行文本
+    fig, ax = plt.subplots(figsize=(10, fig_height), dpi=150)
+    ax.axis('off')
+
+    # 列宽设置：保持原来的比例
+    col_widths = [0.45, 0.18, 0.18, 0.19]  # 不改变列宽
+    table = ax.table(
+        cellText=cell_text,
+        colLabels=['检测指标\nIndicator', '结果\nResult', '参考范围\nReference', '评价\nEvaluation'],
+        cellColours=cell_colors,
+        loc='center',
+        cellLoc='center',
+        colColours=[COLOR_TABLE_HEADER] * 4,
+        colWidths=col_widths
+    )
+
+    table.auto_set_font_size(False)
+    table.set_fontsize(FONTSIZE_VALUE)
+    table.scale(1, TABLE_ROW_HEIGHT)  # 增加行高比例
+    
+    # 将分类标题颜色转换为RGB元组用于比较
+    category_color_rgba = to_rgba(COLOR_CATEGORY_HEADER)
+    
+    # 🔍 调试信息
+    logger.debug("表格颜色调试信息: 目标颜色 %s → RGBA%s", COLOR_CATEGORY_HEADER, category_color_rgba)
+    
+    category_cell_count = 0  # 统计找到的分类标题单元格数量
+
+    # 样式设置
+    for (r, c), cell in table.get_celld().items():
+        if r == 0:  # 表头
+            cell.set_text_props(weight='bold', color='black', fontsize=FONTSIZE_HEADER)  # 黑色文字
+            cell.set_edgecolor('#DDDDDD')  # 灰色边框
+        else:
+            # 获取当前单元格颜色（RGBA元组）
+            cell_color = cell.get_facecolor()
+            # 比较RGB值（忽略alpha通道）
+            is_category = (abs(cell_color[0] - category_color_rgba[0]) < 0.01 and
+                          abs(cell_color[1] - category_color_rgba[1]) < 0.01 and
+                          abs(cell_color[2] - category_color_rgba[2]) < 0.01)
+            
+            if is_category:  # 分类标题
+                category_cell_count += 1
+                # ⭐ 分类标题：淡灰色边框（保留表格结构）
+                cell.set_edgecolor('#DDDDDD')  # 淡灰边框
+                cell.set_linewidth(1)          # 正常线宽
+                
+                if c == 0:  # 第一列：显示多行文字，居中
+                    cell.set_text_props(weight='bold', color='black', ha='center', va='center', fontsize=FONTSIZE_CATEGORY)
+                else:  # 其他列：隐藏文本
+                    cell.set_text_props(visible=False)
+                    # ⭐ 其他列的背景也设为分类标题颜色，确保整行一致
+                    cell.set_facecolor(COLOR_CATEGORY_HEADER)
+            else:  # 数据行
+                cell.set_edgecolor('#DDDDDD')
+                if r > 0 and c == 0:  # 指标名称列，左对齐
+                    cell.set_text_props(ha='left', fontsize=FONTSIZE_INDICATOR)
+                elif r > 0 and c in [1, 2]:  # 数值和范围列，较小字体
+                    cell.set_text_props(fontsize=FONTSIZE_VALUE)
+                elif r > 0 and c == 3:  # 评价列
+                    cell.set_text_props(fontsize=FONTSIZE_STATUS)
+    
+    # 🔍 输出统计
+    logger.debug("找到分类标题单元格: %d 个，预期数量: %d", category_cell_count,
+                 len([k for k in cell_colors if k[0] == COLOR_CATEGORY_HEADER]) * 4)
+
+    # 获取中英文标题
+    if theme_name in CATEGORY_NAMES:
+        cn_title, en_title = CATEGORY_NAMES[theme_name]
+        title_text = f"{athlete_name} ({gender}) - {cn_title}\n{en_title} ({latest_date})"
+    else:
+        theme_display = theme_name.split('_')[-1]
+        title_text = f"{athlete_name} ({gender}) - {theme_display} ({latest_date})"
+    
+    # 一级标题：使用配置的字体大小，最小间距
+    ax.set_title(title_text, fontsize=FONTSIZE_MAIN_TITLE, weight='bold', pad=2)
+
+    plt.tight_layout()
+    lap('draw')
+
+    return fig, missing_indicators
+
+@timed('plot.trend')
+def plot_trend_chart_multi(df, indicator, ref_ranges, selected_athletes, date_range, gender,
+                           smoothing=DEFAULT_SMOOTHING_MODE):
+    """绘制多运动员对比趋势图
+
+    smoothing: 曲线平滑模式（见 smoothing.SMOOTHING_MODES），平滑结果按数据哈希缓存
+    """
+
+    # 查找实际的列名
+    actual_col = find_indicator_column(df, indicator)
+    if not actual_col:
+        return None
+
+    # 筛选日期范围
+    if date_range and len(date_range) == 2:
+        # 将date转换为datetime64以匹配df['Date']的类型
+        start_date = pd.to_datetime(date_range[0])
+        end_date = pd.to_datetime(date_range[1])
+        df_filtered = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)].copy()
+    else:
+        df_filtered = df.copy()
+
+    if df_filtered.empty:
+        return None
+
+    # 获取名字列
+    name_col = 'Name' if 'Name' in df_filtered.columns else 'Name_final'
+
+    # 只保留有该指标数据的日期
+    df_with_indicator = df_filtered[df_filtered[actual_col].notna()].copy()
+
+    if df_with_indicator.empty:
+        return None
+
+    # 获取所有选中运动员中有数据的日期（datetime64，去重排序）
+    selected_dates = df_with_indicator.loc[df_with_indicator[name_col].isin(selected_athletes), 'Date']
+    all_dates = np.sort(selected_dates.dropna().unique())
+
+    # 如果没有任何数据，返回None
+    if len(all_dates) == 0:
+        return None
+    lap('select')   # 指标列匹配 + 日期/运动员筛选
+
+    fig, ax = plt.subplots(figsize=(12, 7), dpi=150)
+    ax.set_facecolor(COLOR_CHART_BG)
+
+    # 平滑曲线的输出点数不超过图表像素宽度
+    pixel_width = int(fig.get_figwidth() * fig.dpi)
+
+    # 确保有足够的颜色
+    if len(selected_athletes) > len(TREND_COLORS):
+        colors = plt.cm.tab10(np.linspace(0, 1, len(selected_athletes)))
+    else:
+        colors = [TREND_COLORS[i % len(TREND_COLORS)] for i in range(len(selected_athletes))]
+
+    # 先收集所有y值，用于确定范围
+    all_y_values = []
+    
+    # 绘制每个运动员的数据
+    for idx, (athlete, color) in enumerate(zip(selected_athletes, colors)):
+        athlete_data = df_with_indicator[df_with_indicator[name_col] == athlete].copy()
+
+        if athlete_data.empty:
+            continue
+
+        athlete_data = athlete_data.sort_values('Date')
+        y_numeric = pd.to_numeric(athlete_data[actual_col], errors='coerce')
+        valid = y_numeric.notna() & athlete_data['Date'].notna()
+        valid_data = athlete_data[valid]
+
+        if len(valid_data) == 0:
+            continue
+
+        # 每次测试在横轴上的位置 = 在有数据日期中的序号
+        x_data = np.searchsorted(all_dates, valid_data['Date'].to_numpy())
+        y_data = y_numeric[valid].values.astype(float)
+        all_y_values.extend(y_data)
+
+        # 绘制平滑曲线（同一天多次测试会先取平均，不会再因x重复而拟合失败）
+        if len(valid_data) > 1:
+            x_smooth, y_smooth = get_smoothed_curve(athlete, indicator, x_data, y_data, smoothing, pixel_width)
+            ax.plot(x_smooth, y_smooth, color=color, linewidth=2.5, label=athlete, alpha=0.8)
+        else:
+            ax.plot(x_data, y_data, color=color, linewidth=2.5, label=athlete, linestyle='--', alpha=0.6)
+
+        # 绘制数据点
+        ax.plot(x_data, y_data, marker='o', markersize=8, markerfacecolor='white',
+                markeredgecolor=color, markeredgewidth=2, linestyle='None')
+        
+        # 只为主运动员（第一个运动员）标注数据值
+        if idx == 0:
+            for x, y in zip(x_data, y_data):
+                ax.text(x, y, f'{y:.1f}', 
+                       fontsize=9, ha='center', va='bottom',
+                       color=color, fontweight='bold',
+                       bbox=dict(boxstyle='round,pad=0.3', facecolor='white', 
+                                edgecolor=color, alpha=0.8, linewidth=1))
+
+    # 在绘制数据后，添加理想范围标记
+    if indicator in ref_ranges and len(all_y_values) > 0:
+        ranges = ref_ranges[indicator]
+        low_2 = ranges.get('low_2')
+        high_2 = ranges.get('high_2')
+        
+        # 获取实际数据范围
+        data_min = min(all_y_values)
+        data_max = max(all_y_values)
+        y_range = data_max - data_min
+        
+        # 情况1：同时有上下限（完整范围）
+        if pd.notna(low_2) and pd.notna(high_2):
+            ax.axhspan(low_2, high_2, color='#4A90E2', alpha=0.15, zorder=0, label='理想范围')
+            ax.axhline(low_2, color=COLOR_SEVERE_LOW, linestyle=':', linewidth=1, alpha=0.7)
+            ax.axhline(high_2, color=COLOR_SEVERE_HIGH, linestyle=':', linewidth=1, alpha=0.7)
+        
+        # 情况2：只有上限（如 < 300）
+        elif pd.notna(high_2) and not pd.notna(low_2):
+            # 从0或数据最小值往下一点开始
+            y_min = min(0, data_min - y_range * 0.1)
+            ax.axhspan(y_min, high_2, color='#4A90E2', alpha=0.15, zorder=0, label=f'理想范围 (< {high_2})')
+            ax.axhline(high_2, color=COLOR_SEVERE_HIGH, linestyle=':', linewidth=1.5, alpha=0.7)
+        
+        # 情况3：只有下限（如 > 50）
+        elif pd.notna(low_2) and not pd.notna(high_2):
+            # 到数据最大值往上一点
+            y_max = data_max + y_range * 0.1
+            ax.axhspan(low_2, y_max, color='#4A90E2', alpha=0.15, zorder=0, label=f'理想范围 (> {low_2})')
+            ax.axhline(low_2, color=COLOR_SEVERE_LOW, linestyle=':', linewidth=1.5, alpha=0.7)
+
+    # 设置坐标轴 - 只显示有数据的日期
+    ax.set_xticks(np.arange(len(all_dates)))
+    ax.set_xticklabels(format_dates(all_dates), rotation=45, ha='right')
+
+    plt.title(f"{indicator} 趋势对比 ({gender})", fontsize=14, fontweight='bold')
+    plt.xlabel('测试日期', fontsize=12)
+    plt.ylabel(f'{indicator}', fontsize=12)
+    plt.grid(axis='y', linestyle='--', alpha=0.5)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    # 图例
+    plt.legend(loc='upper left', bbox_to_anchor=(1.01, 1), frameon=True)
+    plt.tight_layout()
+    lap('draw')
+
+    return fig
+
+
+# ========== 交互趋势图（浏览器端渲染） ==========
+
+def build_trend_series(df, indicator, selected_athletes, date_range, max_points=TREND_MAX_POINTS):
+    """
+    生成交互趋势图使用的紧凑长表数据
+
+    返回：
+    - records: [{'a': 运动员, 't': 'YYYY-MM-DD', 'v': 数值}, ...]，按运动员、日期排序
+    - None: 找不到该指标列，或筛选后没有数据
+    """
+    actual_col = find_indicator_column(df, indicator)
+    if not actual_col:
+        return None
+
+    name_col = 'Name' if 'Name' in df.columns else 'Name_final'
+
+    # 只取需要的三列，避免复制整张宽表
+    df_small = df.loc[df[name_col].isin(selected_athletes), [name_col, 'Date', actual_col]]
+
+    if date_range and len(date_range) == 2:
+        start_date = pd.to_datetime(date_range[0])
+        end_date = pd.to_datetime(date_range[1])
+        df_small = df_small[(df_small['Date'] >= start_date) & (df_small['Date'] <= end_date)]
+
+    values = pd.to_numeric(df_small[actual_col], errors='coerce')
+    df_small = pd.DataFrame({
+        'a': df_small[name_col].values,
+        'Date': df_small['Date'].values,
+        'v': values.values,
+    }).dropna(subset=['Date', 'v'])
+
+    if df_small.empty:
+        return None
+
+    records = []
+    for athlete in selected_athletes:
+        athlete_data = df_small[df_small['a'] == athlete].sort_values('Date')
+        if athlete_data.empty:
+            continue
+
+        # 长序列在服务器端降采样，浏览器只接收保留下来的点
+        if len(athlete_data) > max_points:
+            x_days = athlete_data['Date'].values.astype('datetime64[D]').astype(float)
+            keep = lttb_downsample(x_days, athlete_data['v'].values, max_points)
+            athlete_data = athlete_data.iloc[keep]
+
+        date_strs = athlete_data['Date'].dt.strftime('%Y-%m-%d')
+        for date_str, val in zip(date_strs, athlete_data['v']):
+            records.append({'a': str(athlete), 't': date_str, 'v': round(float(val), 4)})
+
+    return records or None
+
+
+def build_trend_curves(records, indicator, smoothing=DEFAULT_SMOOTHING_MODE, max_points=TREND_MAX_POINTS):
+    """
+    交互趋势图的平滑曲线：对 build_trend_series 的数据点逐名运动员调用 get_smoothed_curve
+
+    横轴为日期（按天计的浮点数），与静态图共用平滑缓存和四种平滑模式。
+    返回与 records 同格式的曲线点，'t' 为带时间的 UTC ISO 字符串（曲线点可以落在两天之间）。
+    只有一个数据点的运动员不画曲线。
+    """
+    by_athlete = {}
+    for r in records:
+        by_athlete.setdefault(r['a'], []).append(r)
+
+    curves = []
+    for athlete, points in by_athlete.items():
+        if len(points) < 2:
+            continue
+        x_days = np.array([p['t'] for p in points], dtype='datetime64[D]').astype(float)
+        y = np.array([p['v'] for p in points], dtype=float)
+        x_smooth, y_smooth = get_smoothed_curve(athlete, indicator, x_days, y, smoothing, max_points)
+        times = pd.to_datetime(np.asarray(x_smooth) * 86400, unit='s').strftime('%Y-%m-%dT%H:%M:%SZ')
+        curves.extend({'a': athlete, 't': t, 'v': round(float(v), 4)} for t, v in zip(times, y_smooth))
+    return curves
+
+
+def build_trend_vega_spec(records, indicator, ref_ranges, selected_athletes, gender,
+                          smoothing=DEFAULT_SMOOTHING_MODE):
+    """
+    生成交互趋势图的 Vega-Lite 规格
+
+    图层：
+    1. 理想范围色带（来自 ref_ranges 的 low_2/high_2）
+    2. 每名运动员的平滑曲线（服务器端按 smoothing 计算，见 build_trend_curves）
+       + 数据点（悬停显示数值，拖动平移、滚轮缩放）
+
+    缩放、平移、悬停、点击图例切换运动员都在浏览器中完成，不触发服务器重绘。
+    """
+    athlete_names = [str(a) for a in selected_athletes]
+    if len(athlete_names) > len(TREND_COLORS):
+        color_range = [matplotlib.colors.to_hex(c) for c in plt.cm.tab10(np.linspace(0, 1, len(athlete_names)))]
+    else:
+        color_range = [TREND_COLORS[i % len(TREND_COLORS)] for i in range(len(athlete_names))]
+
+    color_encoding = {
+        'field': 'a', 'type': 'nominal', 'title': '运动员',
+        'scale': {'domain': athlete_names, 'range': color_range},
+    }
+    x_encoding = {'field': 't', 'type': 'temporal', 'title': '测试日期', 'axis': {'format': '%Y-%m-%d', 'labelAngle': -45}}
+    y_encoding = {'field': 'v', 'type': 'quantitative', 'title': indicator, 'scale': {'zero': False}}
+    opacity = {'condition': {'param': 'athlete_pick', 'value': 1}, 'value': 0.15}
+
+    layers = []
+
+    # 理想范围色带
+    if indicator in ref_ranges:
+        ranges = ref_ranges[indicator]
+        low_2 = ranges.get('low_2')
+        high_2 = ranges.get('high_2')
+
+        all_values = [r['v'] for r in records]
+        data_min, data_max = min(all_values), max(all_values)
+        y_range = data_max - data_min
+
+        band = None
+        if pd.notna(low_2) and pd.notna(high_2):
+            band = {'lo': float(low_2), 'hi': float(high_2)}
+        elif pd.notna(high_2):
+            band = {'lo': float(min(0, data_min - y_range * 0.1)), 'hi': float(high_2)}
+        elif pd.notna(low_2):
+            band = {'lo': float(low_2), 'hi': float(data_max + y_range * 0.1)}
+
+        if band:
+            layers.append({
+                'data': {'values': [band]},
+                'mark': {'type': 'rect', 'color': '#4A90E2', 'opacity': 0.15},
+                'encoding': {
+                    'y': {'field': 'lo', 'type': 'quantitative'},
+                    'y2': {'field': 'hi'},
+                },
+            })
+
+    # 曲线点已在服务器端按所选模式平滑，浏览器只做折线连接
+    layers.append({
+        'data': {'values': build_trend_curves(records, indicator, smoothing)},
+        'mark': {'type': 'line', 'strokeWidth': 2.5},
+        'params': [
+            {'name': 'zoom', 'select': 'interval', 'bind': 'scales'},
+            {'name': 'athlete_pick', 'select': {'type': 'point', 'fields': ['a']}, 'bind': 'legend'},
+        ],
+        'encoding': {'x': x_encoding, 'y': y_encoding, 'color': color_encoding, 'opacity': opacity},
+    })
+    layers.append({
+        'mark': {'type': 'point', 'filled': True, 'fill': 'white', 'size': 60, 'strokeWidth': 2},
+        'encoding': {
+            'x': x_encoding, 'y': y_encoding, 'color': color_encoding, 'opacity': opacity,
+            'tooltip': [
+                {'field': 'a', 'type': 'nominal', 'title': '运动员'},
+                {'field': 't', 'type': 'temporal', 'title': '日期', 'format': '%Y-%m-%d'},
+                {'field': 'v', 'type': 'quantitative', 'title': indicator},
+            ],
+        },
+    })
+
+    return {
+        'title': f"{indicator} 趋势对比 ({gender})",
+        'height': 420,
+        'data': {'values': records},
+        'layer': layers,
+    }
+
+def compute_baseline_stats(baseline_athletes_df, radar_fields):
+    """
+    计算雷达图各指标的基准均值和标准差
+
+    返回：(mu, sigma) 两个与 radar_fields 对齐的数组
+    - 找不到列：mu=0, sigma=1
+    - 只有1个有效值：mu=该值, sigma=1
+    """
+    mu = np.zeros(len(radar_fields))
+    sigma = np.ones(len(radar_fields))
+
+    for j, field in enumerate(radar_fields):
+        actual_col = find_indicator_column(baseline_athletes_df, field)
+        if not actual_col:
+            continue
+        col_data = pd.to_numeric(baseline_athletes_df[actual_col], errors='coerce').dropna()
+        if len(col_data) >= 2:
+            mu[j] = col_data.mean()
+            sigma[j] = col_data.std()
+        elif len(col_data) == 1:
+            mu[j] = col_data.iloc[0]
+
+    return mu, sigma
+
+
+def compute_radar_zscores(athlete_df, radar_fields, lower_is_better, ref_ranges, mu, sigma, n_tests=4):
+    """
+    一次性计算雷达图需要的全部Z值（向量化）
+
+    - 取最近 n_tests 次测试，构建 日期 × 指标 矩阵 X
+    - Z = (X − μ) / σ，σ为0或缺失值时 Z=0
+    - 逆指标用符号向量整体取反
+    - 同一次计算中得到理想范围（low_2/high_2）对应的Z值上下界
+
+    返回：(dates, Z, band_lower, band_upper)
+    - dates: 最近几次测试的日期字符串（从旧到新）
+    - Z: shape = (len(dates), len(radar_fields))
+    - band_lower / band_upper: shape = (len(radar_fields),)
+    """
+    latest = athlete_df.dropna(subset=['Date']).drop_duplicates('Date').tail(n_tests)
+    dates = format_dates(latest['Date'])
+
+    # 日期 × 指标矩阵（每个指标只解析一次列名）
+    X = np.full((len(latest), len(radar_fields)), np.nan)
+    for j, field in enumerate(radar_fields):
+        actual_col = find_indicator_column(athlete_df, field)
+        if actual_col:
+            X[:, j] = pd.to_numeric(latest[actual_col], errors='coerce').to_numpy(dtype=float)
+
+    mu = np.asarray(mu, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    valid_sigma = np.isfinite(sigma) & (sigma != 0)
+    safe_sigma = np.where(valid_sigma, sigma, 1.0)
+
+    # 逆指标符号向量
+    sign = np.where([f in lower_is_better for f in radar_fields], -1.0, 1.0)
+
+    Z = (X - mu) / safe_sigma
+    Z = np.where(np.isnan(Z) | ~valid_sigma, 0.0, Z) * sign
+
+    # 理想范围（与Z值同一次计算）
+    low_2 = np.array([_range_bound(ref_ranges, f, 'low_2') for f in radar_fields])
+    high_2 = np.array([_range_bound(ref_ranges, f, 'high_2') for f in radar_fields])
+    has_ref = np.array([f in ref_ranges for f in radar_fields], dtype=bool)
+
+    z_low = np.where(np.isnan(low_2), -2.5, (low_2 - mu) / safe_sigma)    # 没有下限，使用较小值
+    z_high = np.where(np.isnan(high_2), 2.5, (high_2 - mu) / safe_sigma)  # 没有上限，使用较大值
+
+    # 逆指标：上下界取反并交换
+    band_lower = np.where(sign < 0, -z_high, z_low)
+    band_upper = np.where(sign < 0, -z_low, z_high)
+
+    # 没有参考范围或没有统计数据，使用默认值
+    use_default = ~(has_ref & valid_sigma)
+    band_lower = np.where(use_default, -1.0, band_lower)
+    band_upper = np.where(use_default, 1.0, band_upper)
+
+    return dates, Z, band_lower, band_upper
+
+
+def _range_bound(ref_ranges, field, key):
+    """取参考范围的某个边界，缺失时返回NaN"""
+    value = ref_ranges.get(field, {}).get(key)
+    return float(value) if value is not None and pd.notna(value) else np.nan
+
+
+@timed('plot.radar')
+def plot_radar_chart_with_baseline(athlete_df, radar_fields, lower_is_better, ref_ranges, athlete_name,
+                                   baseline_athletes_df, gender, baseline_stats=None):
+    """
+    绘制单个运动员的雷达图（最近4次测试）
+
+    参数：
+    - athlete_df: 主运动员的数据
+    - radar_fields: 雷达图指标列表
+    - lower_is_better: 逆指标列表
+    - ref_ranges: 参考范围
+    - athlete_name: 主运动员姓名
+    - baseline_athletes_df: 用于计算baseline的所有运动员数据（包括主运动员）
+    - gender: 性别
+    - baseline_stats: 可选，预先算好的 (mu, sigma)，提供时不再从 baseline_athletes_df 计算
+    """
+    if athlete_df.empty:
+        return None
+
+    # 计算baseline统计值：使用对比运动员组的最近4次数据
+    # 这样可以看到主运动员相对于对比组的表现
+    if baseline_stats is None:
+        baseline_stats = compute_baseline_stats(baseline_athletes_df, radar_fields)
+    mu, sigma = baseline_stats
+
+    # 主运动员最近4次数据的Z值矩阵 + 理想范围
+    last_4_dates, Z, band_lower, band_upper = compute_radar_zscores(
+        athlete_df, radar_fields, lower_is_better, ref_ranges, mu, sigma
+    )
+    if len(last_4_dates) == 0:
+        return None
+    lap('zscore')   # 基准 + Z值计算
+
+    # 计算Z-score范围（用于设置坐标轴）
+    max_abs_z = np.abs(Z).max() if Z.size else 0
+    limit = max(3, np.ceil(max_abs_z * 2) / 2)
+
+    # 设置标签
+    labels = [f + ('\n(逆)' if f in lower_is_better else '') for f in radar_fields]
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+    angles += angles[:1]
+
+    # 创建图表（高清晰度）
+    fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(polar=True), dpi=150)
+    plt.ylim(-limit - 1.0, limit)
+
+    # 绘制零线
+    ax.plot(angles, [0] * len(angles), color='red', linewidth=2, linestyle='--', zorder=0.5)
+
+    # ========== 绘制正常范围（浅绿色背景）==========
+    # 闭合多边形
+    normal_range_lower = band_lower.tolist() + [band_lower[0]]
+    normal_range_upper = band_upper.tolist() + [band_upper[0]]
+
+    # 绘制理想范围区域（浅绿色填充）
+    ax.fill_between(angles, normal_range_lower, normal_range_upper,
+                     color='#90EE90', alpha=0.2, zorder=1, label='理想范围')
+
+    # 绘制理想范围边界线
+    ax.plot(angles, normal_range_lower, color='#32CD32', linewidth=1.5,
+            linestyle=':', alpha=0.6, zorder=1)
+    ax.plot(angles, normal_range_upper, color='#32CD32', linewidth=1.5,
+            linestyle=':', alpha=0.6, zorder=1)
+
+    # 选择样式 - 最近4次测试
+    styles = RADAR_STYLES[-len(last_4_dates):]
+
+    # 绘制主运动员的最近4次数据
+    for i, date in enumerate(last_4_dates):
+        values = Z[i].tolist()
+        values.append(values[0])
+        style = styles[i]
+
+        ax.plot(angles, values, color=style['color'], linewidth=style['linewidth'],
+                linestyle=style['linestyle'], label=date, zorder=2)
+
+        # 最新一次填充
+        if i == len(last_4_dates) - 1:
+            ax.fill(angles, values, color=style['color'], alpha=0.15, zorder=3)
+
+    # 设置坐标轴
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(labels, size=11)
+
+    # 数值刻度
+    step = 1 if limit <= 3 else 2
+    z_ticks = np.arange(-int(limit), int(limit) + 1, step)
+    ax.set_yticks(z_ticks)
+    ax.set_yticklabels([f'{i:.0f}' for i in z_ticks], color='grey', size=10)
+
+    plt.title(f"{athlete_name} ({gender}) - 机能状态 Z-Score 雷达图",
+              fontsize=16, y=1.08, fontweight='bold')
+    plt.legend(loc='upper right', bbox_to_anchor=(1.3, 1.1))
+
+    plt.tight_layout()
+    lap('draw')
+
+    return fig
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+上传后后台预渲染
+
+数据清洗完成后，在后台线程里把最可能被查看的图表提前渲染进 FIGURE_CACHE（预览级）：
+- 每名运动员最新一次测试的4张主题表格
+- 默认趋势指标（单人、全部日期）的静态趋势图
+- 默认雷达指标（以本人为基准组）的雷达图
+
+按运动员分组排队，当前选中的运动员优先；用户切换运动员时调用 prioritize() 插队。
+上传新文件时调用 cancel()，正在渲染的那一张完成后线程即退出。
+
+数据还需要读取（例如主题表格用到的辅助sheet尚未读入）时用 plan_prerender_deferred：
+读取和排队都在后台线程中进行，页面第一次显示不等待。
+
+图表内容键由本模块的 *_figure_key() 统一计算，界面按同样的输入生成时会直接命中缓存。
+"""
+
+import contextvars
+import threading
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+from .athletes import AthleteIndex
+from .baseline import BASELINE_WINDOW, get_baseline_cache
+from .batch import BASELINE_EXCLUDE_COLS, find_name_column
+from .catalog import build_indicator_catalog, catalog_indicators
+from .figure_cache import FIGURE_CACHE, content_key
+from .indicators import (
+    find_indicator_column, list_numeric_indicators, default_trend_indicators, default_radar_indicators
+)
+from .smoothing import DEFAULT_SMOOTHING_MODE
+from .style import THEME_CONFIG, LOWER_IS_BETTER
+
+PRERENDER_TIER = 'preview'
+
+
+def theme_figure_key(dataset_key, gender, athlete, theme_name, ranges_key):
+    return content_key('theme', dataset_key, gender, athlete, theme_name, ranges_key)
+
+
+def trend_figure_key(dataset_key, gender, indicator, athletes, date_range, smoothing, ranges_key):
+    # 日期范围统一成 'YYYY-MM-DD' 字符串，date/datetime/Timestamp 得到相同的键
+    if date_range and len(date_range) == 2:
+        date_range = tuple(str(pd.Timestamp(d).date()) for d in date_range)
+    else:
+        date_range = None
+    return content_key('trend', dataset_key, gender, indicator, list(athletes), date_range, smoothing, ranges_key)
+
+
+def radar_figure_key(dataset_key, gender, athlete, radar_fields, lower_is_better, baseline_athletes, ranges_key):
+    return content_key('radar', dataset_key, gender, athlete, list(radar_fields), list(lower_is_better),
+                       sorted(baseline_athletes), ranges_key)
+
+
+class Prerenderer:
+    """一个数据集的后台预渲染任务（按运动员分组的优先队列 + 单个后台线程）"""
+
+    def __init__(self, dataset_key=None):
+        self.dataset_key = dataset_key     # 延后排队（plan_prerender_deferred）时读取完成前为 None
+        self._queue = OrderedDict()        # (性别, 姓名) -> deque[(内容键, build_fig)]
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = None
+        self._prepare = None               # 后台线程开始渲染前先调用（读取数据并排队）
+        self._preferred = None             # 最近一次 prioritize 的运动员，排队完成后仍然优先
+        self.total = 0
+        self.done = 0
+
+    def add(self, group, key, build_fig):
+        with self._lock:
+            self._queue.setdefault(group, deque()).append((key, build_fig))
+            self.total += 1
+
+    def prioritize(self, group):
+        """把某名运动员剩余的图表移到队首"""
+        with self._lock:
+            self._preferred = group
+            if group in self._queue:
+                self._queue.move_to_end(group, last=False)
+
+    def start(self):
+        if self._thread is None:
+            # 在启动时的上下文中运行：预渲染的计时记录归入发起它的会话
+            self._thread = threading.Thread(target=contextvars.copy_context().run, args=(self._run,),
+                                            name='figure-prerender', daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            self._queue.clear()
+            self._prepare = None   # 不再引用要读取的数据（任务对象可能还保存在会话里）
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def preparing(self):
+        """后台线程还在读取数据、尚未排队"""
+        return self.running and self.dataset_key is None
+
+    def _next(self):
+        with self._lock:
+            while self._queue:
+                group, tasks = next(iter(self._queue.items()))
+                if tasks:
+                    return tasks.popleft()
+                del self._queue[group]
+            return None
+
+    def _run(self):
+        prepare = self._prepare
+        if prepare is not None:
+            try:
+                prepare()
+            except Exception:
+                return  # 读取失败时不预渲染，用户点击时按正常流程读取和生成
+        while not self._cancelled.is_set():
+            task = self._next()
+            if task is None:
+                break
+            key, build_fig = task
+            try:
+                FIGURE_CACHE.render_png(key, PRERENDER_TIER, build_fig)
+            except Exception:
+                pass  # 预渲染失败不影响界面，用户点击时会按正常流程重新生成
+            self.done += 1
+
+
+def plan_prerender(dataset_key, df, ref_ranges_by_gender, first=None, catalog=None, indexes=None):
+    """
+    为一个数据集建立预渲染队列（尚未启动，调用 .start() 开始）
+
+    ref_ranges_by_gender: {'男': 男性参考范围, '女': 女性参考范围}
+    first: 可选 (性别, 姓名)，该性别排在前面、该运动员排在最前
+    catalog: 可选，已建好的指标目录（catalog.build_indicator_catalog），省去再次扫描数值列
+    indexes: 可选，{性别: AthleteIndex}，省去再次排序分组
+    """
+    job = Prerenderer(dataset_key)
+    _plan(job, dataset_key, df, ref_ranges_by_gender, first, catalog, indexes)
+    return job
+
+
+def plan_prerender_deferred(load, ref_ranges_by_gender, first=None):
+    """
+    与 plan_prerender 相同，但数据在后台线程中读取（尚未启动，调用 .start() 开始）
+
+    load: 无参数的函数，返回 (数据集标识, 数据)；在预渲染线程中调用，读取完成后设置 job.dataset_key 并排队
+    """
+    job = Prerenderer()
+
+    def prepare():
+        dataset_key, df = load()
+        if not job.cancelled:
+            # 与界面相同，默认指标从指标目录中选取
+            _plan(job, dataset_key, df, ref_ranges_by_gender, first, catalog=build_indicator_catalog(df))
+        job.dataset_key = dataset_key
+
+    job._prepare = prepare
+    return job
+
+
+def _plan(job, dataset_key, df, ref_ranges_by_gender, first=None, catalog=None, indexes=None):
+    """把一个数据集各性别、各运动员的图表加入 job"""
+    name_col = find_name_column(df)
+    if name_col is None:
+        return
+
+    genders = ['男', '女'] if '性别' in df.columns else ['男']
+    if first is not None and first[0] in genders:
+        genders.remove(first[0])
+        genders.insert(0, first[0])
+
+    for gender in genders:
+        gender_df = df[df['性别'] == gender].copy() if '性别' in df.columns else df.copy()
+        if gender_df.empty:
+            continue
+        all_indicators = (catalog_indicators(catalog, gender) if catalog is not None
+                          else list_numeric_indicators(gender_df))
+        index = (indexes or {}).get(gender)
+        _plan_gender(job, dataset_key, gender, gender_df, name_col, ref_ranges_by_gender[gender], all_indicators,
+                     index)
+
+    first = job._preferred or first
+    if first is not None:
+        job.prioritize(first)
+
+
+def _plan_gender(job, dataset_key, gender, gender_df, name_col, ref_ranges, all_indicators, index=None):
+    """按界面中的默认选项，为一个性别的每名运动员加入主题表格、趋势图和雷达图"""
+    from .plots import plot_theme_table, plot_trend_chart_multi, plot_radar_chart_with_baseline
+
+    date_col = 'Date' if 'Date' in gender_df.columns else 'Date_auto'
+    ranges_key = content_key(ref_ranges)
+    trend_indicators = default_trend_indicators(all_indicators)
+    radar_fields = default_radar_indicators(all_indicators)
+    lower_is_better = [ind for ind in LOWER_IS_BETTER if ind in radar_fields]
+    date_range = None
+    if date_col in gender_df.columns:
+        date_range = (gender_df[date_col].min(), gender_df[date_col].max())
+
+    baseline_cache = None
+    if len(radar_fields) >= 3:
+        baseline_cache = get_baseline_cache(
+            dataset_key, gender, gender_df, name_col,
+            date_col=date_col, window=BASELINE_WINDOW, exclude_cols=BASELINE_EXCLUDE_COLS
+        )
+        radar_cols = [find_indicator_column(gender_df, f) for f in radar_fields]
+
+    if index is None:
+        index = AthleteIndex(gender_df, name_col, date_col)
+
+    for athlete in index.athletes:
+        group = (gender, athlete)
+        latest = index.latest_row(athlete)
+        recent = index.last_tests(athlete)
+
+        for theme_name, categories in THEME_CONFIG.items():
+            job.add(group, theme_figure_key(dataset_key, gender, athlete, theme_name, ranges_key),
+                    lambda latest=latest, theme_name=theme_name, categories=categories:
+                        plot_theme_table(latest, theme_name, categories, ref_ranges, gender)[0])
+
+        if baseline_cache is not None and baseline_cache.has_data([athlete]):
+            key = radar_figure_key(dataset_key, gender, athlete, radar_fields, lower_is_better, [athlete], ranges_key)
+            job.add(group, key,
+                    lambda recent=recent, athlete=athlete: plot_radar_chart_with_baseline(
+                        recent, radar_fields, lower_is_better, ref_ranges, athlete, None, gender,
+                        baseline_stats=baseline_cache.stats_for([athlete], radar_cols)
+                    ))
+
+        for indicator in trend_indicators:
+            key = trend_figure_key(dataset_key, gender, indicator, [athlete], date_range,
+                                   DEFAULT_SMOOTHING_MODE, ranges_key)
+            job.add(group, key,
+                    lambda indicator=indicator, athlete=athlete: plot_trend_chart_multi(
+                        index.between([athlete], *(date_range or ())), indicator, ref_ranges, [athlete], None, gender,
+                        smoothing=DEFAULT_SMOOTHING_MODE
+                    ))
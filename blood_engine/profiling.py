@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+按需的函数级性能分析（cProfile）
+
+    with capture('生成趋势对比图') as report:    # 分析一段代码（一次页面运行）
+        ...
+    report.top(30)            # 累计耗时最多的函数表
+    report.pstats_bytes()     # 原始 .pstats（pstats / snakeviz 可直接打开）
+    report.collapsed()        # 折叠栈文本（flamegraph.pl、speedscope 可直接打开）
+
+cProfile 只记录调用者→被调用者的边，没有完整调用栈；折叠栈按每条边的累计耗时占比
+把时间从根函数向下分摊得到，形状与真实火焰图一致，递归和被多处调用的函数是近似值。
+同一时间只分析一段代码（嵌套的 capture 直接执行不分析），只统计当前线程，
+后台预渲染、高清图生成线程不计入。
+"""
+
+import contextlib
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+import time
+
+import pandas as pd
+
+_active = threading.Lock()
+
+COLLAPSED_MAX_DEPTH = 80
+COLLAPSED_MIN_FRACTION = 0.001   # 占总耗时不到 0.1% 的分支不再展开
+
+
+def _label(func):
+    """pstats 的 (文件, 行号, 函数名) → 'name (file.py:line)'"""
+    filename, line, name = func
+    if filename == '~':   # 内置函数
+        return name.replace(';', ':')
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ':')
+
+
+class ProfileReport:
+    """一次 capture 的结果：label、开始时间 ts、总耗时 ms、pstats.Stats（没有记录到调用时为 None）"""
+
+    def __init__(self, label):
+        self.label = label
+        self.ts = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.ms = None
+        self.stats = None
+
+    def top(self, limit=30, sort='cumulative'):
+        """耗时最多的函数（sort='cumulative' 按累计耗时，'tottime' 按自身耗时）"""
+        columns = ['函数', '位置', '调用次数', '自身ms', '累计ms']
+        if self.stats is None:
+            return pd.DataFrame(columns=columns)
+        rows = []
+        for func, (cc, nc, tt, ct, _) in self.stats.stats.items():
+            filename, line, name = func
+            where = '内置' if filename == '~' else f"{os.path.basename(filename)}:{line}"
+            rows.append((name, where, nc, tt * 1000, ct * 1000))
+        df = pd.DataFrame(rows, columns=columns)
+        key = '自身ms' if sort == 'tottime' else '累计ms'
+        return df.sort_values(key, ascending=False).head(limit).round(2).reset_index(drop=True)
+
+    def pstats_bytes(self):
+        """与 pstats.Stats.dump_stats 相同格式的字节（保存为 .pstats 文件）"""
+        return marshal.dumps(self.stats.stats if self.stats is not None else {})
+
+    def collapsed(self):
+        """折叠栈文本：每行 '根;…;函数 微秒数'（见模块说明）"""
+        if self.stats is None:
+            return ''
+        raw = self.stats.stats
+        callees = {}
+        for func, (_, _, _, _, callers) in raw.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+
+        roots = [func for func, entry in raw.items() if not any(c in raw for c in entry[4])]
+        total = sum(raw[func][3] for func in roots) or 1.0
+        weights = {}
+
+        def walk(func, path, ct_here):
+            cc, nc, tt, ct, _ = raw[func]
+            frac = ct_here / ct if ct > 0 else 0.0
+            self_time = tt * frac
+            if self_time > 0:
+                key = ';'.join(path)
+                weights[key] = weights.get(key, 0.0) + self_time
+            if len(path) >= COLLAPSED_MAX_DEPTH:
+                return
+            for callee, edge_ct in callees.get(func, ()):
+                child_ct = edge_ct * frac
+                if callee in seen or child_ct < total * COLLAPSED_MIN_FRACTION:
+                    continue
+                seen.add(callee)
+                walk(callee, path + [_label(callee)], child_ct)
+                seen.discard(callee)
+
+        for root in roots:
+            seen = {root}
+            walk(root, [_label(root)], raw[root][3])
+
+        lines = [f"{stack} {int(round(t * 1e6))}" for stack, t in weights.items() if t * 1e6 >= 1]
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+
+@contextlib.contextmanager
+def capture(label=''):
+    """
+    用 cProfile 分析 with 块内的代码，yield 出 ProfileReport（退出 with 后填好结果）
+
+    with 块内抛出的异常（包括 Streamlit 的 st.stop / st.rerun）照常传出，已记录的部分仍保留。
+    已有分析在进行时不重复分析，report.stats 保持为 None。
+    """
+    report = ProfileReport(label)
+    if not _active.acquire(blocking=False):
+        yield report
+        return
+    profiler = cProfile.Profile()
+    t0 = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            yield report
+        finally:
+            profiler.disable()
+            report.ms = round((time.perf_counter() - t0) * 1000, 1)
+            if profiler.getstats():
+                report.stats = pstats.Stats(profiler)
+    finally:
+        _active.release()
+
+
+def profiling_active():
+    """当前是否有分析在进行"""
+    return _active.locked()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+参考范围解析：从上传的"参考范围"Excel生成男/女参考范围字典
+"""
+
+import pandas as pd
+
+from .messages import report
+
+
+def parse_range_value(value_str):
+    """
+    解析范围值字符串
+
+    支持格式：
+    - "210-430" → (210, 430)
+    - "< 210" → (None, 210)
+    - "> 500" → (500, None)
+    - "36.63" → (36.63, 36.63)
+    - "6.0-20.0" → (6.0, 20.0)
+    - "-" → (None, None)
+    """
+    if pd.isna(value_str) or str(value_str).strip() == '-' or str(value_str).strip() == '':
+        return None, None
+
+    value_str = str(value_str).strip()
+
+    # 处理 "< X" 格式
+    if value_str.startswith('<'):
+        val = value_str.replace('<', '').strip()
+        try:
+            return None, float(val)
+        except:
+            return None, None
+
+    # 处理 "> X" 格式
+    if value_str.startswith('>'):
+        val = value_str.replace('>', '').strip()
+        try:
+            return float(val), None
+        except:
+            return None, None
+
+    # 处理 "X-Y" 格式
+    if '-' in value_str:
+        parts = value_str.split('-')
+        if len(parts) == 2:
+            try:
+                return float(parts[0].strip()), float(parts[1].strip())
+            except:
+                return None, None
+
+    # 处理单个数值
+    try:
+        val = float(value_str)
+        return val, val
+    except:
+        return None, None
+
+
+def load_reference_ranges_from_excel(file):
+    """
+    从上传的Excel文件加载参考范围
+
+    返回：
+    - male_ranges: 男性参考范围字典
+    - female_ranges: 女性参考范围字典
+    """
+    try:
+        # 读取参考范围sheet
+        df = pd.read_excel(file, sheet_name='参考范围')
+
+        male_ranges = {}
+        female_ranges = {}
+        common_ranges = {}
+
+        # 遍历每一行
+        for idx, row in df.iterrows():
+            indicator = str(row['指标名称']).strip()
+            gender = str(row['性别']).strip()
+
+            # 解析五档范围
+            severe_low_val = row['严重偏低 (<)']
+            low_range = row['偏低 (范围)']
+            normal_range = row['参考范围 (正常)']
+            high_range = row['偏高 (范围)']
+            severe_high_val = row['严重偏高 (>)']
+
+            # 解析正常范围（这是最重要的）
+            normal_low, normal_high = parse_range_value(normal_range)
+
+            # 解析其他范围
+            severe_low_lower, severe_low_upper = parse_range_value(severe_low_val)
+            low_lower, low_upper = parse_range_value(low_range)
+            high_lower, high_upper = parse_range_value(high_range)
+            severe_high_lower, severe_high_upper = parse_range_value(severe_high_val)
+
+            # 构建范围字典
+            range_dict = {
+                'severe_low_1': severe_low_lower if severe_low_lower is not None else severe_low_upper,
+                'low_1': low_lower if low_lower is not None else None,
+                'low_2': normal_low,  # 正常范围下限
+                'high_2': normal_high,  # 正常范围上限
+                'high_1': high_upper if high_upper is not None else None,
+                'severe_high_1': severe_high_upper if severe_high_upper is not None else severe_high_lower,
+            }
+
+            # 根据性别分类
+            if gender == '男':
+                male_ranges[indicator] = range_dict
+            elif gender == '女':
+                female_ranges[indicator] = range_dict
+            elif gender == '通用':
+                common_ranges[indicator] = range_dict
+
+        # 合并通用范围到男女范围
+        for indicator, range_dict in common_ranges.items():
+            if indicator not in male_ranges:
+                male_ranges[indicator] = range_dict
+            if indicator not in female_ranges:
+                female_ranges[indicator] = range_dict
+
+        return male_ranges, female_ranges
+
+    except Exception as e:
+        report('error', f"解析参考范围文件出错：{str(e)}")
+        return {}, {}
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+多页PDF报告：每名运动员一份，或全队一份
+
+- 页面内容与批量报告相同（主题表格 → 雷达图 → 趋势图），直接复用现有绘图函数
+- 图表在进程池中并行构建（取数、计算、排版），以序列化的Figure传回主进程，
+  由 PdfPages 按顺序写入同一个文件；全程是矢量页面，不生成位图
+- 字体以 TrueType（fonttype 42）子集嵌入，同一文档内所有页面共用一份字体
+- 同时在途的运动员数有上限，写完一页立即关闭，内存占用与运动员人数无关
+- 主进程中用到 pyplot 的地方与 figure_cache 共用同一把锁，可以在 Streamlit 的请求线程里调用
+"""
+
+import os
+import pickle
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import BATCH_MAX_WORKERS, MP_CONTEXT, _init_worker, _worker_state, iter_athlete_figures
+from .figure_cache import _RENDER_LOCK
+
+PDF_RC = {'pdf.fonttype': 42}          # TrueType嵌入：文字可复制、可搜索，字体只嵌入一次
+
+
+def _build_pages(gender, athlete, state=None):
+    """
+    构建一名运动员的全部页面，返回序列化后的Figure列表
+
+    state: 共享数据；工作进程中为 None，使用 _init_worker 保存的 _worker_state
+    """
+    import matplotlib.pyplot as plt
+
+    if state is None:
+        state = _worker_state
+    gs = state['squad'][gender]
+    pages = []
+    for _, fig in iter_athlete_figures(gs, gender, athlete):
+        if fig is None:
+            continue
+        pages.append(pickle.dumps(fig, protocol=pickle.HIGHEST_PROTOCOL))
+        plt.close(fig)
+    return pages
+
+
+def _iter_pages_in_order(squad, tasks, max_workers):
+    """按 tasks 顺序 yield 每名运动员的页面列表；最多 2×max_workers 名运动员同时在途"""
+    state = {'squad': squad}
+
+    if max_workers == 1:
+        # 单进程时在当前进程逐个构建：不写模块级 _worker_state（其他会话可能同时在导出），
+        # 绘制期间持有与 figure_cache 共用的渲染锁
+        for gender, athlete in tasks:
+            with _RENDER_LOCK:
+                pages = _build_pages(gender, athlete, state)
+            yield pages
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=MP_CONTEXT,
+                             initializer=_init_worker, initargs=(state,)) as pool:
+        pending = deque()
+        remaining = iter(tasks)
+        for gender, athlete in remaining:
+            pending.append(pool.submit(_build_pages, gender, athlete))
+            if len(pending) >= 2 * max_workers:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            nxt = next(remaining, None)
+            if nxt is not None:
+                pending.append(pool.submit(_build_pages, *nxt))
+            yield pages
+
+
+def write_squad_pdf(squad, fileobj, athletes=None, max_workers=None, title='运动员血液指标报告'):
+    """
+    把 squad（batch.prepare_squad 的返回值）中运动员的报告写成一个多页PDF
+
+    fileobj: 可写的二进制文件对象或路径
+    athletes: 可选，只包含这些姓名（按给出的顺序）；默认全部
+    返回写入的页数
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    if athletes is None:
+        tasks = [(gender, athlete) for gender, gs in squad.items() for athlete in gs['athletes']]
+    else:
+        tasks = [(gender, athlete) for athlete in athletes
+                 for gender, gs in squad.items() if athlete in gs['index']]
+    max_workers = max_workers or BATCH_MAX_WORKERS
+
+    n_pages = 0
+    with matplotlib.rc_context(PDF_RC), PdfPages(fileobj, metadata={'Title': title}) as pdf:
+        for pages in _iter_pages_in_order(squad, tasks, max_workers):
+            for blob in pages:
+                with _RENDER_LOCK:
+                    fig = pickle.loads(blob)
+                    pdf.savefig(fig)
+                    plt.close(fig)
+                n_pages += 1
+    return n_pages
+
+
+def squad_pdf_file(squad, athletes=None, max_workers=None, title='运动员血液指标报告'):
+    """
+    生成PDF到临时文件，返回以只读方式打开的文件对象（可直接交给 st.download_button）
+
+    页面边生成边写盘，不在内存中拼接整份文档；临时文件在打开后即删除，文件对象关闭后空间自动释放。
+    """
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_squad_pdf(squad, f, athletes=athletes, max_workers=max_workers, title=title)
+        return open(path, 'rb')
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Windows 上文件仍被占用时无法删除，留给系统清理临时目录
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+趋势曲线平滑与降采样
+
+纯计算模块（不依赖 Streamlit）。Streamlit 每次 rerun 都会重新执行 app.py，
+但被 import 的模块只加载一次，所以这里的模块级缓存可以跨 rerun 复用。
+
+平滑模式：
+- 'spline'  : 二次样条（原版效果），点数过多时自动退化为单调三次
+- 'monotone': 单调三次插值（PCHIP），不会过冲
+- 'ewma'    : 指数加权移动平均，O(n)
+- 'none'    : 不平滑，直接折线连接
+
+所有模式的计算量都以输出像素宽度为上限：输入点数超过像素宽度时先用LTTB降采样。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import make_interp_spline, PchipInterpolator
+
+# 平滑模式（key: 显示名称）
+SMOOTHING_MODES = {
+    'spline': '二次样条',
+    'monotone': '单调三次（PCHIP）',
+    'ewma': '指数加权平均（EWMA）',
+    'none': '不平滑（折线）',
+}
+DEFAULT_SMOOTHING_MODE = 'spline'
+
+SPLINE_MAX_POINTS = 60          # 超过这个点数时，二次样条改用单调三次（更快、不振荡）
+SMOOTH_MIN_OUTPUT_POINTS = 200  # 短序列的插值输出点数（与原版一致）
+EWMA_SPAN = 3                   # EWMA 的跨度（次测试）
+
+_CACHE_MAX_ENTRIES = 512
+_smooth_cache = OrderedDict()
+_cache_stats = {'hits': 0, 'misses': 0}
+_cache_lock = threading.Lock()   # 脚本线程与预渲染/高清渲染线程并发读写缓存
+
+
+def lttb_downsample(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标
+
+    - 首尾两点始终保留
+    - 中间的点分成 threshold-2 个桶，每桶保留与相邻桶构成三角形面积最大的点
+    - 数据点数不超过 threshold 时原样返回全部下标
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+
+        # 下一个桶的平均点（最后一个桶的"下一个桶"就是末尾点）
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def _merge_repeated_x(x, y):
+    """按x排序，同一x（同一天多次测试）取平均，保证x严格递增"""
+    order = np.argsort(x, kind='stable')
+    x = x[order]
+    y = y[order]
+    unique_x, inverse, counts = np.unique(x, return_inverse=True, return_counts=True)
+    if len(unique_x) == len(x):
+        return x, y
+    sums = np.bincount(inverse, weights=y)
+    return unique_x, sums / counts
+
+
+def smooth_curve(x, y, mode=DEFAULT_SMOOTHING_MODE, max_points=1000):
+    """
+    计算平滑曲线（不带缓存）
+
+    参数：
+    - x, y: 数据点（x为日期下标，可以有重复）
+    - mode: 平滑模式，见 SMOOTHING_MODES
+    - max_points: 输出点数上限（通常取图表像素宽度）
+
+    返回：(x_smooth, y_smooth)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x, y = _merge_repeated_x(x, y)
+
+    if len(x) < 2 or mode == 'none':
+        return x, y
+
+    # 输入点比像素还多时，先降采样到像素宽度
+    if len(x) > max_points:
+        keep = lttb_downsample(x, y, max_points)
+        x, y = x[keep], y[keep]
+
+    if mode == 'ewma':
+        return x, pd.Series(y).ewm(span=EWMA_SPAN).mean().values
+
+    n_out = min(max_points, max(SMOOTH_MIN_OUTPUT_POINTS, 4 * len(x)))
+    x_smooth = np.linspace(x.min(), x.max(), n_out)
+
+    if mode == 'spline' and len(x) <= SPLINE_MAX_POINTS:
+        try:
+            k = 2 if len(x) >= 3 else 1
+            return x_smooth, make_interp_spline(x, y, k=k)(x_smooth)
+        except (ValueError, np.linalg.LinAlgError):
+            pass  # 退化为单调三次
+
+    return x_smooth, PchipInterpolator(x, y)(x_smooth)
+
+
+def data_hash(x, y):
+    """数据点的内容哈希（用作缓存键的一部分）"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(x, dtype=float).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def get_smoothed_curve(athlete, indicator, x, y, mode=DEFAULT_SMOOTHING_MODE, max_points=1000):
+    """
+    带缓存的平滑曲线，缓存键为 (运动员, 指标, 模式, 输出上限, 数据哈希)
+
+    数据不变时重复渲染直接命中缓存；数据变化后哈希不同，自动重新计算。
+    """
+    key = (athlete, indicator, mode, max_points, data_hash(x, y))
+    with _cache_lock:
+        cached = _smooth_cache.get(key)
+        if cached is not None:
+            _smooth_cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return cached
+        _cache_stats['misses'] += 1
+
+    result = smooth_curve(x, y, mode, max_points)   # 计算在锁外，并发时同一曲线可能重复计算一次
+    with _cache_lock:
+        _smooth_cache[key] = result
+        _smooth_cache.move_to_end(key)
+        while len(_smooth_cache) > _CACHE_MAX_ENTRIES:
+            _smooth_cache.popitem(last=False)
+    return result
+
+
+def smoothing_cache_info():
+    """返回平滑缓存的命中统计"""
+    with _cache_lock:
+        return {
+            'hits': _cache_stats['hits'],
+            'misses': _cache_stats['misses'],
+            'size': len(_smooth_cache),
+            'max_entries': _CACHE_MAX_ENTRIES,
+        }
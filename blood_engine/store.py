@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+长表格式的本地 SQLite 数据仓库
+
+Excel 中的宽表（一行一次测试、上百个大多为空的指标列）拆成长表保存，每个有值的单元格一行：
+
+    tests(athlete, date, seq, indicator, value, censor, raw, sheet)
+
+- date: 'YYYY-MM-DD' 文本，按字典序即按日期排序，日期范围查询可以直接走索引
+- seq: 同一运动员同一天的第几次测试（从0开始，按该行在导入数据中的先后顺序），
+  同一天复测的多行分别保存，与 DataFrame 中保留同日多行的口径一致
+- value: 数值；'<0.5'、'＞1000' 这类超出检测限的结果取出数字部分，censor 记为 '<' 或 '>'
+- raw: 不是普通数字时保存原始文本（检测限结果、'阴性' 等），普通数字为 NULL
+- sheet: 该指标来自哪个sheet（loader 在 df.attrs['column_sheets'] 中记录）
+
+另有 athletes(athlete, gender) 和 indicators(indicator, position) 两张小表，后者保留指标在Excel中的列顺序。
+
+(athlete, date, seq, indicator) 是主键，表为 WITHOUT ROWID，数据按主键聚簇存放：
+取一名运动员某段时间的数据是一次范围扫描。另有两个覆盖索引：
+- (indicator, athlete, date, value, censor)：趋势图按指标取多名运动员
+- (date, indicator)：全队某段时间的数据
+
+写入用 executemany 在一个事务中批量完成；同一运动员、同一天、同一次序、同一指标重复写入时
+以后写入的为准，因此重复导入同一个Excel不会产生重复行，导入新的Excel文件可以累积历史数据。
+注意 seq 只按一次导入内的顺序编号：两个文件都含有同一天的测试时，后导入的第 k 次测试覆盖先前的第 k 次。
+读取时 frame() 按需还原成与 clean_data_final 输出相同形状的宽表（只含请求的运动员、日期和指标），
+可以直接交给现有的绘图函数。
+
+适用范围：仓库由 `python -m blood_engine.cli --store` 写入；`cli --from-store` 从仓库读出全部历史
+生成报告。Streamlit 界面仍只使用本次上传的Excel，不读取仓库。
+
+旧版本（主键不含 seq）建立的仓库文件在打开时自动迁移，原有数据的 seq 记为 0。
+"""
+
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .indicators import NON_INDICATOR_COLS, find_indicator_column
+
+DEFAULT_SHEET = '月周测试指标'
+STORE_KEY_COLS = set(NON_INDICATOR_COLS) | {'测试日期'}   # 不作为指标写入长表的列
+_CENSOR_PREFIX = {'<': '<', '＜': '<', '>': '>', '＞': '>'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS athletes (
+    athlete TEXT PRIMARY KEY,
+    gender  TEXT
+);
+CREATE TABLE IF NOT EXISTS indicators (
+    indicator TEXT PRIMARY KEY,
+    position  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    athlete   TEXT NOT NULL,
+    date      TEXT NOT NULL,
+    seq       INTEGER NOT NULL DEFAULT 0,
+    indicator TEXT NOT NULL,
+    value     REAL,
+    censor    TEXT NOT NULL DEFAULT '',
+    raw       TEXT,
+    sheet     TEXT,
+    PRIMARY KEY (athlete, date, seq, indicator)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_tests_indicator ON tests (indicator, athlete, date, seq, value, censor);
+CREATE INDEX IF NOT EXISTS idx_tests_date ON tests (date, indicator);
+"""
+
+# 旧版本的 tests 表主键不含 seq：整表复制到新结构（seq 记为 0），旧索引随旧表一起删除
+_MIGRATE_SEQ = """
+BEGIN;
+ALTER TABLE tests RENAME TO tests_v1;
+DROP INDEX IF EXISTS idx_tests_indicator;
+DROP INDEX IF EXISTS idx_tests_date;
+""" + _SCHEMA + """
+INSERT INTO tests (athlete, date, seq, indicator, value, censor, raw, sheet)
+    SELECT athlete, date, 0, indicator, value, censor, raw, sheet FROM tests_v1;
+DROP TABLE tests_v1;
+COMMIT;
+"""
+
+
+def _date_text(value):
+    return None if value is None else pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _indicator_columns(df, name_col, date_col):
+    return [col for col in df.columns if col not in STORE_KEY_COLS and col not in (name_col, date_col)]
+
+
+def split_censored(series):
+    """
+    一列原始值 → (数值, 检测限标记, 去空白的文本)
+
+    '<0.5'、'＞1000' 取出数字部分，标记为 '<' / '>'；普通数字标记为 ''；无法转换的（包括日期列）为 NaN。
+    """
+    if isinstance(series.dtype, pd.SparseDtype):
+        series = series.sparse.to_dense()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = pd.Series(np.nan, index=series.index)     # 出生日期等日期列不是数值，只保留文本
+    else:
+        values = pd.to_numeric(series, errors='coerce')
+    text = series.astype(str).str.strip()
+    censor = text.str[:1].map(_CENSOR_PREFIX).fillna('')
+    censored = (censor != '').to_numpy()
+    if censored.any():
+        values = values.astype(float)
+        values[censored] = pd.to_numeric(text[censored].str[1:].str.strip(), errors='coerce')
+    return values, censor, text
+
+
+def _long_rows(df, name_col, date_col, column_sheets):
+    """宽表 → 长表行 (athlete, date, seq, indicator, value, censor, raw, sheet)，按列向量化处理"""
+    keyed = df[df[name_col].notna() & df[date_col].notna()]
+    athletes = keyed[name_col].astype(str).to_numpy()
+    dates = pd.to_datetime(keyed[date_col]).dt.strftime('%Y-%m-%d').to_numpy()
+    seqs = pd.Series(dates).groupby([athletes, dates]).cumcount().to_numpy()
+
+    for col in _indicator_columns(keyed, name_col, date_col):
+        series = keyed[col]
+        present = series.notna().to_numpy()
+        if not present.any():
+            continue
+        series = series[present]
+
+        values, censor, text = split_censored(series)
+        censored = (censor != '').to_numpy()
+        plain = values.notna().to_numpy() & ~censored
+
+        raw = np.where(plain, None, text.to_numpy(dtype=object))
+        values = values.astype(object).where(values.notna(), None).to_numpy()
+        sheet = column_sheets.get(col, DEFAULT_SHEET)
+        yield from zip(athletes[present], dates[present], seqs[present].tolist(), [col] * len(values), values,
+                       censor.to_numpy(), raw, [sheet] * len(values))
+
+
+class BloodStore:
+    """
+    长表格式的血液指标仓库（一个 SQLite 文件，path=':memory:' 时只在内存中）
+
+    - ingest(df): 写入 clean_data_final 的结果，返回写入的单元格数
+    - athletes(gender) / indicators() / date_span(): 目录信息
+    - query(...): 长表切片
+    - frame(...): 宽表切片（与 clean_data_final 输出同形，可直接用于绘图函数）
+    - latest_frame(athlete) / recent_frame(athlete, n): 主题表格、雷达图需要的测试
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()     # 连接在 Streamlit 的多个请求线程间共用
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        columns = [r[1] for r in self._conn.execute('PRAGMA table_info(tests)')]
+        self._conn.executescript(_MIGRATE_SEQ if columns and 'seq' not in columns else _SCHEMA)
+        self._indicators = None           # 指标列表缓存，写入后失效
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------ 写入
+    def ingest(self, df, name_col=None, date_col=None):
+        """把一份宽表（clean_data_final 的结果）写入仓库，在一个事务内完成；返回写入的单元格数"""
+        from .batch import find_name_column
+
+        name_col = name_col or find_name_column(df)
+        date_col = date_col or ('Date' if 'Date' in df.columns else 'Date_auto')
+        if name_col is None or date_col not in df.columns:
+            return 0
+        column_sheets = df.attrs.get('column_sheets', {})
+
+        athlete_rows = []
+        if '性别' in df.columns:
+            genders = df[[name_col, '性别']].dropna().drop_duplicates(name_col, keep='last')
+            athlete_rows = [(str(a), g) for a, g in genders.itertuples(index=False)]
+
+        with self._lock, self._conn:
+            start = self._conn.execute('SELECT COALESCE(MAX(position) + 1, 0) FROM indicators').fetchone()[0]
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO indicators (indicator, position) VALUES (?, ?)',
+                [(col, start + i) for i, col in enumerate(_indicator_columns(df, name_col, date_col))]
+            )
+            self._conn.executemany(
+                'INSERT INTO athletes (athlete, gender) VALUES (?, ?) '
+                'ON CONFLICT(athlete) DO UPDATE SET gender = excluded.gender', athlete_rows
+            )
+            cursor = self._conn.executemany(
+                'INSERT OR REPLACE INTO tests (athlete, date, seq, indicator, value, censor, raw, sheet) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                _long_rows(df, name_col, date_col, column_sheets)
+            )
+            self._indicators = None
+            return cursor.rowcount
+
+    # ------------------------------------------------------------------ 目录
+    def athletes(self, gender=None):
+        if gender is None:
+            rows = self._fetch('SELECT DISTINCT athlete FROM tests ORDER BY athlete')
+        else:
+            rows = self._fetch('SELECT athlete FROM athletes WHERE gender = ? ORDER BY athlete', (gender,))
+        return [r[0] for r in rows]
+
+    def indicators(self):
+        """仓库中的全部指标列（按首次导入时在Excel中的列顺序）"""
+        if self._indicators is None:
+            self._indicators = [r[0] for r in self._fetch('SELECT indicator FROM indicators ORDER BY position')]
+        return list(self._indicators)
+
+    def date_span(self):
+        """(最早日期, 最晚日期)，仓库为空时为 (None, None)"""
+        first, last = self._fetch('SELECT MIN(date), MAX(date) FROM tests')[0]
+        return (pd.Timestamp(first) if first else None, pd.Timestamp(last) if last else None)
+
+    # ------------------------------------------------------------------ 读取
+    def query(self, athletes=None, indicators=None, start=None, end=None):
+        """
+        长表切片：列为 athlete, date, seq, indicator, value, censor, raw, sheet
+
+        athletes / indicators 为 None 时不限制；start / end 为闭区间，None 时不限制。
+        indicators 应为仓库中的列名（见 resolve）。
+        """
+        clauses, params = [], []
+        if athletes is not None:
+            athletes = [str(a) for a in athletes]
+            clauses.append(f"athlete IN ({','.join('?' * len(athletes))})")
+            params += athletes
+        if indicators is not None:
+            clauses.append(f"indicator IN ({','.join('?' * len(indicators))})")
+            params += indicators
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(_date_text(start))
+        if end is not None:
+            clauses.append('date <= ?')
+            params.append(_date_text(end))
+
+        sql = 'SELECT athlete, date, seq, indicator, value, censor, raw, sheet FROM tests'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY athlete, date, seq'
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def resolve(self, indicators):
+        """界面上的指标名 → 仓库中的列名（沿用 find_indicator_column 的别名规则），找不到的略去"""
+        stored = pd.DataFrame(columns=self.indicators())
+        columns = [find_indicator_column(stored, ind) for ind in indicators]
+        return list(dict.fromkeys(col for col in columns if col))
+
+    def frame(self, athletes=None, indicators=None, start=None, end=None):
+        """
+        宽表切片：Name、性别、Date + 指标列，一行一次测试（按运动员、日期、同日次序排序）
+
+        indicators 为 None 时包含仓库中的全部指标列，否则按别名规则解析后的列；
+        切片内没有值的列保留为空列，与 Excel 宽表一致。
+        普通数字还原为 float，检测限结果和文本还原为原始字符串（主题表格会显示 '<0.5'）。
+        """
+        columns = self.indicators() if indicators is None else self.resolve(indicators)
+        long = self.query(athletes, None if indicators is None else columns, start, end)
+        if long.empty:
+            return pd.DataFrame(columns=['Name', '性别', 'Date', *columns])
+
+        cell = long['value'].astype(object).where(long['raw'].isna(), long['raw'])
+        wide = (pd.DataFrame({'Name': long['athlete'], 'Date': pd.to_datetime(long['date']).astype('datetime64[ns]'),
+                              'seq': long['seq'], 'indicator': long['indicator'], 'cell': cell})
+                .pivot(index=['Name', 'Date', 'seq'], columns='indicator', values='cell')
+                .reset_index())
+        wide.columns.name = None
+        text_cols = set(long.loc[long['raw'].notna(), 'indicator'])
+        wide = wide.reindex(columns=['Name', 'Date', *columns])
+        for col in columns:
+            if col not in text_cols:
+                wide[col] = wide[col].astype(float)
+
+        genders = dict(self._fetch('SELECT athlete, gender FROM athletes'))
+        wide.insert(1, '性别', wide['Name'].map(genders))
+        return wide
+
+    def latest_frame(self, athlete, indicators=None):
+        """某名运动员最新一次测试（单行宽表，主题表格使用；同一天复测时取当天最后一次）"""
+        last = self._fetch('SELECT MAX(date) FROM tests WHERE athlete = ?', (str(athlete),))[0][0]
+        if last is None:
+            return self.frame([], indicators)
+        return self.frame([athlete], indicators, start=last, end=last).tail(1).reset_index(drop=True)
+
+    def recent_frame(self, athlete, n, indicators=None):
+        """某名运动员最近 n 次不同日期的测试（雷达图、基准窗口使用；与 AthleteIndex 一致，同一天取第一次）"""
+        rows = self._fetch(
+            'SELECT DISTINCT date FROM tests WHERE athlete = ? ORDER BY date DESC LIMIT ?', (str(athlete), int(n))
+        )
+        if not rows:
+            return self.frame([], indicators)
+        recent = self.frame([athlete], indicators, start=rows[-1][0], end=rows[0][0])
+        return recent.drop_duplicates(['Name', 'Date']).reset_index(drop=True)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+样式与图表配置：颜色、字体大小、主题分类、雷达图/趋势图默认设置
+
+🎨 所有样式配置集中在这里，修改后表格图、趋势图、雷达图统一生效。
+"""
+
+# 趋势图默认指标
+TREND_INDICATORS = ['睾酮', '皮质醇', '肌酸激酶', '血尿素', '血红蛋白', '铁蛋白', '白细胞', '网织红细胞百分比']
+
+
+# ============================================================================
+# 🎨 样式配置区域 - 在这里修改所有样式
+# ============================================================================
+
+# 【样式1】颜色配置
+# 说明：修改这里可以改变所有颜色
+# ⭐ 新配色方案：
+# - 正常 → 浅灰色（白色看不见！）
+# - 偏低/偏高 → 黄色
+# - 严重偏低/严重偏高 → 红色
+# - 良好/优秀 → 绿色
+COLOR_SEVERE_LOW = '#FF6B6B'         # 严重偏低 - 红色
+COLOR_LOW = '#FFD93D'                # 偏低 - 黄色
+COLOR_NORMAL = '#F5F5F5'             # ⭐ 正常 - 浅灰色（原来白色看不见！）
+COLOR_HIGH = '#FFD93D'               # 偏高 - 黄色（和偏低一样）
+COLOR_SEVERE_HIGH = '#FF6B6B'        # 严重偏高 - 红色（和严重偏低一样）
+COLOR_GOOD = '#6BCF7F'               # 良好 - 绿色
+COLOR_EXCELLENT = '#6BCF7F'          # 优秀 - 绿色（和良好一样）
+
+# ⭐【修改1】二级标题底色改为白色
+COLOR_CATEGORY_HEADER = '#FFFFFF'    # 白色（分类标题背景）
+COLOR_TABLE_HEADER = '#E8E8E8'       # 浅灰色（表头背景）- 改为浅灰，让黑色文字可见
+
+COLOR_CHART_BG = '#F8F9FA'           # 图表背景 - 极浅灰
+COLOR_MAIN = '#1f77b4'               # 主色调
+
+# 【样式2】字体大小配置
+# 说明：修改这里可以改变所有字体大小
+FONTSIZE_MAIN_TITLE = 28    # 一级标题字体大小（增大）
+FONTSIZE_HEADER = 18                 # 表头字体大小
+FONTSIZE_CATEGORY = 16               # ⭐【修改2】分类标题字体（二级标题）- 原来是11
+FONTSIZE_INDICATOR = 14             # ⭐【修改3】指标名称字体 - 原来是9
+FONTSIZE_VALUE = 14                 # ⭐【修改3】数值字体 - 原来是10
+FONTSIZE_STATUS = 14               # ⭐【修改3】状态字体 - 原来是8.5
+
+# 【样式3】间距配置
+# 说明：修改这里可以改变标题和表格的间距
+TITLE_TABLE_SPACING = -0.5            # ⭐【修改4】一级标题和表格间距 - 原来是0.5，现在更小
+TABLE_ROW_HEIGHT = 4               # ⭐【修改5】表格行高 - 从3增加到4，容纳多行标题
+
+# ========== 增强配置 ==========
+
+# 主题配置 - 用于表格图
+# 新的主题配置 - 7个生理系统分类
+# 格式: '指标key': ('中文名', '英文名')
+
+# 一级分类中英文对照
+CATEGORY_NAMES = {
+    '1_调控与指挥中心': ('调控与指挥中心（神经-内分泌系统）', 'Control and Command Center (Neuroendocrine System)'),
+    '2_执行与代谢系统': ('执行与代谢系统（肌肉与能量状态）', 'Execution and Metabolic System (Muscle and Energy Status)'),
+    '3_循环与运载系统': ('循环与运载系统（血液运载能力）', 'Circulation and Transport System (Blood Transport Capacity)'),
+    '4_后勤保障与维护': ('后勤保障与维护（免疫与内环境）', 'Logistics Support and Maintenance (Immunity and Internal Environment)'),
+}
+
+THEME_CONFIG = {
+    '1_调控与指挥中心': {
+        '合成代谢\nAnabolism': {
+            '睾酮': ('睾酮', 'Testosterone'),
+            '游离睾酮': ('游离睾酮', 'Free Testosterone'),
+        },
+        '分解代谢\nCatabolism': {
+            '皮质醇': ('皮质醇', 'Cortisol'),
+        },
+        '状态平衡\nStatus Balance': {
+            '睾酮/皮质醇比值': ('睾酮/皮质醇比值', 'T/C Ratio'),
+        }
+    },
+
+    '2_执行与代谢系统': {
+        '结构完整性（硬件）\nStructural Integrity (Hardware)': {
+            '肌酸激酶': ('肌酸激酶', 'Creatine Kinase'),
+        },
+        '能量储备与代谢（软件/燃料）\nEnergy Reserves and Metabolism (Software/Fuel)': {
+            '血糖': ('血糖', 'Blood Glucose'),
+            '血尿素': ('血尿素', 'Blood Urea'),
+            '尿酸': ('尿酸', 'Uric Acid'),
+        }
+    },
+
+    '3_循环与运载系统': {
+        '输送载体（红细胞）\nTransport Carrier (Red Blood Cells)': {
+            '血红蛋白': ('血红蛋白', 'Hemoglobin'),
+            '红细胞': ('红细胞', 'RBC Count'),
+            '红细胞压积': ('红细胞压积', 'Hematocrit'),
+            '网织红细胞百分比': ('网织红细胞百分比', 'Reticulocyte %'),
+            '平均红细胞容积': ('平均红细胞容积', 'MCV'),
+        },
+        '生化原料（造血储备）\nBiochemical Raw Materials (Hematopoietic Reserves)': {
+            '铁蛋白': ('铁蛋白', 'Ferritin'),
+            '维生素B12': ('维生素B12', 'Vitamin B12'),
+            '维生素B6（PA）': ('维生素B6（PA）', 'Vitamin B6 (PA)'),  # ⭐ 修改
+            '叶酸': ('叶酸', 'Folic Acid'),
+        }
+    },
+
+    '4_后勤保障与维护': {
+        '免疫防御（炎性监控）\nImmune Defense (Inflammatory Monitoring)': {
+            '白细胞': ('白细胞', 'WBC Count'),
+            '超敏C反应蛋白': ('超敏C反应蛋白', 'hs-CRP'),
+            '触珠蛋白': ('触珠蛋白', 'Haptoglobin'),
+        },
+        '代谢辅酶（微量营养）\nMetabolic Coenzymes (Micronutrients)': {
+            '维生素B1': ('维生素B1', 'Vitamin B1'),
+            '维生素B2': ('维生素B2', 'Vitamin B2'),
+            '维生素D2': ('维生素D2', 'Vitamin D2'),
+            '维生素D3': ('维生素D3', 'Vitamin D3'),
+            '维生素D': ('维生素D', 'Vitamin D'),
+        },
+        '内环境稳态（水盐平衡）\nInternal Environment Homeostasis (Water-Electrolyte Balance)': {
+            '钾': ('钾', 'Potassium'),
+            '钠': ('钠', 'Sodium'),
+            '氯': ('氯', 'Chloride'),
+            '渗透压': ('渗透压', 'Osmotic Pressure'),
+            '血尿素/肌酐': ('血尿素/肌酐', 'BUN/Cr Ratio'),
+        }
+    },
+}
+
+# 雷达图配置
+RADAR_FIELDS = ['游离睾酮', '皮质醇', '肌酸激酶', '血尿素', '血红蛋白', '铁蛋白', '白细胞', '网织红细胞百分比']  # ⭐ 改为游离睾酮
+LOWER_IS_BETTER = ['肌酸激酶', '血尿素', '超敏C反应蛋白', '皮质醇']
+
+# 雷达图样式
+RADAR_STYLES = [
+    {'color': '#8BC1E9', 'linewidth': 2, 'linestyle': ':'},   # 第1次 - 浅天蓝
+    {'color': '#E89A9D', 'linewidth': 2, 'linestyle': '-.'},  # 第2次 - 浅柔红
+    {'color': '#5C7CFA', 'linewidth': 2.5, 'linestyle': '--'}, # 第3次 - 靛蓝
+    {'color': '#D05A5E', 'linewidth': 3, 'linestyle': '-'},   # 第4次（最新）- 深砖红
+]
+
+# 趋势图协调配色列表（用于多运动员曲线，静态图和交互图共用）
+TREND_COLORS = [
+    '#4A90E2',  # 深海蓝
+    '#D05A5E',  # 深砖红
+    '#8BC1E9',  # 浅天蓝
+    '#E89A9D',  # 浅柔红
+    '#5C7CFA',  # 靛蓝
+    '#9B59B6',  # 紫色
+    '#1ABC9C',  # 青绿
+    '#E67E22',  # 深橙
+]
+
+# 交互趋势图：每名运动员最多发送到浏览器的数据点数（超过则用LTTB降采样）
+TREND_MAX_POINTS = 300
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+流水线各阶段计时（轻量级 span）
+
+    with span('excel.月周测试指标') as s:      # 手动计时一段代码
+        df = pd.read_excel(...)
+        s['rows'], s['cols'] = df.shape
+
+    @timed('plot.theme')                       # 计时整个函数，输入数据的行列数自动记录
+    def plot_theme_table(athlete_df, ...):
+        ...
+        lap('status')                          # 记录函数内部一个阶段的耗时（status_ms）
+
+每个 span 记录：阶段名、开始时间、耗时(ms)、处理的行数/列数、缓存命中(hit/miss)、嵌套深度、线程名、
+内部阶段耗时(*_ms)和异常。记录按会话分开保存在环形缓冲区（每个会话最近 SPAN_HISTORY 条），
+可以汇总成表格（summarize_spans）或导出为 JSON lines（spans_jsonl）。计时开销只有两次 perf_counter。
+
+会话由 span_session(会话标识) 设置（contextvars，Streamlit 每次运行和片段运行各设置一次）；
+recent_spans / clear_spans 只读写当前会话的记录，多个会话的计时不会混在一起。
+后台线程要归入启动它的会话，需在 contextvars.copy_context() 中运行（预渲染、高清渲染已这样做）。
+命令行和基准没有设置会话，记录都在 None 会话下。
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+SPAN_HISTORY = 2000      # 每个会话保留的记录数
+SPAN_SESSIONS = 32       # 保留记录的会话数，超出时丢弃最久没有新记录的会话
+_spans = OrderedDict()   # 会话 → deque(记录)
+_spans_lock = threading.Lock()
+_session = contextvars.ContextVar('span_session', default=None)
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextlib.contextmanager
+def span_session(session):
+    """在这段代码（及在其上下文中启动的后台任务）里产生的 span 记到 session 名下"""
+    token = _session.set(session)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def _session_spans(create=False):
+    """当前会话的记录缓冲区（不存在且 create=False 时返回 None）；调用方持有 _spans_lock"""
+    session = _session.get()
+    spans = _spans.get(session)
+    if spans is None and create:
+        spans = _spans[session] = deque(maxlen=SPAN_HISTORY)
+    if spans is not None:
+        _spans.move_to_end(session)
+        while len(_spans) > SPAN_SESSIONS:
+            _spans.popitem(last=False)
+    return spans
+
+
+@contextlib.contextmanager
+def span(stage, **fields):
+    """计时一段代码；yield 出的字典可以补充 rows / cols / cache 等字段"""
+    stack = _stack()
+    now = time.perf_counter()
+    record = {
+        'stage': stage,
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'depth': len(stack),
+        'parent': stack[-1]['stage'] if stack else None,
+        'thread': threading.current_thread().name,
+        **fields,
+    }
+    record['_t0'] = record['_lap'] = now
+    stack.append(record)
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        stack.pop()
+        record['ms'] = round((time.perf_counter() - record.pop('_t0')) * 1000, 3)
+        record.pop('_lap', None)
+        with _spans_lock:
+            _session_spans(create=True).append(record)
+
+
+def annotate(**fields):
+    """给当前线程最内层的 span 补充字段（没有进行中的 span 时忽略）"""
+    stack = _stack()
+    if stack:
+        stack[-1].update(fields)
+
+
+def lap(name):
+    """记录当前 span 内从上一个 lap（或开始）到现在的耗时，字段名为 '<name>_ms'"""
+    stack = _stack()
+    if stack:
+        record = stack[-1]
+        now = time.perf_counter()
+        record[f'{name}_ms'] = round((now - record['_lap']) * 1000, 3)
+        record['_lap'] = now
+
+
+def _frame_shape(args, kwargs):
+    """取第一个 DataFrame 参数的行列数"""
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, pd.DataFrame):
+            return {'rows': len(value), 'cols': len(value.columns)}
+    return {}
+
+
+def timed(stage):
+    """装饰器：整个函数作为一个 span，记录第一个 DataFrame 参数的行列数"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage, **_frame_shape(args, kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recent_spans(limit=None):
+    """当前会话最近的 span 记录（从旧到新）"""
+    with _spans_lock:
+        spans = list(_session_spans() or ())
+    return spans[-limit:] if limit else spans
+
+
+def clear_spans():
+    """清空当前会话的记录"""
+    with _spans_lock:
+        _spans.pop(_session.get(), None)
+
+
+def spans_jsonl(spans=None):
+    """span 记录 → JSON lines 文本（每行一条）"""
+    spans = recent_spans() if spans is None else spans
+    return ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in spans)
+
+
+def summarize_spans(spans=None):
+    """按阶段汇总：次数、总耗时、平均、最大、缓存命中次数、最近一次处理的行数"""
+    spans = recent_spans() if spans is None else spans
+    columns = ['阶段', '次数', '总耗时ms', '平均ms', '最大ms', '缓存命中', '行数']
+    if not spans:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(spans)
+    for col in ('cache', 'rows'):
+        if col not in df.columns:
+            df[col] = None
+    summary = df.groupby('stage', sort=False).agg(
+        次数=('ms', 'size'),
+        总耗时ms=('ms', 'sum'),
+        平均ms=('ms', 'mean'),
+        最大ms=('ms', 'max'),
+        缓存命中=('cache', lambda c: int((c == 'hit').sum())),
+        行数=('rows', 'last'),
+    ).reset_index().rename(columns={'stage': '阶段'})
+    return summary.sort_values('总耗时ms', ascending=False).round(1)[columns]